@@ -119,10 +119,19 @@ STATIC_ROOT = BASE_DIR / 'staticfiles'
 STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 
 MEDIA_URL = '/media/'
-MEDIA_ROOT = BASE_DIR / 'media'
+# Fichiers déposés : lus aussi par le worker de jobs (run_worker), qui doit tourner sur le même disque
+MEDIA_ROOT = os.environ.get('MEDIA_ROOT') or BASE_DIR / 'media'
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Cache partagé entre les processus web et le worker (table créée par `createcachetable`)
+CACHES = {
+    'default': {
+        'BACKEND':  'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'main_cache',
+    }
+}
+
 # Email — on garde le .cc, ton mail ne change pas
 EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
 EMAIL_HOST = 'smtp.gmail.com'
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Document, Analysis, Devis, Standard, SiteSettings
+from .models import Document, Analysis, Devis, Standard, SiteSettings, Job, ExtractionCache, EmailSortant, AppelLLM, LotExtraction
 
 
 # ── SITE SETTINGS (Maintenance) ──────────────────────────────────────────────
@@ -37,7 +37,7 @@ class SiteSettingsAdmin(admin.ModelAdmin):
 @admin.register(Document)
 class DocumentAdmin(admin.ModelAdmin):
     list_display  = ('name', 'client_name', 'norme', 'pays', 'status', 'is_conform_display', 'upload_date')
-    list_filter   = ('status', 'norme', 'pays', 'building_type')
+    list_filter   = ('status', 'norme', 'pays', 'building_type', 'conformite', 'extraction_niveau')
     search_fields = ('name', 'client_name', 'client_email')
     readonly_fields = ('tracking_token', 'upload_date', 'is_conform_display')
     ordering      = ('-upload_date',)
@@ -110,3 +110,60 @@ class AnalysisAdmin(admin.ModelAdmin):
 class StandardAdmin(admin.ModelAdmin):
     list_display = ('name', 'type')
     list_filter  = ('type',)
+
+
+# ── JOBS (file de tâches de fond) ────────────────────────────────────────────
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display  = ('id', 'type_job', 'statut', 'progression', 'etape', 'document', 'tentatives', 'created_at', 'finished_at')
+    list_filter   = ('statut', 'type_job')
+    search_fields = ('document__name', 'erreur')
+    ordering      = ('-created_at',)
+    readonly_fields = ('created_at', 'started_at', 'battement_at', 'finished_at', 'worker', 'progression', 'etape', 'texte_partiel')
+
+
+# ── EMAILS SORTANTS (file d'envoi) ───────────────────────────────────────────
+
+@admin.register(EmailSortant)
+class EmailSortantAdmin(admin.ModelAdmin):
+    list_display  = ('id', 'sujet', 'destinataire', 'statut', 'tentatives', 'created_at', 'sent_at')
+    list_filter   = ('statut',)
+    search_fields = ('destinataire', 'sujet', 'erreur')
+    ordering      = ('-created_at',)
+    readonly_fields = ('created_at', 'sent_at', 'tentatives', 'erreur')
+
+
+# ── CACHE D'EXTRACTION CLAUDE ────────────────────────────────────────────────
+
+@admin.register(ExtractionCache)
+class ExtractionCacheAdmin(admin.ModelAdmin):
+    list_display  = ('contenu_hash', 'modele', 'prompt_version', 'taille', 'hits', 'created_at', 'last_hit_at')
+    list_filter   = ('modele', 'prompt_version')
+    search_fields = ('contenu_hash',)
+    ordering      = ('-last_hit_at',)
+    readonly_fields = ('cle', 'contenu_hash', 'prompt_version', 'modele', 'taille', 'hits', 'created_at', 'last_hit_at')
+
+
+# ── APPELS LLM (tokens, cache de prompt, durées) ─────────────────────────────
+
+@admin.register(AppelLLM)
+class AppelLLMAdmin(admin.ModelAdmin):
+    list_display  = ('created_at', 'motif', 'modele', 'statut_http', 'duree_ms', 'input_tokens',
+                     'cache_read_input_tokens', 'cache_creation_input_tokens', 'output_tokens')
+    list_filter   = ('motif', 'modele', 'statut_http')
+    ordering      = ('-created_at',)
+    readonly_fields = [f.name for f in AppelLLM._meta.fields]
+
+
+# ── LOTS DE RÉ-EXTRACTION (Message Batches) ──────────────────────────────────
+
+@admin.register(LotExtraction)
+class LotExtractionAdmin(admin.ModelAdmin):
+    list_display  = ('id', 'lot_id', 'statut', 'prompt_version', 'nb_requetes', 'nb_ok', 'nb_erreurs',
+                     'created_at', 'importe_le')
+    list_filter   = ('statut', 'prompt_version')
+    search_fields = ('lot_id',)
+    ordering      = ('-created_at',)
+    readonly_fields = ('lot_id', 'prompt_version', 'modele', 'requetes', 'nb_requetes', 'nb_ok', 'nb_erreurs',
+                       'created_at', 'soumis_le', 'termine_le', 'importe_le')
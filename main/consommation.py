@@ -0,0 +1,162 @@
+"""
+Consommations agrégées des factures d'énergie — ConformXpert.
+
+Les graphiques (édition du dossier, page client) et `get_donnees_factures`
+lisent ConsommationMensuelle : une ligne par dossier, mois et énergie. Ces
+lignes sont tenues à jour au fil de l'eau (voir main/signals.py) : quand une
+facture est analysée, ré-analysée ou supprimée, seuls le mois qu'elle quittait
+et celui où elle entre sont recalculés. Aucune requête de lecture ne parcourt
+plus les analyse_json.
+
+Le mois d'une facture est celui de sa période de début (à défaut, celui du
+dépôt) ; il est mémorisé dans FactureEnergie.mois.
+"""
+from datetime import date
+
+
+# ── Fonctions pures (copiées dans la migration 0026) ─────────
+
+def _nombre(valeur):
+    try:
+        return float(valeur) if valeur is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _date(valeur):
+    try:
+        return date.fromisoformat(str(valeur)[:10]) if valeur else None
+    except ValueError:
+        return None
+
+
+def mois_de(analyse_json, depose_le=None):
+    """1er jour du mois où la facture est comptée ; None si elle ne porte pas de consommation."""
+    d = analyse_json or {}
+    if _nombre(d.get('consommation')) is None:
+        return None
+    debut = _date(d.get('periode_debut')) or (depose_le.date() if depose_le else None)
+    return debut.replace(day=1) if debut else None
+
+
+def agreger(analyses):
+    """
+    Champs d'une ligne ConsommationMensuelle à partir des analyse_json d'un même
+    mois et d'une même énergie (ordre de dépôt) ; None s'il n'y a rien à compter.
+    """
+    lignes = [d for d in analyses if d and _nombre(d.get('consommation')) is not None]
+    if not lignes:
+        return None
+
+    conso    = sum(_nombre(d['consommation']) for d in lignes)
+    montants = [m for m in (_nombre(d.get('montant_ttc')) for d in lignes) if m]
+    # Coût / kWh pondéré par la consommation des factures qui le renseignent
+    ponderes = [(_nombre(d.get('cout_par_kwh')), _nombre(d['consommation'])) for d in lignes]
+    ponderes = [(c, q) for c, q in ponderes if c is not None and q]
+    poids    = sum(q for _, q in ponderes)
+    debuts   = [x for x in (_date(d.get('periode_debut')) for d in lignes) if x]
+    fins     = [x for x in (_date(d.get('periode_fin')) for d in lignes) if x]
+    derniere = lignes[-1]
+    return {
+        'consommation':  conso,
+        'montant_ttc':   sum(montants) if montants else None,
+        'cout_par_kwh':  round(sum(c * q for c, q in ponderes) / poids, 4) if poids else None,
+        'nb_factures':   len(lignes),
+        'periode_debut': min(debuts) if debuts else None,
+        'periode_fin':   max(fins) if fins else None,
+        'unite':         (derniere.get('unite') or 'kWh')[:20],
+        'devise':        (derniere.get('devise') or 'CAD')[:10],
+        'fournisseur':   (derniere.get('fournisseur') or '')[:255],
+    }
+
+
+# ── Tenue à jour ─────────────────────────────────────────────
+
+def recalculer(document_id, mois, type_energie):
+    """Recalcule (ou supprime) la ligne d'un mois et d'une énergie à partir de ses seules factures."""
+    from .models import ConsommationMensuelle, FactureEnergie
+
+    analyses = (
+        FactureEnergie.objects
+        .filter(document_id=document_id, mois=mois, type_energie=type_energie, analyse_ok=True)
+        .order_by('uploaded_at', 'id')
+        .values_list('analyse_json', flat=True)
+    )
+    champs = agreger(analyses)
+    cle = {'document_id': document_id, 'mois': mois, 'type_energie': type_energie}
+    if champs is None:
+        ConsommationMensuelle.objects.filter(**cle).delete()
+    else:
+        ConsommationMensuelle.objects.update_or_create(defaults=champs, **cle)
+
+
+def facture_modifiee(facture, supprimee=False):
+    """Met à jour le mois que la facture quitte et celui où elle est désormais comptée."""
+    avant = getattr(facture, '_seau_initial', None)
+    apres = (facture.mois, facture.type_energie) if facture.mois and not supprimee else None
+    for seau in {avant, apres} - {None}:
+        recalculer(facture.document_id, *seau)
+    facture._seau_initial = apres
+
+
+def reconstruire(document_id=None):
+    """Recalcule toutes les lignes (d'un dossier ou de tous) — après une modification en masse."""
+    from .models import ConsommationMensuelle, FactureEnergie
+
+    factures = FactureEnergie.objects.all()
+    lignes = ConsommationMensuelle.objects.all()
+    if document_id is not None:
+        factures = factures.filter(document_id=document_id)
+        lignes = lignes.filter(document_id=document_id)
+
+    a_maj = []
+    for f in factures.only('id', 'analyse_json', 'analyse_ok', 'uploaded_at', 'mois'):
+        mois = mois_de(f.analyse_json, f.uploaded_at) if f.analyse_ok else None
+        if mois != f.mois:
+            f.mois = mois
+            a_maj.append(f)
+    FactureEnergie.objects.bulk_update(a_maj, ['mois'], batch_size=500)
+
+    lignes.delete()
+    seaux = factures.filter(mois__isnull=False).values_list('document_id', 'mois', 'type_energie').distinct()
+    for seau in list(seaux):
+        recalculer(*seau)
+
+
+# ── Lecture ──────────────────────────────────────────────────
+
+def en_dict(ligne):
+    return {
+        'mois':          ligne.mois.isoformat(),
+        'periode_debut': (ligne.periode_debut or ligne.mois).isoformat(),
+        'periode_fin':   ligne.periode_fin.isoformat() if ligne.periode_fin else None,
+        'consommation':  ligne.consommation,
+        'unite':         ligne.unite,
+        'montant_ttc':   ligne.montant_ttc,
+        'cout_par_kwh':  ligne.cout_par_kwh,
+        'type_energie':  ligne.type_energie,
+        'fournisseur':   ligne.fournisseur,
+        'devise':        ligne.devise,
+        'nb_factures':   ligne.nb_factures,
+    }
+
+
+def lignes_mensuelles(document_id):
+    """Lignes mensuelles du dossier (ordre chronologique), prêtes pour le JSON."""
+    from .models import ConsommationMensuelle
+    return [en_dict(ligne) for ligne in ConsommationMensuelle.objects.filter(document_id=document_id)]
+
+
+def resume(document_id):
+    """Lignes mensuelles + totaux, tels que renvoyés par get_donnees_factures."""
+    lignes = lignes_mensuelles(document_id)
+    conso_totale = sum(m['consommation'] for m in lignes if m['consommation'])
+    cout_total   = sum(m['montant_ttc'] for m in lignes if m['montant_ttc'])
+    return {
+        'mois':           lignes,
+        'conso_totale':   round(conso_totale, 1),
+        'cout_total':     round(cout_total, 2),
+        'cout_moyen_kwh': round(cout_total / conso_totale, 4) if conso_totale else None,
+        'pic_mensuel':    max((m['consommation'] for m in lignes if m['consommation']), default=None),
+        'nb_factures':    sum(m['nb_factures'] for m in lignes),
+    }
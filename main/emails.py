@@ -0,0 +1,238 @@
+"""
+Envoi des emails — file persistée + dispatcher — ConformXpert.
+
+`envoyer()` rend le gabarit dans le thread appelant et enregistre l'email dans
+EmailSortant : un redémarrage du processus ne perd plus rien. Un seul thread
+dispatcher par processus réserve les emails dus par lots et les confie à un
+pool borné (EMAIL_WORKERS) qui partage un unique client HTTP ; les issues du
+lot sont enregistrées en bloc. Une rafale de changements de statut ne crée
+donc plus un thread (ni un client SendGrid) par email.
+
+Backend (EMAIL_OUTBOX_BACKEND) :
+  - 'sendgrid' : API SendGrid (défaut si SENDGRID_API_KEY est défini) ;
+  - 'local'    : aucun envoi réseau — les emails sont gardés dans BOITE_LOCALE
+                 et affichés dans la console (dev, tests hors ligne).
+"""
+import os
+import random
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import F
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+
+WORKERS    = int(os.environ.get('EMAIL_WORKERS', '4'))
+TAILLE_LOT = int(os.environ.get('EMAIL_BATCH', '20'))
+# Scrutation de secours (emails repoussés par le backoff, mises en file d'autres processus)
+INTERVALLE = float(os.environ.get('EMAIL_POLL_INTERVAL', '10'))
+# Bail pris sur un email pendant son envoi : si le processus meurt, il est repris ensuite
+BAIL = timedelta(seconds=int(os.environ.get('EMAIL_LEASE', '300')))
+# Backoff exponentiel entre deux essais : 30 s, 60 s, 120 s… (±20 %)
+BACKOFF_BASE = 30
+
+BOITE_LOCALE = deque(maxlen=200)   # emails « envoyés » par le backend local
+
+_verrou     = threading.Lock()
+_reveil     = threading.Event()
+_dispatcher = None
+_pool       = None
+_backend    = None
+
+
+# ── Backends ─────────────────────────────────────────────────
+
+class BackendSendGrid:
+    """Un seul SendGridAPIClient par processus, partagé par les threads du pool."""
+
+    def __init__(self):
+        import sendgrid
+        self.client = sendgrid.SendGridAPIClient(api_key=settings.SENDGRID_API_KEY)
+
+    def envoyer(self, email):
+        from sendgrid.helpers.mail import Bcc, Mail
+
+        message = Mail(
+            from_email=settings.DEFAULT_FROM_EMAIL,
+            to_emails=email.destinataire,
+            subject=email.sujet,
+            html_content=email.html,
+        )
+        if email.bcc:
+            message.bcc = [Bcc(email.bcc)]
+        if email.reply_to:
+            message.reply_to = email.reply_to
+        response = self.client.send(message)
+        if response.status_code >= 300:
+            raise RuntimeError(f"SendGrid a répondu {response.status_code}")
+
+
+class BackendLocal:
+    """Aucun envoi réseau : l'email est conservé dans BOITE_LOCALE."""
+
+    def envoyer(self, email):
+        BOITE_LOCALE.append({
+            'destinataire': email.destinataire,
+            'bcc':          email.bcc,
+            'reply_to':     email.reply_to,
+            'sujet':        email.sujet,
+            'html':         email.html,
+        })
+        print(f"MAIL LOCAL → {email.destinataire} : {email.sujet}")
+
+
+def backend():
+    global _backend
+    if _backend is None:
+        with _verrou:
+            if _backend is None:
+                nom = os.environ.get('EMAIL_OUTBOX_BACKEND') or ('sendgrid' if settings.SENDGRID_API_KEY else 'local')
+                _backend = BackendSendGrid() if nom == 'sendgrid' else BackendLocal()
+    return _backend
+
+
+# ── Mise en file ─────────────────────────────────────────────
+
+def envoyer(sujet, template_name, context, destinataire, bcc=None, reply_to=None):
+    """Rend main/emails/<template_name> et met l'email en file. Retourne l'EmailSortant."""
+    if not destinataire:
+        return None
+    html = render_to_string(f'main/emails/{template_name}', context)
+    return mettre_en_file(sujet, html, destinataire, bcc=bcc, reply_to=reply_to)
+
+
+def mettre_en_file(sujet, html, destinataire, bcc=None, reply_to=None):
+    from .models import EmailSortant
+
+    email = EmailSortant.objects.create(
+        sujet=sujet[:255],
+        html=html,
+        destinataire=destinataire,
+        bcc=bcc or '',
+        reply_to=reply_to or '',
+    )
+    # Réveille le dispatcher une fois la ligne visible des autres connexions
+    transaction.on_commit(reveiller)
+    return email
+
+
+# ── Réservation et envoi par lots ────────────────────────────
+
+def reserver_lot(limite=None):
+    """
+    Réserve jusqu'à `limite` emails dus en une transaction : la tentative est
+    comptée et l'email repoussé de BAIL, si bien qu'aucun autre dispatcher ne le prend.
+    """
+    from .models import EmailSortant
+
+    now = timezone.now()
+    with transaction.atomic():
+        lot = list(
+            EmailSortant.objects
+            .select_for_update(skip_locked=True)
+            .filter(statut='en_attente', envoyer_apres__lte=now)
+            .order_by('envoyer_apres', 'id')[:limite or TAILLE_LOT]
+        )
+        if lot:
+            EmailSortant.objects.filter(id__in=[e.id for e in lot]).update(
+                tentatives=F('tentatives') + 1, envoyer_apres=now + BAIL,
+            )
+            for email in lot:
+                email.tentatives += 1
+    return lot
+
+
+def _tenter(email):
+    """Exécuté dans le pool (aucun accès base) : None si envoyé, sinon l'exception."""
+    try:
+        backend().envoyer(email)
+        return None
+    except Exception as e:
+        return e
+
+
+def _executeur():
+    global _pool
+    if _pool is None:
+        with _verrou:
+            if _pool is None:
+                _pool = ThreadPoolExecutor(max_workers=WORKERS, thread_name_prefix='email')
+    return _pool
+
+
+def traiter_lot(limite=None):
+    """Réserve un lot, l'envoie sur le pool et enregistre les issues. Retourne (envoyés, échecs)."""
+    from .models import EmailSortant
+
+    lot = reserver_lot(limite)
+    if not lot:
+        return 0, 0
+
+    resultats = list(_executeur().map(_tenter, lot))
+    now = timezone.now()
+
+    envoyes = [email.id for email, err in zip(lot, resultats) if err is None]
+    if envoyes:
+        EmailSortant.objects.filter(id__in=envoyes).update(statut='envoye', sent_at=now, erreur='')
+
+    echecs = [(email, err) for email, err in zip(lot, resultats) if err is not None]
+    for email, err in echecs:
+        if email.tentatives < email.max_tentatives:
+            delai = BACKOFF_BASE * 2 ** (email.tentatives - 1) * random.uniform(0.8, 1.2)
+            champs = {'envoyer_apres': now + timedelta(seconds=delai)}
+        else:
+            champs = {'statut': 'echec'}
+        EmailSortant.objects.filter(id=email.id).update(erreur=str(err)[:2000], **champs)
+        print(f"ERREUR MAIL {email.id} → {email.destinataire} "
+              f"(tentative {email.tentatives}/{email.max_tentatives}) : {err}")
+
+    if envoyes:
+        print(f"MAIL OK → {len(envoyes)} email(s) envoyé(s)")
+    return len(envoyes), len(echecs)
+
+
+def vider_file():
+    """Envoie tout ce qui est dû, lot après lot. Retourne (envoyés, échecs)."""
+    total_ok = total_ko = 0
+    while True:
+        ok, ko = traiter_lot()
+        total_ok += ok
+        total_ko += ko
+        if ok + ko < TAILLE_LOT:
+            return total_ok, total_ko
+
+
+# ── Dispatcher ───────────────────────────────────────────────
+
+def reveiller():
+    demarrer_dispatcher()
+    _reveil.set()
+
+
+def demarrer_dispatcher():
+    """Démarre le thread dispatcher du processus (une seule fois)."""
+    global _dispatcher
+    if _dispatcher is not None:
+        return
+    with _verrou:
+        if _dispatcher is not None:
+            return
+        _dispatcher = threading.Thread(target=_boucle, name='emails-dispatcher', daemon=True)
+        _dispatcher.start()
+
+
+def _boucle():
+    while True:
+        try:
+            vider_file()
+        except Exception as e:
+            print(f"DISPATCHER MAIL ERREUR: {e}")
+        finally:
+            close_old_connections()
+        _reveil.wait(INTERVALLE)
+        _reveil.clear()
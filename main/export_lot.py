@@ -0,0 +1,209 @@
+"""
+Export groupé des rapports — ConformXpert.
+
+Rassemble dans une archive ZIP le rapport PDF ReportLab et le rapport Word de
+chaque dossier terminé d'un client et/ou d'un mois. Les rapports sont rendus
+sur un pool de processus (EXPORT_WORKERS) et écrits dans l'archive dans
+l'ordre où ils se terminent ; l'archive est produite au fil de l'eau
+(zipfile sur un flux non positionnable), sans jamais être entière en mémoire.
+
+Mémoire bornée : au plus EXPORT_FENETRE dossiers sont en cours de rendu ou en
+attente d'écriture, les dossiers sont lus en base par petits lots.
+Annulation : fermer le générateur (déconnexion du client HTTP, Ctrl-C de la
+commande) annule les rendus non commencés et libère le pool.
+
+Les PDF déjà présents dans le cache disque (main/rapports_pdf.py) pour la
+version courante du dossier sont relus au lieu d'être reconstruits.
+"""
+import multiprocessing
+import os
+import re
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from itertools import islice
+
+from django.utils import timezone
+
+
+# Nombre de processus de rendu (1 = tout dans le processus courant)
+EXPORT_WORKERS = int(os.environ.get('EXPORT_WORKERS', str(min(4, os.cpu_count() or 1))))
+# Dossiers en vol (en rendu ou rendus mais pas encore écrits) : borne la mémoire
+EXPORT_FENETRE = int(os.environ.get('EXPORT_FENETRE', str(2 * EXPORT_WORKERS)))
+# Dossiers chargés par requête SQL
+TAILLE_LOT = 50
+
+_MOIS = re.compile(r'(\d{4})-(\d{2})')
+
+
+# ── Sélection des dossiers ───────────────────────────────────
+
+def lire_mois(valeur):
+    """'AAAA-MM' → (année, mois). ValueError si le format est invalide."""
+    m = _MOIS.fullmatch((valeur or '').strip())
+    if not m or not 1 <= int(m[2]) <= 12:
+        raise ValueError(f"Mois invalide « {valeur} » (attendu AAAA-MM)")
+    return int(m[1]), int(m[2])
+
+
+def documents(client=None, mois=None):
+    """Dossiers terminés d'un client (email ou nom exact) et/ou d'un mois de dépôt (AAAA-MM)."""
+    from django.db.models import Q
+    from .models import Document
+
+    qs = Document.objects.filter(status='termine')
+    if client:
+        qs = qs.filter(Q(client_email__iexact=client) | Q(client_name__iexact=client))
+    if mois:
+        annee, num = lire_mois(mois)
+        qs = qs.filter(upload_date__year=annee, upload_date__month=num)
+    return qs.order_by('id')
+
+
+def _par_lots(doc_ids):
+    from .models import Document
+
+    for i in range(0, len(doc_ids), TAILLE_LOT):
+        yield from Document.objects.filter(id__in=doc_ids[i:i + TAILLE_LOT]).order_by('id')
+
+
+# ── Rendu ────────────────────────────────────────────────────
+
+def _initialiser():
+    """
+    Démarrage d'un processus du pool. Les processus viennent d'un forkserver et non
+    d'un fork() du processus web (dont les threads pourraient laisser un verrou
+    tenu dans l'enfant) : Django y est à configurer avant de désérialiser un dossier.
+    """
+    import django
+    django.setup()
+
+
+def _rendre(document, pdf_cache=None):
+    """
+    Exécuté dans un processus du pool (aucun accès base) : retourne (pdf, docx) en octets.
+    Le PDF est relu depuis le cache disque s'il est à jour.
+    """
+    from .views import construire_rapport_pdf, construire_rapport_word
+
+    if pdf_cache:
+        try:
+            with open(pdf_cache, 'rb') as f:
+                pdf = f.read()
+        except FileNotFoundError:
+            # Version élaguée entre-temps par une régénération
+            pdf = construire_rapport_pdf(document)
+    else:
+        pdf = construire_rapport_pdf(document)
+    return pdf, construire_rapport_word(document)
+
+
+def _rendus(dossiers, workers, fenetre):
+    """
+    Produit (dossier, (pdf, docx) ou exception) dans l'ordre d'achèvement,
+    avec au plus `fenetre` dossiers soumis au pool et non encore consommés.
+    """
+    from . import rapports_pdf
+
+    if workers <= 1:
+        for doc in dossiers:
+            try:
+                yield doc, _rendre(doc, rapports_pdf.chemin_a_jour(doc))
+            except Exception as e:
+                yield doc, e
+        return
+
+    pool = ProcessPoolExecutor(
+        max_workers=workers, mp_context=multiprocessing.get_context('forkserver'), initializer=_initialiser,
+    )
+    en_vol = {}
+
+    def soumettre(n):
+        for doc in islice(dossiers, n):
+            en_vol[pool.submit(_rendre, doc, rapports_pdf.chemin_a_jour(doc))] = doc
+
+    try:
+        soumettre(fenetre)
+        while en_vol:
+            faits, _ = wait(en_vol, return_when=FIRST_COMPLETED)
+            for fut in faits:
+                doc = en_vol.pop(fut)
+                try:
+                    resultat = fut.result()
+                except Exception as e:
+                    resultat = e
+                yield doc, resultat
+            soumettre(fenetre - len(en_vol))
+    finally:
+        # Fin normale, erreur ou annulation : les rendus non commencés sont abandonnés
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+# ── Archive ZIP en flux ──────────────────────────────────────
+
+class _Flux:
+    """Fichier en écriture seule et non positionnable : zipfile y écrit, le générateur le vide."""
+
+    def __init__(self):
+        self._morceaux = []
+
+    def write(self, data):
+        self._morceaux.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def vider(self):
+        data = b''.join(self._morceaux)
+        self._morceaux.clear()
+        return data
+
+
+def nom_sur(nom):
+    return re.sub(r'[^\w.-]+', '_', nom or '').strip('_')[:80] or 'dossier'
+
+
+def _entree(nom, quand):
+    info = zipfile.ZipInfo(nom, date_time=timezone.localtime(quand).timetuple()[:6])
+    # PDF et DOCX sont déjà compressés : stockage simple, pas de CPU perdu
+    info.compress_type = zipfile.ZIP_STORED
+    return info
+
+
+def flux_zip(doc_ids, workers=None, fenetre=None, progression=None):
+    """
+    Générateur des octets de l'archive ZIP des rapports des dossiers `doc_ids`.
+    `progression(faits, total)` est appelé après chaque dossier écrit.
+    Les dossiers en échec sont listés dans ERREURS.txt à la fin de l'archive.
+    """
+    doc_ids = list(doc_ids)
+    workers = min(workers or EXPORT_WORKERS, max(1, len(doc_ids)))
+    fenetre = max(workers, fenetre or EXPORT_FENETRE)
+
+    flux = _Flux()
+    archive = zipfile.ZipFile(flux, mode='w')
+    rendus = _rendus(_par_lots(doc_ids), workers, fenetre)
+    erreurs = []
+    try:
+        for faits, (doc, resultat) in enumerate(rendus, start=1):
+            if isinstance(resultat, Exception):
+                erreurs.append(f"DOC-{doc.id:04d} {doc.name} : {resultat}")
+                print(f"EXPORT RAPPORTS ERREUR doc {doc.id}: {resultat}")
+            else:
+                pdf, docx = resultat
+                base = f"DOC-{doc.id:04d}_{nom_sur(doc.name)}"
+                quand = doc.modifie_le or doc.upload_date
+                archive.writestr(_entree(f"{base}/rapport_{nom_sur(doc.name)}.pdf", quand), pdf)
+                archive.writestr(_entree(f"{base}/rapport_{nom_sur(doc.name)}.docx", quand), docx)
+            if progression:
+                progression(faits, len(doc_ids))
+            data = flux.vider()
+            if data:
+                yield data
+
+        if erreurs:
+            archive.writestr(_entree('ERREURS.txt', timezone.now()), '\n'.join(erreurs) + '\n')
+        archive.close()
+        yield flux.vider()
+    finally:
+        rendus.close()
@@ -0,0 +1,145 @@
+"""
+Extraction du texte des PDF — ConformXpert.
+
+Chaque page n'est extraite qu'une seule fois : son texte est stocké dans
+PageTexte (SHA-256 du fichier + numéro de page), si bien qu'un nouveau dépôt
+du même fichier, un « analyser » ou une ré-analyse relisent la base au lieu
+de re-parser le PDF. Le nombre de pages est mémorisé lui aussi (FichierPdf) :
+un fichier dont toutes les pages sont connues n'est pas même ouvert.
+Les pages manquantes d'un gros rapport (Pléiades 200+ pages) sont réparties
+par plages contiguës sur un pool de processus, créé au premier gros PDF puis
+réutilisé par le processus (web ou worker) jusqu'à sa fin.
+"""
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import PyPDF2
+
+
+# Nombre de processus d'extraction (1 = tout dans le processus courant)
+PDF_WORKERS = int(os.environ.get('PDF_WORKERS', str(min(4, os.cpu_count() or 1))))
+
+# En dessous de ce nombre de pages à extraire, le coût du pool n'est pas rentable
+SEUIL_PARALLELE = int(os.environ.get('PDF_SEUIL_PARALLELE', '24'))
+
+_pool = None
+_pool_verrou = threading.Lock()
+
+
+def _executeur():
+    """
+    Pool de processus du module, créé à la première demande (arrêté à la sortie par concurrent.futures).
+    Processus lancés par un forkserver et non par fork() : le processus web fait tourner
+    d'autres threads (client HTTP, emails, écoute des notifications) dont un enfant
+    forké pourrait hériter d'un verrou tenu. Les enfants n'importent que ce module
+    (pas de Django) et ne touchent ni à la base ni à un état partagé.
+    """
+    global _pool
+    with _pool_verrou:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=PDF_WORKERS, mp_context=multiprocessing.get_context('forkserver'))
+        return _pool
+
+
+def _oublier_pool():
+    """Abandonne le pool courant (cassé, ou hérité d'un fork) : le prochain appel en recrée un."""
+    global _pool
+    _pool = None
+
+
+# Un processus enfant ne doit pas réutiliser le pool de son parent
+os.register_at_fork(after_in_child=_oublier_pool)
+
+
+def _extraire_plage(path, pages):
+    """
+    Exécuté dans un processus du pool : ouvre le PDF et extrait les pages demandées.
+    Retourne [(page, texte)] ; texte vaut None si la page n'a pas pu être lue.
+    """
+    resultats = []
+    with open(path, 'rb') as f:
+        reader = PyPDF2.PdfReader(f)
+        for num in pages:
+            try:
+                resultats.append((num, reader.pages[num].extract_text() or ''))
+            except Exception as e:
+                print(f"Erreur lecture PDF {os.path.basename(path)} p.{num + 1}: {e}")
+                resultats.append((num, None))
+    return resultats
+
+
+def _plages(pages, n):
+    """Découpe une liste de pages en n plages contiguës de tailles voisines."""
+    taille, reste = divmod(len(pages), n)
+    plages, debut = [], 0
+    for i in range(n):
+        fin = debut + taille + (1 if i < reste else 0)
+        if fin > debut:
+            plages.append(pages[debut:fin])
+        debut = fin
+    return plages
+
+
+def nombre_pages(path):
+    with open(path, 'rb') as f:
+        return len(PyPDF2.PdfReader(f).pages)
+
+
+def extraire_pages(path, max_pages=None, fichier_hash=None):
+    """
+    Retourne la liste des textes des pages du PDF (au plus max_pages premières).
+    Les pages déjà connues sont lues en base, les autres extraites puis stockées.
+    """
+    from .extraction_cache import hash_fichier
+    from .models import FichierPdf, PageTexte
+
+    fichier_hash = fichier_hash or hash_fichier(path)
+    nb = FichierPdf.objects.filter(fichier_hash=fichier_hash).values_list('nb_pages', flat=True).first()
+    if nb is None:
+        nb = nombre_pages(path)
+        FichierPdf.objects.bulk_create([FichierPdf(fichier_hash=fichier_hash, nb_pages=nb)], ignore_conflicts=True)
+    if max_pages is not None:
+        nb = min(nb, max_pages)
+    if nb <= 0:
+        return []
+
+    textes = dict(
+        PageTexte.objects
+        .filter(fichier_hash=fichier_hash, page__lt=nb)
+        .values_list('page', 'texte')
+    )
+    manquantes = [p for p in range(nb) if p not in textes]
+
+    if manquantes:
+        workers = min(PDF_WORKERS, len(manquantes))
+        if workers <= 1 or len(manquantes) < SEUIL_PARALLELE:
+            extraits = _extraire_plage(path, manquantes)
+        else:
+            try:
+                pool = _executeur()
+                futures = [pool.submit(_extraire_plage, path, plage) for plage in _plages(manquantes, workers)]
+                extraits = [resultat for fut in futures for resultat in fut.result()]
+            except BrokenProcessPool as e:
+                # Un processus du pool a été tué (OOM…) : repli dans le processus courant
+                print(f"Pool d'extraction PDF indisponible ({e}), extraction séquentielle")
+                with _pool_verrou:
+                    _oublier_pool()
+                extraits = _extraire_plage(path, manquantes)
+
+        # Les pages illisibles ne sont pas stockées : elles seront retentées au prochain passage
+        nouvelles = [
+            PageTexte(fichier_hash=fichier_hash, page=num, texte=texte)
+            for num, texte in extraits if texte is not None
+        ]
+        PageTexte.objects.bulk_create(nouvelles, ignore_conflicts=True, batch_size=500)
+        textes.update((num, texte or '') for num, texte in extraits)
+
+    return [textes[p] for p in range(nb)]
+
+
+def extraire_texte(path, max_pages=None, fichier_hash=None):
+    """Texte brut du PDF (pages concaténées), au plus max_pages premières pages."""
+    return "".join(extraire_pages(path, max_pages=max_pages, fichier_hash=fichier_hash))
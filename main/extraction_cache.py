@@ -0,0 +1,175 @@
+"""
+Cache persistant des extractions Claude — ConformXpert.
+
+Un même PDF ré-analysé (bouton « analyser », dépôt en double…) ne repart plus
+chez Claude : le résultat est retrouvé par le SHA-256 des octets du fichier,
+la version du prompt et le nom du modèle. Changer le prompt ou le modèle
+invalide donc naturellement les anciennes entrées.
+
+Les hits / misses / écritures / évictions sont cumulés en base
+(CompteurExtractionCache), quel que soit le processus qui a servi l'appel.
+L'éviction (TTL, limites de taille) passe toutes les EVICTION_ECRITURES
+écritures d'un processus, et périodiquement depuis le worker de jobs.
+"""
+import hashlib
+import json
+import os
+import threading
+from datetime import timedelta
+
+from django.db.models import F, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import CompteurExtractionCache, ExtractionCache
+
+
+TTL         = timedelta(days=int(os.environ.get('EXTRACTION_CACHE_TTL_DAYS', '90')))
+MAX_ENTREES = int(os.environ.get('EXTRACTION_CACHE_MAX_ENTRIES', '5000'))
+MAX_OCTETS  = int(os.environ.get('EXTRACTION_CACHE_MAX_BYTES', str(200 * 1024 * 1024)))
+
+# Éviction toutes les N écritures d'un processus (et toutes les N secondes dans le worker)
+EVICTION_ECRITURES = int(os.environ.get('EXTRACTION_CACHE_EVICTION_WRITES', '200'))
+EVICTION_INTERVALLE = float(os.environ.get('EXTRACTION_CACHE_EVICTION_INTERVAL', '600'))
+
+_ecritures_depuis_eviction = 0
+_eviction_lock = threading.Lock()
+
+
+def _compter(nom, n=1):
+    """Incrémente un compteur cumulé (une requête UPDATE)."""
+    maj = {nom: F(nom) + n}
+    if not CompteurExtractionCache.objects.filter(pk=1).update(**maj):
+        CompteurExtractionCache.objects.get_or_create(pk=1)
+        CompteurExtractionCache.objects.filter(pk=1).update(**maj)
+
+
+# ── Empreintes ───────────────────────────────────────────────
+
+def hash_octets(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def hash_fichier(path, bloc=1024 * 1024):
+    """SHA-256 d'un fichier, lu par blocs (pas de chargement complet en mémoire)."""
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(bloc), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def combiner(hashes):
+    """Empreinte combinée à partir des empreintes de plusieurs fichiers (ordre significatif)."""
+    h = hashlib.sha256()
+    for fichier_hash in hashes:
+        h.update(fichier_hash.encode('ascii'))
+    return h.hexdigest()
+
+
+def hash_fichiers(paths):
+    """Empreinte combinée de plusieurs fichiers (ordre significatif)."""
+    return combiner(hash_fichier(path) for path in paths)
+
+
+def version_prompt(*parties):
+    """Version courte d'un prompt : change dès que son texte change."""
+    return hashlib.sha256('\x1f'.join(parties).encode('utf-8')).hexdigest()[:16]
+
+
+def _cle(contenu_hash, prompt_version, modele):
+    return hashlib.sha256(f"{contenu_hash}|{prompt_version}|{modele}".encode('utf-8')).hexdigest()
+
+
+# ── Lecture / écriture ───────────────────────────────────────
+
+def lire(contenu_hash, prompt_version, modele):
+    """Retourne le résultat en cache, ou None (absent ou expiré)."""
+    cle = _cle(contenu_hash, prompt_version, modele)
+    entree = ExtractionCache.objects.filter(cle=cle).only('id', 'resultat', 'created_at').first()
+    if entree is None:
+        _compter('misses')
+        return None
+    if entree.created_at < timezone.now() - TTL:
+        entree.delete()
+        _compter('misses')
+        _compter('evictions')
+        return None
+    ExtractionCache.objects.filter(id=entree.id).update(hits=F('hits') + 1, last_hit_at=timezone.now())
+    _compter('hits')
+    return entree.resultat
+
+
+def presents(contenu_hashes, prompt_version, modele):
+    """Empreintes (parmi `contenu_hashes`) qui ont une entrée valide pour ce prompt et ce modèle."""
+    cles = {_cle(h, prompt_version, modele): h for h in contenu_hashes}
+    trouvees = ExtractionCache.objects.filter(
+        cle__in=list(cles), created_at__gte=timezone.now() - TTL,
+    ).values_list('cle', flat=True)
+    return {cles[c] for c in trouvees}
+
+
+def ecrire(contenu_hash, prompt_version, modele, resultat):
+    cle = _cle(contenu_hash, prompt_version, modele)
+    taille = len(json.dumps(resultat, ensure_ascii=False).encode('utf-8'))
+    ExtractionCache.objects.update_or_create(
+        cle=cle,
+        defaults={
+            'contenu_hash':   contenu_hash,
+            'prompt_version': prompt_version,
+            'modele':         modele,
+            'resultat':       resultat,
+            'taille':         taille,
+        },
+    )
+    _compter('ecritures')
+
+    global _ecritures_depuis_eviction
+    with _eviction_lock:
+        _ecritures_depuis_eviction += 1
+        a_evincer = _ecritures_depuis_eviction >= EVICTION_ECRITURES
+        if a_evincer:
+            _ecritures_depuis_eviction = 0
+    if a_evincer:
+        evincer()
+
+
+def evincer():
+    """Supprime les entrées expirées puis les moins récemment utilisées au-delà des limites."""
+    supprimees, _ = ExtractionCache.objects.filter(created_at__lt=timezone.now() - TTL).delete()
+
+    qs = ExtractionCache.objects.order_by(Coalesce('last_hit_at', 'created_at'), 'id')
+    total = qs.aggregate(n=Coalesce(Sum('taille'), 0))['n']
+    nb    = ExtractionCache.objects.count()
+    if nb > MAX_ENTREES or total > MAX_OCTETS:
+        a_supprimer = []
+        for entree_id, taille in qs.values_list('id', 'taille').iterator():
+            if nb <= MAX_ENTREES and total <= MAX_OCTETS:
+                break
+            a_supprimer.append(entree_id)
+            nb    -= 1
+            total -= taille
+        supprimees += ExtractionCache.objects.filter(id__in=a_supprimer).delete()[0]
+
+    if supprimees:
+        _compter('evictions', supprimees)
+    return supprimees
+
+
+def stats():
+    """Compteurs cumulés (tous processus) + occupation du cache."""
+    compteur = CompteurExtractionCache.objects.filter(pk=1).first() or CompteurExtractionCache()
+    lectures = compteur.hits + compteur.misses
+    return {
+        'hits':      compteur.hits,
+        'misses':    compteur.misses,
+        'ecritures': compteur.ecritures,
+        'evictions': compteur.evictions,
+        'taux_hit':  round(compteur.hits / lectures * 100, 1) if lectures else None,
+        'entrees':   ExtractionCache.objects.count(),
+        'octets':    ExtractionCache.objects.aggregate(n=Coalesce(Sum('taille'), 0))['n'],
+    }
+
+
+def vider():
+    return ExtractionCache.objects.all().delete()[0]
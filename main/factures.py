@@ -0,0 +1,163 @@
+"""
+Analyse IA des factures d'énergie — ConformXpert.
+
+Un dossier peut compter deux ans de factures mensuelles : elles sont analysées
+par un job `factures` (worker, hors requête HTTP) qui publie son avancement.
+  - appels via la passerelle main/llm.py (connexions HTTP réutilisées,
+    nouvels essais sur 429 / 529), dans la voie LOT : une action interactive
+    d'un admin passe devant les factures restant à analyser ;
+  - les appels Claude partent en parallèle sur un pool borné (FACTURE_WORKERS),
+    le pool ne touche pas à la base : lectures et écritures restent dans le
+    thread appelant ;
+  - le résultat est mis en cache par SHA-256 du PDF (main/extraction_cache.py) :
+    une facture déposée deux fois, ou ré-analysée, ne repart pas chez Claude,
+    et deux factures identiques d'un même lot ne coûtent qu'un appel.
+"""
+import base64
+import json
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from . import extraction_cache, llm
+
+
+FACTURE_WORKERS = int(os.environ.get('FACTURE_WORKERS', '4'))
+MODELE_FACTURE  = llm.MODELE_FACTURE
+
+PROMPT_FACTURE = """
+Tu es un expert en analyse de factures d'énergie (électricité et gaz naturel).
+Analyse attentivement cette facture et extrais toutes les données disponibles.
+
+Réponds UNIQUEMENT avec un objet JSON valide, sans texte avant ni après, sans balises markdown.
+Schéma exact :
+
+{
+  "fournisseur": "nom du fournisseur (ex: Hydro-Québec, Énergir, EDF...)",
+  "type_energie": "electricite" ou "gaz",
+  "periode_debut": "YYYY-MM-DD",
+  "periode_fin": "YYYY-MM-DD",
+  "nb_jours": 30,
+  "consommation": 1250.5,
+  "unite": "kWh",
+  "montant_ht": 145.20,
+  "montant_ttc": 162.50,
+  "devise": "CAD",
+  "tarif": "nom du tarif (ex: Tarif D, G, DM...)",
+  "puissance_souscrite_kw": null,
+  "numero_client": null,
+  "numero_compteur": null,
+  "adresse_consommation": null,
+  "cout_par_kwh": 0.115,
+  "notes": "toute observation pertinente"
+}
+
+Si une valeur est absente, utilise null.
+Pour cout_par_kwh : calcule-le si possible (montant_ht / consommation).
+Pour le gaz : convertis en kWh équivalent si possible (1 m³ ≈ 10.55 kWh).
+"""
+
+VERSION_PROMPT = extraction_cache.version_prompt(PROMPT_FACTURE, 'facture')
+
+
+# ── Appel Claude ─────────────────────────────────────────────
+
+def _appeler(fichier_path, priorite=llm.LOT):
+    """Exécuté dans le pool (aucun accès base) : envoie le PDF à Claude et retourne le dict extrait."""
+    with open(fichier_path, 'rb') as f:
+        pdf_b64 = base64.standard_b64encode(f.read()).decode('utf-8')
+
+    resp = llm.messages({
+        "model": MODELE_FACTURE,
+        "max_tokens": 1200,
+        "messages": [{
+            "role": "user",
+            "content": [
+                {"type": "document", "source": {"type": "base64", "media_type": "application/pdf", "data": pdf_b64}},
+                {"type": "text", "text": PROMPT_FACTURE},
+            ],
+        }],
+    }, priorite=priorite, motif='facture')
+    raw = llm.texte(resp).strip()
+    raw = re.sub(r'^```(?:json)?\s*', '', raw)
+    raw = re.sub(r'\s*```$', '', raw)
+    return json.loads(raw)
+
+
+def analyser_fichier(fichier_path, fichier_hash=None, priorite=llm.LOT):
+    """Dict extrait d'un PDF de facture, lu dans le cache d'extraction s'il est connu."""
+    fichier_hash = fichier_hash or extraction_cache.hash_fichier(fichier_path)
+    donnees = extraction_cache.lire(fichier_hash, VERSION_PROMPT, MODELE_FACTURE)
+    if donnees is None:
+        donnees = _appeler(fichier_path, priorite)
+        extraction_cache.ecrire(fichier_hash, VERSION_PROMPT, MODELE_FACTURE, donnees)
+    return donnees
+
+
+# ── Lot de factures ──────────────────────────────────────────
+
+def _enregistrer(facture, donnees=None, erreur=None):
+    if erreur is None:
+        facture.analyse_json  = donnees
+        facture.analyse_ok    = True
+        facture.analyse_error = ''
+    else:
+        facture.analyse_error = str(erreur)
+        facture.analyse_ok    = False
+    facture.save(update_fields=['analyse_json', 'analyse_ok', 'analyse_error'])
+
+
+def analyser_lot(factures, progression=None):
+    """
+    Analyse une liste de FactureEnergie et enregistre chaque issue dès qu'elle est connue.
+    `progression(faites, total)` est appelé après chaque facture enregistrée.
+    Retourne [{'id', 'nom', 'ok', 'cache'[, 'error']}] dans l'ordre des factures.
+    """
+    factures = list(factures)
+    total    = len(factures)
+    issues   = {}
+
+    def conclure(facture, donnees=None, erreur=None, cache=False):
+        _enregistrer(facture, donnees, erreur)
+        issue = {'id': facture.id, 'nom': facture.nom, 'ok': erreur is None, 'cache': cache}
+        if erreur is not None:
+            issue['error'] = str(erreur)
+            print(f"ERREUR FACTURE {facture.id} ({facture.nom}) : {erreur}")
+        issues[facture.id] = issue
+        if progression:
+            progression(len(issues), total)
+
+    # Empreintes : les factures identiques partagent un seul appel
+    par_hash = {}
+    for facture in factures:
+        try:
+            h = extraction_cache.hash_fichier(facture.fichier.path)
+        except (OSError, ValueError) as e:
+            conclure(facture, erreur=e)
+            continue
+        par_hash.setdefault(h, []).append(facture)
+
+    a_appeler = []
+    for h, groupe in par_hash.items():
+        donnees = extraction_cache.lire(h, VERSION_PROMPT, MODELE_FACTURE)
+        if donnees is None:
+            a_appeler.append(h)
+        else:
+            for facture in groupe:
+                conclure(facture, donnees, cache=True)
+
+    if a_appeler:
+        with ThreadPoolExecutor(max_workers=min(FACTURE_WORKERS, len(a_appeler)),
+                                thread_name_prefix='facture') as pool:
+            futures = {pool.submit(_appeler, par_hash[h][0].fichier.path): h for h in a_appeler}
+            for fut in as_completed(futures):
+                h = futures[fut]
+                try:
+                    donnees, erreur = fut.result(), None
+                    extraction_cache.ecrire(h, VERSION_PROMPT, MODELE_FACTURE, donnees)
+                except Exception as e:
+                    donnees, erreur = None, e
+                for facture in par_hash[h]:
+                    conclure(facture, donnees, erreur)
+
+    return [issues[f.id] for f in factures]
@@ -0,0 +1,175 @@
+"""
+File de jobs persistée en base — ConformXpert.
+
+Les vues n'exécutent plus les traitements longs (extraction PDF, appels Claude) :
+elles appellent `enqueue()` puis rendent la main. Un ou plusieurs workers
+(`python manage.py run_worker`) réservent les jobs un par un et les exécutent.
+Le débit suit donc le nombre de workers, pas le nombre de threads gunicorn.
+
+Pendant l'exécution, le worker rafraîchit `battement_at` toutes les
+JOB_BATTEMENT secondes : un job « en_cours » sans battement depuis JOB_TIMEOUT
+a perdu son worker et est remis en file — ou abandonné si ses tentatives sont
+épuisées (un job qui fait tomber son worker ne boucle pas indéfiniment).
+"""
+import os
+import socket
+import threading
+import traceback
+from datetime import timedelta
+
+from django.db import connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from . import notifications
+from .models import Job
+
+
+# type_job → fonction(job) ; alimenté par @handler (voir main/tasks.py)
+HANDLERS = {}
+
+# Intervalle entre deux battements d'un job en cours
+JOB_BATTEMENT = int(os.environ.get('JOB_HEARTBEAT', '30'))
+# Un job « en_cours » sans battement depuis ce délai est orphelin (worker mort)
+JOB_TIMEOUT = timedelta(seconds=int(os.environ.get('JOB_TIMEOUT', '120')))
+
+
+def handler(type_job):
+    """Décorateur : enregistre la fonction qui exécute un type de job."""
+    def _register(fn):
+        HANDLERS[type_job] = fn
+        return fn
+    return _register
+
+
+def enqueue(type_job, document=None, max_tentatives=3, **payload):
+    """Crée un job en attente et le retourne."""
+    return Job.objects.create(
+        type_job=type_job,
+        document=document,
+        payload=payload,
+        max_tentatives=max_tentatives,
+    )
+
+
+def en_cours_pour(type_job, document):
+    """Job du même type encore en file ou en cours pour ce dossier (évite les doublons)."""
+    return (
+        Job.objects
+        .filter(type_job=type_job, document=document, statut__in=('en_attente', 'en_cours'))
+        .order_by('-created_at')
+        .first()
+    )
+
+
+def publier_progression(job, progression=None, etape=None, texte_partiel=None):
+    """Met à jour l'avancement d'un job en cours (une seule requête UPDATE) et le publie."""
+    champs = {}
+    if progression is not None:
+        champs['progression'] = job.progression = max(0, min(100, int(progression)))
+    if etape is not None:
+        champs['etape'] = job.etape = etape[:200]
+    if texte_partiel is not None:
+        champs['texte_partiel'] = job.texte_partiel = texte_partiel
+    if champs:
+        Job.objects.filter(id=job.id).update(**champs)
+        notifications.publier_job(job.id)
+
+
+def worker_id():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def reserver_prochain(worker=None):
+    """
+    Réserve atomiquement le prochain job exécutable.
+    SKIP LOCKED permet à plusieurs workers de consommer la file sans se bloquer.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        job = (
+            Job.objects
+            .select_for_update(skip_locked=True)
+            .filter(statut='en_attente', execute_apres__lte=now)
+            .order_by('execute_apres', 'id')
+            .first()
+        )
+        if job is None:
+            return None
+        job.statut       = 'en_cours'
+        job.tentatives  += 1
+        job.started_at   = now
+        job.battement_at = now
+        job.worker       = worker or worker_id()
+        job.save(update_fields=['statut', 'tentatives', 'started_at', 'battement_at', 'worker'])
+    return job
+
+
+def _battre(job_id, arret):
+    """Thread de battement d'un job en cours (sa propre connexion, fermée à la fin)."""
+    try:
+        while not arret.wait(JOB_BATTEMENT):
+            try:
+                Job.objects.filter(id=job_id, statut='en_cours').update(battement_at=timezone.now())
+            except Exception as e:
+                print(f"JOB {job_id} BATTEMENT ERREUR: {e}")
+    finally:
+        connection.close()
+
+
+def executer(job):
+    """Exécute un job réservé et enregistre son issue (succès, nouvel essai ou échec)."""
+    fn = HANDLERS.get(job.type_job)
+    arret = threading.Event()
+    battement = threading.Thread(target=_battre, args=(job.id, arret), name=f'job-{job.id}-battement', daemon=True)
+    battement.start()
+    try:
+        if fn is None:
+            raise LookupError(f"Aucun handler pour le type de job « {job.type_job} »")
+        resultat = fn(job)
+    except Exception as e:
+        job.erreur = f"{e}\n\n{traceback.format_exc()}"
+        if job.tentatives < job.max_tentatives:
+            # Backoff exponentiel : 30 s, 60 s, 120 s…
+            job.statut        = 'en_attente'
+            job.execute_apres = timezone.now() + timedelta(seconds=30 * 2 ** (job.tentatives - 1))
+        else:
+            job.statut      = 'echec'
+            job.finished_at = timezone.now()
+        job.save(update_fields=['statut', 'erreur', 'execute_apres', 'finished_at'])
+        notifications.publier_job(job.id)
+        print(f"JOB {job.id} ({job.type_job}) ERREUR tentative {job.tentatives}/{job.max_tentatives} : {e}")
+        return False
+    finally:
+        arret.set()
+
+    job.statut      = 'termine'
+    job.resultat    = resultat if isinstance(resultat, (dict, list)) else None
+    job.erreur      = ''
+    job.progression = 100
+    job.finished_at = timezone.now()
+    job.save(update_fields=['statut', 'resultat', 'erreur', 'progression', 'finished_at'])
+    notifications.publier_job(job.id)
+    return True
+
+
+def recuperer_orphelins():
+    """
+    Jobs dont le worker a disparu (plus de battement depuis JOB_TIMEOUT) : remis
+    en file s'il leur reste des tentatives — celle qui a été interrompue est déjà
+    comptée par reserver_prochain —, sinon passés en échec. Retourne (relancés, abandonnés).
+    """
+    now = timezone.now()
+    limite = now - JOB_TIMEOUT
+    orphelins = Job.objects.filter(statut='en_cours').filter(
+        Q(battement_at__lt=limite) | Q(battement_at__isnull=True, started_at__lt=limite)
+    )
+    abandonnes = orphelins.filter(tentatives__gte=F('max_tentatives')).update(
+        statut='echec', finished_at=now,
+        erreur=f"Worker disparu pendant l'exécution (aucun signe de vie depuis {JOB_TIMEOUT.total_seconds():g} s), "
+               f"tentatives épuisées",
+    )
+    relances = orphelins.filter(tentatives__lt=F('max_tentatives')).update(
+        statut='en_attente', execute_apres=now,
+    )
+    return relances, abandonnes
@@ -0,0 +1,679 @@
+"""
+Passerelle unique vers l'API Claude — ConformXpert.
+
+Tous les appels (détection des rapports, rapport IA, vérification des seuils,
+factures) passent par ce module :
+  - un client HTTP par processus (httpx) garde ses connexions TLS ouvertes :
+    plus de poignée de main TLS à chaque appel ;
+  - noms de modèles, délais et version d'API définis ici une seule fois ;
+  - 429 (limite de débit) et 529 (API surchargée), ainsi que les connexions
+    refusées / coupées, sont retentés avec un backoff exponentiel à gigue
+    (en-tête retry-after respecté) ;
+  - entrées synchrones (`messages`, `flux`) et asynchrones (`messages_async`),
+    plus l'API Message Batches (`lot_soumettre`, `lot_etat`, `lot_resultats`) ;
+  - un ordonnanceur par modèle borne les appels simultanés et les tokens
+    d'entrée par minute (estimés d'après le prompt et la taille des PDF) ;
+    les appels attendent leur tour par voie de priorité : INTERACTIF (action
+    d'un admin) passe devant NORMAL (dépôts) qui passe devant LOT (analyses
+    en masse, rattrapages) ;
+  - chaque appel est journalisé dans AppelLLM (tokens, lectures / écritures du
+    cache de prompt, attente, durée) par un thread écrivain unique par
+    processus ; `bloc_cache` marque la fin d'un préfixe de prompt statique.
+
+ANTHROPIC_BASE_URL permet de viser un autre serveur, par exemple le faux
+serveur local de main/llm_factice.py (`manage.py faux_claude`, `manage.py bench_llm`).
+"""
+import asyncio
+import atexit
+import base64
+import contextlib
+import heapq
+import itertools
+import json
+import os
+import queue
+import random
+import threading
+import time
+import weakref
+
+import httpx
+
+
+URL_BASE    = (os.environ.get('ANTHROPIC_BASE_URL') or 'https://api.anthropic.com').rstrip('/')
+VERSION_API = '2023-06-01'
+BETA_PDF    = {'anthropic-beta': 'pdfs-2024-09-25'}
+
+# Journalisation des appels dans AppelLLM (LLM_JOURNAL=0 pour la couper)
+JOURNAL = os.environ.get('LLM_JOURNAL', '1') != '0'
+
+# ── Modèles ──────────────────────────────────────────────────
+
+MODELE_DETECTION = os.environ.get('LLM_MODELE_DETECTION', 'claude-sonnet-4-5')
+MODELE_RAPPORT   = os.environ.get('LLM_MODELE_RAPPORT',   'claude-sonnet-4-5')
+MODELE_SEUILS    = os.environ.get('LLM_MODELE_SEUILS',    'claude-sonnet-4-5')
+MODELE_FACTURE   = os.environ.get('LLM_MODELE_FACTURE',   'claude-haiku-4-5-20251001')
+
+# ── Délais (s) et nouvels essais ─────────────────────────────
+
+TIMEOUT_CONNEXION = float(os.environ.get('LLM_TIMEOUT_CONNEXION', '10'))
+TIMEOUT_LONG      = float(os.environ.get('LLM_TIMEOUT', '300'))   # extractions, rapport IA
+TIMEOUT_COURT     = 30                                           # appels interactifs
+
+MAX_ESSAIS   = int(os.environ.get('LLM_MAX_ESSAIS', '4'))
+BACKOFF_BASE = float(os.environ.get('LLM_BACKOFF_BASE', '1'))
+BACKOFF_MAX  = 30
+A_REESSAYER  = {429, 529}
+_RESEAU_A_REESSAYER = (httpx.ConnectError, httpx.ConnectTimeout, httpx.RemoteProtocolError)
+
+# Connexions ouvertes vers l'API, par processus
+POOL_CONNEXIONS = int(os.environ.get('LLM_POOL', '20'))
+
+# ── Ordonnancement ───────────────────────────────────────────
+
+# Voies de priorité : la plus petite est servie d'abord
+INTERACTIF, NORMAL, LOT = 0, 1, 2
+
+# Par modèle et par processus : (appels simultanés, tokens d'entrée par minute).
+# Surcharge : LLM_LIMITES="claude-sonnet-4-5=4:100000,claude-haiku-4-5-20251001=8:200000"
+LIMITES_DEFAUT = (int(os.environ.get('LLM_CONCURRENCE', '4')), int(os.environ.get('LLM_TPM', '100000')))
+LIMITES = {MODELE_FACTURE: (8, 200000)}
+for _regle in filter(None, os.environ.get('LLM_LIMITES', '').split(',')):
+    _modele, _, _valeurs = _regle.strip().partition('=')
+    _conc, _, _tpm = _valeurs.partition(':')
+    LIMITES[_modele] = (int(_conc), int(_tpm or LIMITES_DEFAUT[1]))
+
+# Estimation des tokens d'entrée avant l'appel
+CARACTERES_PAR_TOKEN = 3.5     # texte français
+TOKENS_PAR_PAGE_PDF  = 2300    # texte + image de la page
+OCTETS_PAR_PAGE_PDF  = 60000   # quand les pages ne sont pas dénombrables
+TOKENS_IMAGE         = 1600
+
+
+class ErreurLLM(RuntimeError):
+    """Échec définitif d'un appel (statut HTTP, ou None pour une erreur réseau)."""
+
+    def __init__(self, statut, corps):
+        self.statut = statut
+        self.corps  = corps
+        prefixe = f"API Claude {statut}" if statut else "API Claude injoignable"
+        super().__init__(f"{prefixe} : {corps[:300]}")
+
+
+def cle_api():
+    return os.environ.get('ANTHROPIC_API_KEY', '')
+
+
+def texte(reponse):
+    """Texte de la réponse d'un appel `messages` (blocs texte concaténés)."""
+    return "".join(b.get('text', '') for b in reponse.get('content', []) if b.get('type') == 'text')
+
+
+def bloc_cache(texte):
+    """
+    Bloc texte qui clôt un préfixe statique (system, consignes, schéma JSON) :
+    l'API met en cache tout ce qui précède, lu à ~10 % du prix pendant 5 min.
+    Sous 1024 tokens (2048 pour Haiku) le préfixe n'est pas mis en cache.
+    """
+    return {'type': 'text', 'text': texte, 'cache_control': {'type': 'ephemeral'}}
+
+
+# ── Estimation des tokens ────────────────────────────────────
+
+def _tokens_pdf(b64):
+    import io
+    import PyPDF2
+    try:
+        brut = base64.b64decode(b64)
+    except (ValueError, TypeError):
+        return TOKENS_PAR_PAGE_PDF
+    try:
+        pages = len(PyPDF2.PdfReader(io.BytesIO(brut)).pages)
+    except Exception:
+        pages = -(-len(brut) // OCTETS_PAR_PAGE_PDF)
+    return max(1, pages) * TOKENS_PAR_PAGE_PDF
+
+
+def _tokens_contenu(contenu):
+    if isinstance(contenu, str):
+        return len(contenu) / CARACTERES_PAR_TOKEN
+    total = 0
+    for bloc in contenu or []:
+        genre = bloc.get('type')
+        if genre == 'text':
+            total += len(bloc.get('text', '')) / CARACTERES_PAR_TOKEN
+        elif genre == 'document' and bloc.get('source', {}).get('type') == 'base64':
+            total += _tokens_pdf(bloc['source'].get('data', ''))
+        elif genre in ('document', 'image'):
+            total += TOKENS_IMAGE
+    return total
+
+
+def estimer_tokens(payload):
+    """Tokens d'entrée estimés d'une requête (system + messages), avant l'appel."""
+    total = _tokens_contenu(payload.get('system'))
+    for message in payload.get('messages', []):
+        total += _tokens_contenu(message.get('content'))
+    return int(total) + 10
+
+
+def _tokens_factures(usage):
+    """Tokens d'entrée réellement décomptés par l'API (hors lectures de cache)."""
+    if not usage or 'input_tokens' not in usage:
+        return None
+    return usage['input_tokens'] + (usage.get('cache_creation_input_tokens') or 0)
+
+
+# ── Ordonnanceur ─────────────────────────────────────────────
+
+class FileSaturee(TimeoutError):
+    pass
+
+
+class _File:
+    """
+    File d'attente d'un modèle : au plus `concurrence` appels en vol, et un seau
+    de `tpm` tokens d'entrée qui se remplit en continu (tpm / 60 par seconde).
+    Le premier de la file (priorité, puis ordre d'arrivée) part dès qu'une place
+    est libre et que le seau contient son estimation.
+    """
+    _numeros = itertools.count()
+
+    def __init__(self, concurrence, tpm):
+        self.concurrence = max(1, concurrence)
+        self.tpm         = max(1, tpm)
+        self.jetons      = float(self.tpm)
+        self.maj         = time.monotonic()
+        self.en_vol      = 0
+        self.attente     = []   # tas de (priorité, numéro)
+        self.cond        = threading.Condition()
+
+    def _remplir(self):
+        maintenant = time.monotonic()
+        self.jetons = min(self.tpm, self.jetons + (maintenant - self.maj) * self.tpm / 60)
+        self.maj = maintenant
+
+    def _entrer(self, priorite):
+        ticket = (priorite, next(self._numeros))
+        heapq.heappush(self.attente, ticket)
+        return ticket
+
+    def _retirer(self, ticket):
+        self.attente.remove(ticket)
+        heapq.heapify(self.attente)
+        self.cond.notify_all()
+
+    def _essayer(self, ticket, cout):
+        """Sous verrou : prend la place si c'est le tour du ticket (None), sinon attente suggérée (s)."""
+        self._remplir()
+        if self.attente[0] != ticket or self.en_vol >= self.concurrence:
+            return 1.0   # réveillé par notify_all dès que la situation change
+        if self.jetons < cout:
+            return (cout - self.jetons) * 60 / self.tpm
+        heapq.heappop(self.attente)
+        self.en_vol += 1
+        self.jetons -= cout
+        self.cond.notify_all()   # le suivant devient premier
+        return None
+
+    def acquerir(self, cout, priorite, delai_max):
+        fin = time.monotonic() + delai_max
+        with self.cond:
+            ticket = self._entrer(priorite)
+            try:
+                while True:
+                    attente = self._essayer(ticket, cout)
+                    if attente is None:
+                        return
+                    reste = fin - time.monotonic()
+                    if reste <= 0:
+                        raise FileSaturee(f"pas de place après {delai_max:g} s")
+                    self.cond.wait(min(attente, reste))
+            except BaseException:
+                self._retirer(ticket)
+                raise
+
+    async def acquerir_async(self, cout, priorite, delai_max):
+        # Pas de blocage de la boucle : on scrute le tour du ticket
+        fin = time.monotonic() + delai_max
+        with self.cond:
+            ticket = self._entrer(priorite)
+        try:
+            while True:
+                with self.cond:
+                    attente = self._essayer(ticket, cout)
+                if attente is None:
+                    return
+                if time.monotonic() >= fin:
+                    raise FileSaturee(f"pas de place après {delai_max:g} s")
+                await asyncio.sleep(min(attente, 0.05))
+        except BaseException:
+            with self.cond:
+                if ticket in self.attente:
+                    self._retirer(ticket)
+            raise
+
+    def liberer(self, cout, reel=None):
+        with self.cond:
+            self.en_vol -= 1
+            if reel is not None:
+                self._remplir()
+                self.jetons = min(self.tpm, self.jetons + cout - reel)
+            self.cond.notify_all()
+
+    def saturer(self):
+        """429 reçu : le seau est vidé, les appels suivants attendent qu'il se remplisse."""
+        with self.cond:
+            self._remplir()
+            self.jetons = min(self.jetons, 0.0)
+
+    def etat(self):
+        with self.cond:
+            self._remplir()
+            voies = {}
+            for priorite, _ in self.attente:
+                voies[priorite] = voies.get(priorite, 0) + 1
+            return {'en_vol': self.en_vol, 'en_attente': voies, 'jetons': int(self.jetons),
+                    'concurrence': self.concurrence, 'tpm': self.tpm}
+
+
+_files = {}
+
+
+def _file(modele):
+    f = _files.get(modele)
+    if f is None:
+        with _verrou:
+            f = _files.setdefault(modele, _File(*LIMITES.get(modele, LIMITES_DEFAUT)))
+    return f
+
+
+def etat_files():
+    """Occupation des files par modèle (appels en vol, en attente par voie, jetons restants)."""
+    return {modele: f.etat() for modele, f in list(_files.items())}
+
+
+class _Fiche:
+    """Compteurs d'un appel hors file d'attente (Message Batches)."""
+    essais = 0
+    statut = None
+
+
+class _Place:
+    """
+    Place dans la file d'un modèle, et fiche de l'appel : `usage` (réponse API)
+    corrige l'estimation de tokens à la libération, le reste est journalisé.
+    """
+
+    def __init__(self, payload, priorite, motif):
+        self.modele        = payload.get('model', '')
+        self.file          = _file(self.modele)
+        self.estimation    = estimer_tokens(payload)
+        self.cout          = min(self.estimation, self.file.tpm)   # plus gros que le seau : part quand il est plein
+        self.priorite      = priorite
+        self.motif         = motif
+        self.usage         = None
+        self.statut        = None
+        self.essais        = 0
+        self.erreur        = ''
+        self.debut         = time.monotonic()
+        self.envoi         = None   # place obtenue
+        self.premier_token = None
+
+    def obtenue(self):
+        self.envoi = time.monotonic()
+
+    def terminer(self):
+        if self.envoi is not None:
+            self.file.liberer(self.cout, _tokens_factures(self.usage))
+        _journaliser(self)
+
+
+@contextlib.contextmanager
+def _place(payload, priorite, timeout, motif):
+    place = _Place(payload, priorite, motif)
+    try:
+        try:
+            place.file.acquerir(place.cout, priorite, timeout)
+        except FileSaturee as e:
+            raise ErreurLLM(None, f"file d'attente {place.modele} saturée, {e}") from e
+        place.obtenue()
+        yield place
+    except Exception as e:
+        place.statut = getattr(e, 'statut', place.statut)
+        place.erreur = str(e)
+        raise
+    finally:
+        place.terminer()
+
+
+@contextlib.asynccontextmanager
+async def _place_async(payload, priorite, timeout, motif):
+    place = _Place(payload, priorite, motif)
+    try:
+        try:
+            await place.file.acquerir_async(place.cout, priorite, timeout)
+        except FileSaturee as e:
+            raise ErreurLLM(None, f"file d'attente {place.modele} saturée, {e}") from e
+        place.obtenue()
+        yield place
+    except Exception as e:
+        place.statut = getattr(e, 'statut', place.statut)
+        place.erreur = str(e)
+        raise
+    finally:
+        place.terminer()
+
+
+# ── Journal des appels (AppelLLM) ────────────────────────────
+
+_journal  = queue.SimpleQueue()
+_ecrivain = None
+
+
+def _ms(secondes):
+    return max(0, int(secondes * 1000))
+
+
+def _journaliser(place):
+    """Met la fiche en file ; le thread écrivain l'enregistre (aucun accès base ici)."""
+    if not JOURNAL:
+        return
+    fin   = time.monotonic()
+    envoi = place.envoi or fin
+    usage = place.usage or {}
+    _mettre_en_file({
+        'motif':            place.motif[:40],
+        'modele':           place.modele[:60],
+        'priorite':         place.priorite,
+        'statut_http':      place.statut,
+        'essais':           place.essais,
+        'erreur':           place.erreur[:300],
+        'attente_ms':       _ms(envoi - place.debut),
+        'duree_ms':         _ms(fin - envoi),
+        'premier_token_ms': _ms(place.premier_token - envoi) if place.premier_token else None,
+        'tokens_estimes':   place.estimation,
+        'input_tokens':     usage.get('input_tokens') or 0,
+        'output_tokens':    usage.get('output_tokens') or 0,
+        'cache_creation_input_tokens': usage.get('cache_creation_input_tokens') or 0,
+        'cache_read_input_tokens':     usage.get('cache_read_input_tokens') or 0,
+    })
+
+
+def journaliser_resultat_lot(motif, modele, message=None, erreur=''):
+    """Fiche AppelLLM d'une requête d'un Message Batch (usage lu dans son résultat)."""
+    if not JOURNAL:
+        return
+    usage = (message or {}).get('usage') or {}
+    _mettre_en_file({
+        'motif':            motif[:40],
+        'modele':           modele[:60],
+        'priorite':         LOT,
+        'statut_http':      200 if message is not None else None,
+        'essais':           1,
+        'erreur':           erreur[:300],
+        'input_tokens':     usage.get('input_tokens') or 0,
+        'output_tokens':    usage.get('output_tokens') or 0,
+        'cache_creation_input_tokens': usage.get('cache_creation_input_tokens') or 0,
+        'cache_read_input_tokens':     usage.get('cache_read_input_tokens') or 0,
+    })
+
+
+def _mettre_en_file(fiche):
+    global _ecrivain
+    _journal.put(fiche)
+    if _ecrivain is None:
+        with _verrou:
+            if _ecrivain is None:
+                _ecrivain = threading.Thread(target=_ecrire_journal, name='journal-llm', daemon=True)
+                _ecrivain.start()
+                atexit.register(vider_journal)
+
+
+def vider_journal(premiere=None):
+    """Enregistre en bloc les fiches en attente (thread écrivain, et sortie du processus)."""
+    from .models import AppelLLM
+
+    lot = [] if premiere is None else [premiere]
+    while True:
+        try:
+            lot.append(_journal.get_nowait())
+        except queue.Empty:
+            break
+    if not lot:
+        return
+    try:
+        AppelLLM.objects.bulk_create([AppelLLM(**fiche) for fiche in lot], batch_size=200)
+    except Exception as e:
+        print(f"JOURNAL LLM — {len(lot)} fiche(s) perdue(s) : {e}")
+
+
+def _ecrire_journal():
+    from django.db import close_old_connections
+    while True:
+        vider_journal(_journal.get())
+        close_old_connections()
+
+
+# ── Clients ──────────────────────────────────────────────────
+
+_verrou = threading.Lock()
+_client = None
+_clients_async = weakref.WeakKeyDictionary()   # boucle asyncio → AsyncClient
+
+
+def _limites():
+    return httpx.Limits(max_connections=POOL_CONNEXIONS, max_keepalive_connections=POOL_CONNEXIONS)
+
+
+def client():
+    """Client synchrone du processus, partagé par les threads."""
+    global _client
+    if _client is None:
+        with _verrou:
+            if _client is None:
+                _client = httpx.Client(limits=_limites())
+    return _client
+
+
+def client_async():
+    """Client asynchrone de la boucle courante (un AsyncClient ne sert qu'à sa boucle)."""
+    boucle = asyncio.get_running_loop()
+    c = _clients_async.get(boucle)
+    if c is None:
+        if not _clients_async:
+            atexit.register(_fermer_clients_async)
+        c = _clients_async[boucle] = httpx.AsyncClient(limits=_limites())
+    return c
+
+
+async def fermer_client_async():
+    """Ferme le client de la boucle courante — à attendre avant la fin de la boucle (asyncio.run…)."""
+    c = _clients_async.pop(asyncio.get_running_loop(), None)
+    if c is not None:
+        await c.aclose()
+
+
+def _fermer_clients_async():
+    """Sortie du processus : ferme les clients des boucles restées ouvertes."""
+    for boucle, c in list(_clients_async.items()):
+        if boucle.is_closed() or boucle.is_running():
+            continue
+        try:
+            boucle.run_until_complete(c.aclose())
+        except Exception as e:
+            print(f"Fermeture du client LLM asynchrone : {e}")
+    _clients_async.clear()
+
+
+def _requete(c, payload, entetes, timeout, chemin='/v1/messages'):
+    # Sans payload : GET (état et résultats des Message Batches)
+    h = {
+        'content-type':      'application/json',
+        'x-api-key':         cle_api(),
+        'anthropic-version': VERSION_API,
+    }
+    h.update(entetes or {})
+    return c.build_request(
+        'GET' if payload is None else 'POST', f'{URL_BASE}{chemin}',
+        content=None if payload is None else json.dumps(payload).encode('utf-8'), headers=h,
+        timeout=httpx.Timeout(timeout, connect=TIMEOUT_CONNEXION),
+    )
+
+
+def _delai(essai, reponse=None):
+    """Attente avant le nouvel essai : retry-after s'il est fourni, sinon backoff exponentiel à gigue."""
+    if reponse is not None:
+        try:
+            return min(BACKOFF_MAX, float(reponse.headers['retry-after']))
+        except (KeyError, ValueError):
+            pass
+    return random.uniform(0.5, 1.0) * min(BACKOFF_MAX, BACKOFF_BASE * 2 ** essai)
+
+
+def _a_reessayer(essai, statut):
+    if essai + 1 >= MAX_ESSAIS:
+        return False
+    print(f"LLM {statut or 'réseau'} — nouvel essai {essai + 2}/{MAX_ESSAIS}")
+    return True
+
+
+# ── Appels synchrones ────────────────────────────────────────
+
+def _envoyer(payload, entetes, timeout, place=None, stream=False, chemin='/v1/messages'):
+    c = client()
+    fiche = place or _Fiche()
+    for essai in range(MAX_ESSAIS):
+        fiche.essais = essai + 1
+        try:
+            rep = c.send(_requete(c, payload, entetes, timeout, chemin), stream=stream)
+        except _RESEAU_A_REESSAYER as e:
+            if not _a_reessayer(essai, None):
+                raise ErreurLLM(None, str(e)) from e
+            time.sleep(_delai(essai))
+            continue
+        except httpx.HTTPError as e:
+            raise ErreurLLM(None, str(e)) from e
+
+        fiche.statut = rep.status_code
+        if rep.status_code < 400:
+            return rep
+        corps = rep.read().decode('utf-8', errors='replace')
+        rep.close()
+        if rep.status_code == 429 and place is not None:
+            place.file.saturer()
+        if rep.status_code in A_REESSAYER and _a_reessayer(essai, rep.status_code):
+            time.sleep(_delai(essai, rep))
+            continue
+        raise ErreurLLM(rep.status_code, corps)
+
+
+def messages(payload, entetes=None, timeout=TIMEOUT_LONG, priorite=NORMAL, motif=''):
+    """
+    POST /v1/messages ; retourne la réponse JSON (dict). Lève ErreurLLM.
+    L'attente d'une place dans la file du modèle compte dans `timeout`.
+    `motif` (detection, rapport_ia…) classe l'appel dans le journal AppelLLM.
+    """
+    debut = time.monotonic()
+    with _place(payload, priorite, timeout, motif) as place:
+        reste = max(TIMEOUT_CONNEXION, timeout - (time.monotonic() - debut))
+        reponse = _envoyer(payload, entetes, reste, place).json()
+        place.usage = reponse.get('usage')
+        return reponse
+
+
+def flux(payload, entetes=None, timeout=TIMEOUT_LONG, priorite=NORMAL, motif=''):
+    """
+    POST /v1/messages en streaming ; produit les événements SSE (dicts) au fil de l'eau.
+    Seul l'établissement de la réponse est retenté : un flux commencé ne l'est pas.
+    La place dans la file du modèle est tenue jusqu'à la fin du flux, et `timeout`
+    borne l'ensemble : attente de la place, réponse et lecture des événements.
+    """
+    echeance = time.monotonic() + timeout
+    with _place(payload, priorite, timeout, motif) as place:
+        reste = max(TIMEOUT_CONNEXION, echeance - time.monotonic())
+        rep = _envoyer(dict(payload, stream=True), entetes, reste, place, stream=True)
+        try:
+            for ligne in rep.iter_lines():
+                if time.monotonic() > echeance:
+                    raise ErreurLLM(None, f"flux interrompu : délai de {timeout:g} s dépassé")
+                if not ligne.startswith('data:'):
+                    continue
+                evt = json.loads(ligne[5:].strip())
+                if evt.get('type') == 'error':
+                    raise ErreurLLM(None, evt.get('error', {}).get('message', str(evt)))
+                genre = evt.get('type')
+                if genre == 'message_start':
+                    place.usage = evt.get('message', {}).get('usage') or {}
+                elif genre == 'message_delta' and evt.get('usage'):
+                    place.usage = {**(place.usage or {}), **evt['usage']}
+                elif genre == 'content_block_delta' and place.premier_token is None:
+                    place.premier_token = time.monotonic()
+                yield evt
+        except httpx.HTTPError as e:
+            raise ErreurLLM(None, str(e)) from e
+        finally:
+            rep.close()
+
+
+# ── Appels asynchrones ───────────────────────────────────────
+
+async def messages_async(payload, entetes=None, timeout=TIMEOUT_LONG, priorite=NORMAL, motif=''):
+    """Équivalent asynchrone de `messages` (pour lancer de nombreux appels avec asyncio.gather)."""
+    async with _place_async(payload, priorite, timeout, motif) as place:
+        reponse = await _envoyer_async(payload, entetes, timeout, place)
+        place.usage = reponse.get('usage')
+        return reponse
+
+
+async def _envoyer_async(payload, entetes, timeout, place):
+    c = client_async()
+    for essai in range(MAX_ESSAIS):
+        place.essais = essai + 1
+        try:
+            rep = await c.send(_requete(c, payload, entetes, timeout))
+        except _RESEAU_A_REESSAYER as e:
+            if not _a_reessayer(essai, None):
+                raise ErreurLLM(None, str(e)) from e
+            await asyncio.sleep(_delai(essai))
+            continue
+        except httpx.HTTPError as e:
+            raise ErreurLLM(None, str(e)) from e
+
+        place.statut = rep.status_code
+        if rep.status_code < 400:
+            return rep.json()
+        if rep.status_code == 429:
+            place.file.saturer()
+        if rep.status_code in A_REESSAYER and _a_reessayer(essai, rep.status_code):
+            await asyncio.sleep(_delai(essai, rep))
+            continue
+        raise ErreurLLM(rep.status_code, rep.text)
+
+
+# ── Message Batches (traitement différé, à moitié prix) ──────
+
+def lot_soumettre(requetes, entetes=None):
+    """POST /v1/messages/batches ; `requetes` = [{'custom_id', 'params'}]. Retourne le lot (dict, dont 'id')."""
+    return _envoyer({'requests': requetes}, entetes, TIMEOUT_LONG, chemin='/v1/messages/batches').json()
+
+
+def lot_etat(lot_id):
+    """Lot (dict) : processing_status ('in_progress', 'canceling', 'ended'), request_counts…"""
+    return _envoyer(None, None, TIMEOUT_COURT, chemin=f'/v1/messages/batches/{lot_id}').json()
+
+
+def lot_resultats(lot_id):
+    """
+    Résultats d'un lot terminé, lus au fil du téléchargement (JSONL) : un dict par
+    requête, {'custom_id', 'result': {'type': 'succeeded' | 'errored' | …, 'message' | 'error'}}.
+    """
+    rep = _envoyer(None, None, TIMEOUT_LONG, stream=True, chemin=f'/v1/messages/batches/{lot_id}/results')
+    try:
+        for ligne in rep.iter_lines():
+            if ligne.strip():
+                yield json.loads(ligne)
+    except httpx.HTTPError as e:
+        raise ErreurLLM(None, str(e)) from e
+    finally:
+        rep.close()
@@ -0,0 +1,202 @@
+"""
+Faux serveur de l'API Claude — ConformXpert.
+
+Répond à POST /v1/messages (JSON ou streaming SSE) avec un texte fixe, après
+une latence simulée, et renvoie une part configurable de 529 (surcharge) ou
+de 429 (limite de débit) pour exercer les nouvels essais de main/llm.py.
+Il compte les requêtes et les connexions TCP ouvertes, ce qui montre la
+réutilisation des connexions, et simule le cache de prompt : un préfixe clos
+par un bloc `cache_control` est « écrit » à sa première occurrence puis « lu »
+(champs cache_*_input_tokens de l'usage).
+
+Les Message Batches sont aussi simulés (POST /v1/messages/batches, état,
+résultats JSONL) : un lot se termine `latence_lot` secondes après sa
+soumission, une part `taux_erreur_lot` de ses requêtes en erreur.
+
+  python manage.py faux_claude --port 8765 --latence 0.2
+  ANTHROPIC_BASE_URL=http://127.0.0.1:8765 python manage.py runserver
+
+Aucun accès réseau ni clé API n'est nécessaire.
+"""
+import hashlib
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+TEXTE_DEFAUT = '{"ok": true}'
+_LOTS = '/v1/messages/batches'
+
+
+def _blocs(contenu):
+    return [{'type': 'text', 'text': contenu}] if isinstance(contenu, str) else list(contenu or [])
+
+
+def _usage(payload, texte, prefixes_vus):
+    """Usage façon API : ~4 caractères par token, préfixe en cache jusqu'au dernier cache_control."""
+    blocs = _blocs(payload.get('system')) + [b for m in payload.get('messages', []) for b in _blocs(m.get('content'))]
+    tailles = [len(json.dumps(b)) // 4 for b in blocs]
+    fin = max((i + 1 for i, b in enumerate(blocs) if b.get('cache_control')), default=0)
+    prefixe = sum(tailles[:fin])
+    usage = {'input_tokens': sum(tailles[fin:]) + 1, 'output_tokens': max(1, len(texte) // 4),
+             'cache_creation_input_tokens': 0, 'cache_read_input_tokens': 0}
+    if prefixe:
+        cle = hashlib.sha256(json.dumps(blocs[:fin], sort_keys=True).encode()).hexdigest()
+        usage['cache_read_input_tokens' if cle in prefixes_vus else 'cache_creation_input_tokens'] = prefixe
+        prefixes_vus.add(cle)
+    return usage
+
+
+class _Gestionnaire(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'   # keep-alive
+    disable_nagle_algorithm = True  # en-têtes et corps écrits séparément : pas d'attente d'ACK différé
+
+    def setup(self):
+        super().setup()
+        with self.server.verrou:
+            self.server.connexions += 1
+
+    def log_message(self, *args):
+        pass
+
+    def _repondre(self, statut, corps, content_type='application/json', entetes=None):
+        data = corps.encode('utf-8')
+        self.send_response(statut)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        for k, v in (entetes or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _introuvable(self):
+        self._repondre(404, json.dumps({'type': 'error', 'error': {'type': 'not_found_error', 'message': self.path}}))
+
+    def do_GET(self):
+        serveur = self.server
+        with serveur.verrou:
+            serveur.requetes += 1
+        chemin = self.path.rstrip('/')
+        if not chemin.startswith(_LOTS + '/'):
+            return self._introuvable()
+        lot_id, _, suite = chemin[len(_LOTS) + 1:].partition('/')
+        lot = serveur.lots.get(lot_id)
+        if lot is None or suite not in ('', 'results'):
+            return self._introuvable()
+        if suite == '':
+            return self._repondre(200, json.dumps(serveur.etat_lot(lot_id)))
+        if time.monotonic() < lot['fin']:
+            return self._repondre(400, json.dumps({'type': 'error', 'error': {
+                'type': 'invalid_request_error', 'message': 'Batch is still processing'}}))
+        self._repondre(200, "".join(json.dumps(r) + "\n" for r in lot['resultats']),
+                       content_type='application/binary')
+
+    def do_POST(self):
+        serveur = self.server
+        payload = json.loads(self.rfile.read(int(self.headers.get('Content-Length') or 0)) or b'{}')
+        with serveur.verrou:
+            serveur.requetes += 1
+
+        if self.path.rstrip('/') == _LOTS:
+            return self._repondre(200, json.dumps(serveur.creer_lot(payload.get('requests', []))))
+        if self.path.rstrip('/') != '/v1/messages':
+            return self._introuvable()
+
+        time.sleep(serveur.latence)
+        tirage = random.random()
+        if tirage < serveur.taux_529:
+            return self._repondre(529, json.dumps({'type': 'error', 'error': {'type': 'overloaded_error', 'message': 'Overloaded'}}))
+        if tirage < serveur.taux_529 + serveur.taux_429:
+            return self._repondre(429, json.dumps({'type': 'error', 'error': {'type': 'rate_limit_error', 'message': 'Rate limited'}}),
+                                  entetes={'retry-after': '0'})
+
+        texte   = serveur.texte
+        message = serveur.message(payload)
+        usage   = message['usage']
+        if not payload.get('stream'):
+            return self._repondre(200, json.dumps(message))
+
+        evenements = [('message_start', {'type': 'message_start', 'message': dict(message, content=[])}),
+                      ('content_block_start', {'type': 'content_block_start', 'index': 0,
+                                               'content_block': {'type': 'text', 'text': ''}})]
+        for i in range(0, len(texte), 40):
+            evenements.append(('content_block_delta', {'type': 'content_block_delta', 'index': 0,
+                                                       'delta': {'type': 'text_delta', 'text': texte[i:i + 40]}}))
+        evenements += [('content_block_stop', {'type': 'content_block_stop', 'index': 0}),
+                       ('message_delta', {'type': 'message_delta', 'delta': {'stop_reason': 'end_turn'}, 'usage': usage}),
+                       ('message_stop', {'type': 'message_stop'})]
+        corps = "".join(f"event: {nom}\ndata: {json.dumps(d)}\n\n" for nom, d in evenements)
+        self._repondre(200, corps, content_type='text/event-stream')
+
+
+class FauxClaude(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, hote='127.0.0.1', port=0, texte=TEXTE_DEFAUT, latence=0.0, taux_529=0.0, taux_429=0.0,
+                 latence_lot=0.0, taux_erreur_lot=0.0):
+        super().__init__((hote, port), _Gestionnaire)
+        self.texte      = texte
+        self.latence    = latence
+        self.taux_529   = taux_529
+        self.taux_429   = taux_429
+        self.latence_lot     = latence_lot
+        self.taux_erreur_lot = taux_erreur_lot
+        self.requetes   = 0
+        self.connexions = 0
+        self.prefixes_vus = set()
+        self.lots       = {}
+        self.verrou     = threading.Lock()
+
+    def message(self, params):
+        with self.verrou:
+            usage = _usage(params, self.texte, self.prefixes_vus)
+        return {
+            'id': f'msg_factice_{self.requetes}', 'type': 'message', 'role': 'assistant',
+            'model': params.get('model', ''), 'stop_reason': 'end_turn', 'usage': usage,
+            'content': [{'type': 'text', 'text': self.texte}],
+        }
+
+    def creer_lot(self, requetes):
+        resultats = []
+        for r in requetes:
+            if random.random() < self.taux_erreur_lot:
+                resultat = {'type': 'errored', 'error': {'type': 'error', 'error': {
+                    'type': 'invalid_request_error', 'message': 'Erreur simulée'}}}
+            else:
+                resultat = {'type': 'succeeded', 'message': self.message(r.get('params', {}))}
+            resultats.append({'custom_id': r.get('custom_id'), 'result': resultat})
+        with self.verrou:
+            lot_id = f'msgbatch_factice_{len(self.lots) + 1}'
+            self.lots[lot_id] = {'resultats': resultats, 'fin': time.monotonic() + self.latence_lot}
+        return self.etat_lot(lot_id)
+
+    def etat_lot(self, lot_id):
+        lot = self.lots[lot_id]
+        fini = time.monotonic() >= lot['fin']
+        comptes = {'processing': 0, 'succeeded': 0, 'errored': 0, 'canceled': 0, 'expired': 0}
+        for r in lot['resultats']:
+            comptes[r['result']['type'] if fini else 'processing'] += 1
+        return {
+            'id': lot_id, 'type': 'message_batch',
+            'processing_status': 'ended' if fini else 'in_progress',
+            'request_counts': comptes,
+            'results_url': f'{self.url}{_LOTS}/{lot_id}/results' if fini else None,
+        }
+
+    @property
+    def url(self):
+        hote, port = self.server_address[:2]
+        return f"http://{hote}:{port}"
+
+    def remettre_a_zero(self):
+        with self.verrou:
+            self.requetes = self.connexions = 0
+
+
+def demarrer(**options):
+    """Lance un FauxClaude dans un thread (port libre par défaut) et le retourne."""
+    serveur = FauxClaude(**options)
+    threading.Thread(target=serveur.serve_forever, name='faux-claude', daemon=True).start()
+    return serveur
@@ -0,0 +1,113 @@
+"""
+Benchmark de la passerelle Claude (main/llm.py) contre le faux serveur local.
+  python manage.py bench_llm
+  python manage.py bench_llm -n 200 --concurrence 16 --latence 0.05
+  python manage.py bench_llm --taux-529 0.2        # nouvels essais sur surcharge
+
+Compare une connexion neuve par appel (urllib, l'ancien code) à la passerelle
+en séquentiel, en threads et en asyncio ; affiche le débit et le nombre de
+connexions TCP ouvertes. Le faux serveur parle HTTP en clair : en production
+chaque connexion évitée économise en plus une poignée de main TLS.
+
+Mesure enfin l'attente des appels INTERACTIF lancés derrière un lot d'appels
+LOT sur un modèle limité à 2 appels simultanés.
+"""
+import asyncio
+import json
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from django.core.management.base import BaseCommand
+
+from main import llm, llm_factice
+
+
+PAYLOAD = {
+    "model": "bench",
+    "max_tokens": 100,
+    "messages": [{"role": "user", "content": "ping"}],
+}
+
+
+class Command(BaseCommand):
+    help = "Mesure débit et connexions de la passerelle Claude contre le faux serveur local"
+
+    def add_arguments(self, parser):
+        parser.add_argument('-n', type=int, default=100, help="Appels par variante")
+        parser.add_argument('--concurrence', type=int, default=8)
+        parser.add_argument('--latence', type=float, default=0.02, help="Latence simulée par réponse (s)")
+        parser.add_argument('--taux-529', type=float, default=0.0)
+
+    def handle(self, *args, **options):
+        n, concurrence = max(1, options['n']), max(1, options['concurrence'])
+        serveur = llm_factice.demarrer(latence=options['latence'], taux_529=options['taux_529'])
+        llm.URL_BASE = serveur.url
+        llm.BACKOFF_BASE = 0.01
+        llm.JOURNAL = False   # pas de fiches AppelLLM pour des appels factices
+        llm.LIMITES['bench'] = (max(concurrence, 8), 10 ** 9)
+        llm.LIMITES['bench-priorites'] = (2, 10 ** 9)
+
+        self.stdout.write(f"{n} appel(s) par variante, latence simulée {options['latence'] * 1000:.0f} ms")
+        self.stdout.write(f"{'variante':<34} {'durée s':>8} {'appels/s':>9} {'connexions':>11} {'requêtes':>9}")
+
+        self._mesurer(serveur, "urllib, connexion neuve par appel", n, lambda: [self._urllib(serveur.url) for _ in range(n)])
+        self._mesurer(serveur, "passerelle, séquentiel", n, lambda: [llm.messages(PAYLOAD) for _ in range(n)])
+
+        def threads():
+            with ThreadPoolExecutor(max_workers=concurrence) as pool:
+                list(pool.map(lambda _: llm.messages(PAYLOAD), range(n)))
+        self._mesurer(serveur, f"passerelle, {concurrence} threads", n, threads)
+
+        async def lot():
+            sem = asyncio.Semaphore(concurrence)
+
+            async def un():
+                async with sem:
+                    return await llm.messages_async(PAYLOAD)
+            try:
+                await asyncio.gather(*(un() for _ in range(n)))
+            finally:
+                await llm.fermer_client_async()
+        self._mesurer(serveur, f"passerelle async, {concurrence} en vol", n, lambda: asyncio.run(lot()))
+
+        self._priorites(n)
+        serveur.shutdown()
+
+    def _priorites(self, n):
+        payload = dict(PAYLOAD, model='bench-priorites')
+
+        def appel(priorite):
+            t0 = time.perf_counter()
+            llm.messages(payload, priorite=priorite)
+            return time.perf_counter() - t0
+
+        with ThreadPoolExecutor(max_workers=n + 5) as pool:
+            lots = [pool.submit(appel, llm.LOT) for _ in range(n)]
+            time.sleep(0.05)
+            interactifs = [pool.submit(appel, llm.INTERACTIF) for _ in range(5)]
+            wait(lots + interactifs)
+
+        def moyenne(futs):
+            return sum(f.result() for f in futs) / len(futs)
+
+        self.stdout.write(
+            f"priorités (2 en vol) : INTERACTIF {moyenne(interactifs) * 1000:.0f} ms en moyenne, "
+            f"LOT {moyenne(lots) * 1000:.0f} ms ({n} en file)"
+        )
+
+    def _mesurer(self, serveur, nom, n, fn):
+        serveur.remettre_a_zero()
+        t0 = time.perf_counter()
+        fn()
+        duree = time.perf_counter() - t0
+        self.stdout.write(f"{nom:<34} {duree:>8.2f} {n / duree:>9.1f} {serveur.connexions:>11} {serveur.requetes:>9}")
+
+    def _urllib(self, url):
+        req = urllib.request.Request(
+            f"{url}/v1/messages", data=json.dumps(PAYLOAD).encode('utf-8'),
+            headers={"Content-Type": "application/json", "x-api-key": "", "anthropic-version": llm.VERSION_API},
+            method="POST",
+        )
+        with urllib.request.urlopen(req, timeout=30) as resp:
+            return json.loads(resp.read().decode('utf-8'))
@@ -0,0 +1,81 @@
+"""
+Microbenchmark du rendu des rapports PDF ReportLab.
+  python manage.py bench_rapports               # 500 rapports, avec et sans cache des styles
+  python manage.py bench_rapports -n 100
+
+Les dossiers sont synthétiques (non enregistrés, toutes normes confondues) :
+rien n'est écrit en base. « Sans cache » vide les caches de main/report_styles.py
+avant chaque rapport, ce qui reproduit la construction des styles à chaque appel.
+"""
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from main import report_styles
+from main.models import Document
+from main.views import construire_rapport_pdf
+
+
+VALEURS = {
+    'RT2012':   {'rt2012_bbio': (30, 80), 'rt2012_cep': (30, 80), 'rt2012_tic': (24, 30),
+                 'rt2012_airtightness': (0.2, 1.2), 'rt2012_enr': (0, 3)},
+    'RE2020':   {'re2020_energy_efficiency': (50, 150), 're2020_carbon_emissions': (100, 250),
+                 're2020_thermal_comfort': (500, 2000)},
+    'PEB':      {'peb_espec': (60, 140), 'peb_ew': (60, 120), 'peb_u_mur': (0.1, 0.4)},
+    'MINERGIE': {'minergie_qh': (30, 90), 'minergie_qtot': (20, 60), 'minergie_n50': (0.3, 1.0)},
+    'LENOZ':    {'lenoz_ep': (50, 130), 'lenoz_u_mur': (0.1, 0.4)},
+}
+PAYS = {'RT2012': 'FR', 'RE2020': 'FR', 'PEB': 'BE', 'MINERGIE': 'CH', 'LENOZ': 'LU'}
+
+
+def dossiers(n, graine=0):
+    rng = random.Random(graine)
+    now = timezone.now()
+    docs = []
+    for i in range(n):
+        norme = rng.choice(list(VALEURS))
+        doc = Document(
+            id=i + 1, name=f"Dossier benchmark {i + 1}", client_name="Client test",
+            norme=norme, pays=PAYS[norme], upload_date=now,
+            admin_notes="Observation de l'expert." if i % 3 == 0 else "",
+        )
+        for champ, (lo, hi) in VALEURS[norme].items():
+            setattr(doc, champ, round(rng.uniform(lo, hi), 2))
+        doc.conformite = doc.calculer_conformite()
+        docs.append(doc)
+    return docs
+
+
+class Command(BaseCommand):
+    help = "Mesure le temps CPU par rapport PDF, avec et sans cache des styles"
+
+    def add_arguments(self, parser):
+        parser.add_argument('-n', type=int, default=500, help="Nombre de rapports à rendre")
+
+    def handle(self, *args, **options):
+        docs = dossiers(max(1, options['n']))
+        construire_rapport_pdf(docs[0])   # imports ReportLab hors chronométrage
+
+        # Variantes alternées rapport par rapport pour neutraliser la dérive ;
+        # le rendu à froid remplit de nouveau les caches pour le rendu suivant
+        sans = avec = 0.0
+        for doc in docs:
+            avec += self._mesurer(doc)
+            report_styles.reinitialiser()
+            sans += self._mesurer(doc)
+
+        n = len(docs)
+        self.stdout.write(f'{n} rapport(s)')
+        self.stdout.write(f'  sans cache : {sans / n * 1000:7.2f} ms CPU / rapport')
+        self.stdout.write(f'  avec cache : {avec / n * 1000:7.2f} ms CPU / rapport')
+        if avec:
+            self.stdout.write(self.style.SUCCESS(
+                f'  gain : {(sans - avec) / n * 1000:.2f} ms / rapport ({(1 - avec / sans) * 100:.0f} %)'
+            ))
+
+    def _mesurer(self, doc):
+        t0 = time.process_time()
+        construire_rapport_pdf(doc)
+        return time.process_time() - t0
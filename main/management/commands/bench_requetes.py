@@ -0,0 +1,60 @@
+"""
+Nombre de requêtes SQL par requête HTTP sur les pages publiques.
+  python manage.py bench_requetes
+  python manage.py bench_requetes --repetitions 50
+  python manage.py bench_requetes --url /faq/ --url /suivi/<token>/
+
+Pour chaque URL : requêtes SQL et durée au premier appel (cache des
+SiteSettings vide) puis en moyenne sur les appels suivants (chemin chaud).
+"""
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+
+from main.models import Document, SiteSettings
+
+
+URLS_DEFAUT = ['/', '/faq/', '/robots.txt', '/favicon.ico']
+
+
+class Command(BaseCommand):
+    help = "Mesure les requêtes SQL par requête HTTP (SiteSettings à froid puis à chaud)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', action='append', dest='urls',
+                            help="URL à mesurer (répétable) ; par défaut pages publiques + suivi")
+        parser.add_argument('--repetitions', type=int, default=20)
+
+    def handle(self, *args, **options):
+        urls = options['urls'] or self._urls_defaut()
+        n = max(1, options['repetitions'])
+        client = Client()
+
+        self.stdout.write(f"{'URL':<40} {'statut':>6} {'SQL froid':>10} {'SQL chaud':>10} {'ms chaud':>9}")
+        with override_settings(ALLOWED_HOSTS=['testserver'], SECURE_SSL_REDIRECT=False):
+            for url in urls:
+                SiteSettings.invalider_cache()
+                with CaptureQueriesContext(connection) as q:
+                    reponse = client.get(url)
+                froid = len(q.captured_queries)
+
+                t0 = time.perf_counter()
+                with CaptureQueriesContext(connection) as q:
+                    for _ in range(n):
+                        client.get(url)
+                duree = (time.perf_counter() - t0) / n
+                chaud = len(q.captured_queries) / n
+
+                self.stdout.write(
+                    f'{url[:40]:<40} {reponse.status_code:>6} {froid:>10} {chaud:>10.1f} {duree * 1000:>9.1f}'
+                )
+
+    def _urls_defaut(self):
+        urls = list(URLS_DEFAUT)
+        token = Document.objects.values_list('tracking_token', flat=True).first()
+        if token:
+            urls.append(f'/suivi/{token}/')
+        return urls
@@ -0,0 +1,36 @@
+"""
+Statistiques et maintenance du cache d'extraction Claude.
+  python manage.py cache_extraction            # statistiques
+  python manage.py cache_extraction --evincer  # applique TTL et limites de taille
+  python manage.py cache_extraction --vider    # supprime toutes les entrées
+"""
+from django.core.management.base import BaseCommand
+
+from main import extraction_cache
+
+
+class Command(BaseCommand):
+    help = "Statistiques / maintenance du cache d'extraction Claude"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--evincer', action='store_true',
+                            help="Supprimer les entrées expirées ou au-delà des limites")
+        parser.add_argument('--vider', action='store_true',
+                            help="Supprimer toutes les entrées")
+
+    def handle(self, *args, **options):
+        if options['vider']:
+            n = extraction_cache.vider()
+            self.stdout.write(self.style.WARNING(f'{n} entrée(s) supprimée(s).'))
+        elif options['evincer']:
+            n = extraction_cache.evincer()
+            self.stdout.write(f'{n} entrée(s) évincée(s).')
+
+        s = extraction_cache.stats()
+        self.stdout.write(
+            f"Entrées : {s['entrees']} / {extraction_cache.MAX_ENTREES}  —  "
+            f"{s['octets'] / 1024:.0f} Ko / {extraction_cache.MAX_OCTETS / 1024 / 1024:.0f} Mo"
+        )
+        taux = f"{s['taux_hit']} %" if s['taux_hit'] is not None else '—'
+        self.stdout.write(f"Hits (appels Claude évités) : {s['hits']}  —  misses : {s['misses']}  —  taux de hit : {taux}")
+        self.stdout.write(f"Écritures : {s['ecritures']}  —  évictions : {s['evictions']}")
@@ -0,0 +1,62 @@
+"""
+Export groupé des rapports PDF + Word des dossiers terminés dans une archive ZIP.
+  python manage.py exporter_rapports --client client@exemple.fr
+  python manage.py exporter_rapports --mois 2026-09 --sortie septembre.zip
+  python manage.py exporter_rapports --mois 2026-09 --workers 8
+
+Même moteur que /historique/export-rapports/ (voir main/export_lot.py).
+Ctrl-C interrompt l'export, annule les rendus en attente et supprime l'archive partielle.
+"""
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from main import export_lot
+
+
+class Command(BaseCommand):
+    help = "Exporte dans un ZIP les rapports PDF et Word des dossiers terminés d'un client et/ou d'un mois"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--client', default='', help="Email ou nom exact du client")
+        parser.add_argument('--mois', default='', help="Mois de dépôt, AAAA-MM")
+        parser.add_argument('--sortie', default='', help="Fichier ZIP (défaut : rapports_<client>_<mois>.zip)")
+        parser.add_argument('--workers', type=int, default=None,
+                            help=f"Processus de rendu (défaut EXPORT_WORKERS = {export_lot.EXPORT_WORKERS})")
+
+    def handle(self, *args, **options):
+        client, mois = options['client'].strip(), options['mois'].strip()
+        if not client and not mois:
+            raise CommandError("Préciser --client et/ou --mois")
+        try:
+            ids = list(export_lot.documents(client, mois).values_list('id', flat=True))
+        except ValueError as e:
+            raise CommandError(str(e))
+        if not ids:
+            self.stdout.write("Aucun dossier terminé pour ces critères.")
+            return
+
+        sortie = options['sortie'] or '_'.join(
+            p for p in ('rapports', export_lot.nom_sur(client) if client else '', mois) if p
+        ) + '.zip'
+
+        def progression(faits, total):
+            self.stdout.write(f'\r  {faits}/{total} dossier(s)', ending='')
+            self.stdout.flush()
+
+        flux = export_lot.flux_zip(ids, workers=options['workers'], progression=progression)
+        taille = 0
+        try:
+            with open(sortie, 'wb') as f:
+                for bloc in flux:
+                    f.write(bloc)
+                    taille += len(bloc)
+        except BaseException:
+            flux.close()
+            if os.path.exists(sortie):
+                os.unlink(sortie)
+            self.stdout.write('')
+            raise
+
+        self.stdout.write('')
+        self.stdout.write(self.style.SUCCESS(f'{len(ids)} dossier(s) → {sortie} ({taille / 1024:.0f} Ko)'))
@@ -0,0 +1,48 @@
+"""
+Faux serveur local de l'API Claude (tests, benchmarks, développement hors ligne).
+  python manage.py faux_claude                        # http://127.0.0.1:8765
+  python manage.py faux_claude --latence 0.5 --taux-529 0.1
+  python manage.py faux_claude --texte-fichier reponse.json
+  python manage.py faux_claude --latence-lot 30 --taux-erreur-lot 0.05   # Message Batches
+
+Puis lancer l'application avec ANTHROPIC_BASE_URL=http://127.0.0.1:8765
+(et une ANTHROPIC_API_KEY quelconque). Voir main/llm_factice.py.
+"""
+from django.core.management.base import BaseCommand
+
+from main import llm_factice
+
+
+class Command(BaseCommand):
+    help = "Lance un faux serveur de l'API Claude sur la machine locale"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hote', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument('--latence', type=float, default=0.0, help="Secondes avant chaque réponse")
+        parser.add_argument('--taux-529', type=float, default=0.0, help="Part des réponses 529 (surcharge)")
+        parser.add_argument('--taux-429', type=float, default=0.0, help="Part des réponses 429 (limite de débit)")
+        parser.add_argument('--texte-fichier', default='', help="Fichier dont le contenu sert de réponse")
+        parser.add_argument('--latence-lot', type=float, default=0.0, help="Secondes avant la fin d'un Message Batch")
+        parser.add_argument('--taux-erreur-lot', type=float, default=0.0, help="Part des requêtes d'un lot en erreur")
+
+    def handle(self, *args, **options):
+        texte = llm_factice.TEXTE_DEFAUT
+        if options['texte_fichier']:
+            with open(options['texte_fichier'], encoding='utf-8') as f:
+                texte = f.read()
+
+        serveur = llm_factice.FauxClaude(
+            hote=options['hote'], port=options['port'], texte=texte, latence=options['latence'],
+            taux_529=options['taux_529'], taux_429=options['taux_429'],
+            latence_lot=options['latence_lot'], taux_erreur_lot=options['taux_erreur_lot'],
+        )
+        self.stdout.write(self.style.SUCCESS(f"Faux Claude sur {serveur.url}"))
+        self.stdout.write(f"  export ANTHROPIC_BASE_URL={serveur.url}")
+        try:
+            serveur.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            serveur.server_close()
+            self.stdout.write(f"{serveur.requetes} requête(s) sur {serveur.connexions} connexion(s)")
@@ -0,0 +1,88 @@
+"""
+Recalcule la conformité stockée de tous les dossiers.
+À lancer après toute modification des seuils (main/templatetags/conformity_tags.py) :
+  python manage.py recalculer_conformite
+  python manage.py recalculer_conformite --dry-run
+  python manage.py recalculer_conformite --benchmark   # lot NumPy vs calcul par objet
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from main import rapports_pdf, stats, versions
+from main.models import Document
+from main.templatetags.conformity_tags import (
+    CONFORME, NON_CONFORME, champs_conformite, evaluer_conformite, evaluer_conformite_lot, verdict,
+)
+
+
+class Command(BaseCommand):
+    help = "Recalcule Document.conformite à partir des seuils actuels"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true',
+                            help="Compter les changements sans rien enregistrer")
+        parser.add_argument('--benchmark', action='store_true',
+                            help="Comparer l'évaluation par lot au calcul par objet (n'enregistre rien)")
+
+    def handle(self, *args, **options):
+        if options['benchmark']:
+            return self._benchmark()
+
+        lignes = list(Document.objects.values('id', 'conformite', *sorted(champs_conformite())))
+        res = evaluer_conformite_lot(lignes)
+
+        # Regroupe les dossiers dont le verdict change par nouvelle valeur : 3 UPDATE au plus
+        a_maj = {True: [], False: [], None: []}
+        for ligne, code in zip(lignes, res['conforme']):
+            nouvelle = verdict(code)
+            if nouvelle != ligne['conformite']:
+                a_maj[nouvelle].append(ligne['id'])
+
+        modifies = sum(len(v) for v in a_maj.values())
+        if not options['dry_run']:
+            for valeur, ids in a_maj.items():
+                if ids:
+                    versions.toucher(ids, conformite=valeur)
+            if modifies:
+                # update() ne déclenche pas les signaux : statistiques et rapports PDF en cache
+                stats.invalider()
+                rapports_pdf.planifier([doc_id for ids in a_maj.values() for doc_id in ids])
+
+        suffixe = ' (dry-run, rien enregistré)' if options['dry_run'] else ''
+        self.stdout.write(self.style.SUCCESS(
+            f'{len(lignes)} dossier(s) parcouru(s), {modifies} conformité(s) mise(s) à jour{suffixe}.'
+        ))
+
+    def _benchmark(self):
+        import numpy  # noqa: F401 — import hors chronométrage
+
+        champs = ['id', *sorted(champs_conformite())]
+
+        t0 = time.perf_counter()
+        docs = list(Document.objects.only(*champs))
+        t1 = time.perf_counter()
+        objet = [evaluer_conformite(d) for d in docs]
+        t_objet, t_objet_calcul = time.perf_counter() - t0, time.perf_counter() - t1
+
+        t0 = time.perf_counter()
+        lignes = list(Document.objects.values(*champs))
+        t1 = time.perf_counter()
+        res = evaluer_conformite_lot(lignes)
+        t_lot, t_lot_calcul = time.perf_counter() - t0, time.perf_counter() - t1
+
+        par_id = dict(zip(res['ids'].tolist(), res['conforme'].tolist()))
+        ecarts = sum(1 for d, v in zip(docs, objet) if verdict(par_id[d.id]) != v)
+
+        n = len(docs)
+        self.stdout.write(f'{n} dossier(s)')
+        self.stdout.write(f'  par objet     : {t_objet * 1000:8.1f} ms  (dont calcul {t_objet_calcul * 1000:.1f} ms)')
+        self.stdout.write(f'  par lot NumPy : {t_lot * 1000:8.1f} ms  (dont calcul {t_lot_calcul * 1000:.1f} ms)')
+        if t_lot and t_lot_calcul:
+            self.stdout.write(f'  accélération : ×{t_objet / t_lot:.1f} au total, ×{t_objet_calcul / t_lot_calcul:.1f} sur le calcul')
+        self.stdout.write(
+            f"  conformes {int((res['conforme'] == CONFORME).sum())}, "
+            f"non conformes {int((res['conforme'] == NON_CONFORME).sum())}"
+        )
+        style = self.style.SUCCESS if not ecarts else self.style.ERROR
+        self.stdout.write(style(f'  écarts entre les deux méthodes : {ecarts}'))
@@ -0,0 +1,90 @@
+"""
+Ré-extraction de l'archive par Message Batches, après une modification du prompt de détection.
+  python manage.py reextraire_archive                  # soumet, scrute et importe jusqu'au bout
+  python manage.py reextraire_archive --dry-run        # compte les dossiers à ré-extraire
+  python manage.py reextraire_archive --sans-attendre  # un passage (cron) : soumet, importe les lots terminés
+  python manage.py reextraire_archive --etat
+
+Interruptible à tout moment : relancer la commande reprend où elle s'était
+arrêtée (voir main/reextraction.py).
+"""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from main import llm, reextraction
+from main.models import LotExtraction
+
+
+class Command(BaseCommand):
+    help = "Repasse les dossiers de l'archive par le prompt de détection courant (API Message Batches)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--taille-lot', type=int, default=reextraction.TAILLE_LOT, help="Dossiers par lot")
+        parser.add_argument('--limite', type=int, default=None, help="Nombre maximal de dossiers à soumettre")
+        parser.add_argument('--intervalle', type=float, default=60.0, help="Secondes entre deux scrutations")
+        parser.add_argument('--sans-attendre', action='store_true', help="Un seul passage, sans attendre la fin des lots")
+        parser.add_argument('--dry-run', action='store_true', help="Compter les dossiers à ré-extraire, sans rien soumettre")
+        parser.add_argument('--etat', action='store_true', help="Lister les lots et quitter")
+
+    def handle(self, *args, **options):
+        prompt_version, modele = reextraction.version_courante()
+        if options['etat']:
+            return self._etat(prompt_version, modele)
+
+        if options['dry_run']:
+            n = sum(1 for _ in reextraction.a_traiter(options['limite']))
+            self.stdout.write(f"{n} dossier(s) à ré-extraire (prompt {prompt_version}, {modele})")
+            return
+
+        try:
+            n = reextraction.abandonner_preparations()
+            if n:
+                self.stdout.write(self.style.WARNING(f"{n} lot(s) non confirmé(s) abandonné(s), dossiers resoumis"))
+
+            for elements in reextraction.par_lots(reextraction.a_traiter(options['limite']), options['taille_lot']):
+                lot = reextraction.soumettre(elements)
+                self.stdout.write(f"Lot {lot.lot_id} soumis : {lot.nb_requetes} dossier(s)")
+
+            while True:
+                en_cours = list(LotExtraction.objects.filter(statut__in=['soumis', 'termine']))
+                if not en_cours:
+                    break
+                for lot in en_cours:
+                    self._avancer(lot)
+                if options['sans_attendre'] or not LotExtraction.objects.filter(statut__in=['soumis', 'termine']).exists():
+                    break
+                time.sleep(options['intervalle'])
+        except llm.ErreurLLM as e:
+            raise CommandError(f"{e} — relancer la commande pour reprendre")
+        except KeyboardInterrupt:
+            self.stdout.write(self.style.WARNING("\nInterrompu — relancer la commande pour reprendre"))
+            return
+
+        self._etat(prompt_version, modele)
+
+    def _avancer(self, lot):
+        if lot.statut == 'soumis':
+            etat = reextraction.suivre(lot)
+            if lot.statut == 'soumis':
+                comptes = etat.get('request_counts') or {}
+                self.stdout.write(f"Lot {lot.lot_id} : {comptes.get('processing', '?')} requête(s) en cours")
+                return
+
+        def progression(faits, total):
+            self.stdout.write(f"Lot {lot.lot_id} : {faits}/{total} résultat(s) importé(s)")
+
+        reextraction.importer(lot, progression)
+        self.stdout.write(self.style.SUCCESS(
+            f"Lot {lot.lot_id} importé : {lot.nb_ok} extraction(s), {lot.nb_erreurs} erreur(s)"
+        ))
+
+    def _etat(self, prompt_version, modele):
+        lots = LotExtraction.objects.order_by('created_at')
+        self.stdout.write(f"{'lot':<36} {'prompt':<16} {'statut':<15} {'dossiers':>8} {'ok':>6} {'erreurs':>7}")
+        for lot in lots:
+            courant = '' if (lot.prompt_version, lot.modele) == (prompt_version, modele) else ' (ancien prompt)'
+            self.stdout.write(
+                f"{lot.lot_id or '—':<36} {lot.prompt_version:<16} {lot.get_statut_display():<15} "
+                f"{lot.nb_requetes:>8} {lot.nb_ok:>6} {lot.nb_erreurs:>7}{courant}"
+            )
@@ -0,0 +1,72 @@
+"""
+Worker de la file de jobs (extraction PDF, analyses Claude…).
+Fait aussi tourner le dispatcher des emails en file (main/emails.py).
+Lancer autant de processus que nécessaire :
+  python manage.py run_worker
+  python manage.py run_worker --once        # vide la file puis s'arrête
+"""
+import signal
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from main import emails, extraction_cache, jobs
+
+
+class Command(BaseCommand):
+    help = "Consomme la file de jobs en base"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true',
+                            help="S'arrêter dès que la file est vide")
+        parser.add_argument('--sleep', type=float, default=2.0,
+                            help="Attente (s) entre deux scrutations d'une file vide")
+        parser.add_argument('--max-jobs', type=int, default=0,
+                            help="S'arrêter après N jobs (0 = illimité)")
+
+    def handle(self, *args, **options):
+        import main.tasks  # noqa: F401 — enregistre les handlers
+
+        self._stop = False
+        signal.signal(signal.SIGTERM, self._arreter)
+        signal.signal(signal.SIGINT, self._arreter)
+
+        worker = jobs.worker_id()
+        self.stdout.write(f'Worker {worker} démarré.')
+        if not options['once']:
+            emails.demarrer_dispatcher()
+        traites = 0
+        prochaine_eviction = time.monotonic()
+
+        while not self._stop:
+            close_old_connections()
+            if time.monotonic() >= prochaine_eviction:
+                extraction_cache.evincer()
+                prochaine_eviction = time.monotonic() + extraction_cache.EVICTION_INTERVALLE
+            relances, abandonnes = jobs.recuperer_orphelins()
+            if relances:
+                self.stdout.write(self.style.WARNING(f'{relances} job(s) orphelin(s) remis en file.'))
+            if abandonnes:
+                self.stdout.write(self.style.ERROR(f'{abandonnes} job(s) orphelin(s) abandonné(s), tentatives épuisées.'))
+
+            job = jobs.reserver_prochain(worker)
+            if job is None:
+                if options['once']:
+                    emails.vider_file()
+                    break
+                time.sleep(options['sleep'])
+                continue
+
+            ok = jobs.executer(job)
+            traites += 1
+            self.stdout.write(f'Job {job.id} ({job.type_job}) → {job.statut}')
+            if not ok and job.statut == 'echec':
+                self.stdout.write(self.style.ERROR(f'Job {job.id} abandonné : {job.erreur.splitlines()[0]}'))
+            if options['max_jobs'] and traites >= options['max_jobs']:
+                break
+
+        self.stdout.write(self.style.SUCCESS(f'Worker {worker} arrêté — {traites} job(s) traité(s).'))
+
+    def _arreter(self, signum, frame):
+        self._stop = True
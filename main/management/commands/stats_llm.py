@@ -0,0 +1,71 @@
+"""
+Synthèse des appels Claude journalisés (AppelLLM), par motif.
+  python manage.py stats_llm              # 7 derniers jours
+  python manage.py stats_llm --jours 30
+  python manage.py stats_llm --purger 90  # supprime les fiches de plus de 90 jours
+
+Pour chaque motif : appels, échecs, tokens, part de l'entrée lue dans le cache
+de prompt, coût d'entrée relatif à un envoi sans cache (écriture ×1,25,
+lecture ×0,1), et durées moyennes avec / sans lecture du cache.
+"""
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db.models import Avg, Count, Q, Sum
+from django.utils import timezone
+
+from main.models import AppelLLM
+
+
+class Command(BaseCommand):
+    help = "Tokens, cache de prompt et durées des appels Claude"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--jours', type=int, default=7)
+        parser.add_argument('--purger', type=int, default=0, metavar='JOURS',
+                            help="Supprimer les fiches plus anciennes que JOURS jours")
+
+    def handle(self, *args, **options):
+        if options['purger']:
+            n, _ = AppelLLM.objects.filter(created_at__lt=timezone.now() - timedelta(days=options['purger'])).delete()
+            self.stdout.write(self.style.WARNING(f'{n} fiche(s) supprimée(s).'))
+
+        appels = AppelLLM.objects.filter(created_at__gte=timezone.now() - timedelta(days=options['jours']))
+        lignes = (
+            appels.values('motif')
+            .annotate(
+                n=Count('id'),
+                echecs=Count('id', filter=~Q(statut_http__lt=400)),
+                entree=Sum('input_tokens'),
+                ecrit=Sum('cache_creation_input_tokens'),
+                lu=Sum('cache_read_input_tokens'),
+                sortie=Sum('output_tokens'),
+                attente=Avg('attente_ms'),
+                duree_hit=Avg('duree_ms', filter=Q(cache_read_input_tokens__gt=0)),
+                duree_miss=Avg('duree_ms', filter=Q(cache_read_input_tokens=0, statut_http__lt=400)),
+                ttft_hit=Avg('premier_token_ms', filter=Q(cache_read_input_tokens__gt=0)),
+                ttft_miss=Avg('premier_token_ms', filter=Q(cache_read_input_tokens=0, statut_http__lt=400)),
+            )
+            .order_by('-n')
+        )
+
+        self.stdout.write(f"Appels Claude des {options['jours']} derniers jours")
+        self.stdout.write(
+            f"{'motif':<16} {'appels':>7} {'échecs':>7} {'entrée':>10} {'sortie':>9} "
+            f"{'lu cache':>9} {'coût entrée':>12} {'attente':>8} {'durée hit/miss ms':>18} {'1er token hit/miss':>19}"
+        )
+        for l in lignes:
+            entree, ecrit, lu = l['entree'] or 0, l['ecrit'] or 0, l['lu'] or 0
+            total = entree + ecrit + lu
+            part_lue = f"{100 * lu / total:.0f} %" if total else '—'
+            cout = f"{100 * (entree + 1.25 * ecrit + 0.1 * lu) / total:.0f} %" if total else '—'
+            self.stdout.write(
+                f"{l['motif'] or '—':<16} {l['n']:>7} {l['echecs']:>7} {total:>10} {l['sortie'] or 0:>9} "
+                f"{part_lue:>9} {cout:>12} {_ms(l['attente']):>8} "
+                f"{_ms(l['duree_hit']) + ' / ' + _ms(l['duree_miss']):>18} "
+                f"{_ms(l['ttft_hit']) + ' / ' + _ms(l['ttft_miss']):>19}"
+            )
+
+
+def _ms(valeur):
+    return '—' if valeur is None else f"{valeur:.0f}"
@@ -0,0 +1,30 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0017_job'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExtractionCache',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cle', models.CharField(max_length=64, unique=True)),
+                ('contenu_hash', models.CharField(db_index=True, max_length=64)),
+                ('prompt_version', models.CharField(max_length=16)),
+                ('modele', models.CharField(max_length=60)),
+                ('resultat', models.JSONField()),
+                ('taille', models.PositiveIntegerField(default=0)),
+                ('hits', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('last_hit_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': "Cache d'extraction",
+                'verbose_name_plural': "Cache d'extraction",
+            },
+        ),
+    ]
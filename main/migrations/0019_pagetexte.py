@@ -0,0 +1,28 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0018_extractioncache'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PageTexte',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fichier_hash', models.CharField(max_length=64)),
+                ('page', models.PositiveIntegerField()),
+                ('texte', models.TextField(blank=True, default='')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Texte de page PDF',
+                'verbose_name_plural': 'Textes de pages PDF',
+                'constraints': [
+                    models.UniqueConstraint(fields=('fichier_hash', 'page'), name='main_pagetexte_unique'),
+                ],
+            },
+        ),
+    ]
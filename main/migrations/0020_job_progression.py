@@ -0,0 +1,31 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0019_pagetexte'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='job',
+            name='progression',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='job',
+            name='etape',
+            field=models.CharField(blank=True, default='', max_length=200),
+        ),
+        migrations.AddField(
+            model_name='job',
+            name='texte_partiel',
+            field=models.TextField(blank=True, default=''),
+        ),
+        migrations.AlterField(
+            model_name='job',
+            name='type_job',
+            field=models.CharField(choices=[('ingestion', 'Extraction + analyse du dossier déposé'), ('rapport_ia', 'Génération du rapport IA')], max_length=30),
+        ),
+    ]
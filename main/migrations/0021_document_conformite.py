@@ -0,0 +1,139 @@
+from django.db import migrations, models
+
+
+# Copie figée des règles de conformité à la date de cette migration : elle ne
+# doit pas suivre les évolutions de main/templatetags/conformity_tags.py.
+
+CRITERES_MIN = {'rt2012_enr'}   # les autres critères sont des maxima
+
+NORME_FIELDS = {
+    'RT2012':   ['rt2012_bbio', 'rt2012_cep', 'rt2012_tic', 'rt2012_airtightness', 'rt2012_enr'],
+    'RE2020':   ['re2020_energy_efficiency', 're2020_carbon_emissions', 're2020_thermal_comfort'],
+    'PEB':      ['peb_espec', 'peb_ew', 'peb_u_mur', 'peb_u_toit', 'peb_u_plancher'],
+    'MINERGIE': ['minergie_qh', 'minergie_qtot', 'minergie_n50'],
+    'SIA380':   ['sia380_qh'],
+    'CNEB2020': ['cneb_ei', 'cneb_u_mur', 'cneb_u_toit', 'cneb_u_fenetre', 'cneb_infiltration'],
+    'CNEB2015': ['cneb_ei', 'cneb_u_mur', 'cneb_u_toit', 'cneb_u_fenetre', 'cneb_infiltration'],
+    'LENOZ':    ['lenoz_ep', 'lenoz_ew', 'lenoz_u_mur', 'lenoz_u_toit'],
+}
+
+_BT_MAP = {
+    'individual': 'maison', 'individuel': 'maison', 'house': 'maison',
+    'apartment': 'collectif', 'appartement': 'collectif', 'immeuble': 'collectif',
+    'building': 'collectif',
+}
+
+
+def _par_type(bt, maison, collectif, erp, defaut):
+    return {'maison': maison, 'collectif': collectif, 'erp': erp}.get(bt, defaut)
+
+
+def _seuils(building_type, zone, pays, norme):
+    bt    = (building_type or 'maison').lower().strip()
+    bt    = _BT_MAP.get(bt, bt)
+    z     = (zone  or 'H2').upper().strip()
+    pays  = (pays  or 'FR').upper().strip()
+    norme = (norme or 'RE2020').upper().strip()
+
+    if pays == 'FR' and norme == 'RT2012':
+        return {
+            'rt2012_bbio':         _par_type(bt, 60, 80, 80, 60) + {'H1': 10, 'H2': 0, 'H3': -10}.get(z, 0),
+            'rt2012_cep':          _par_type(bt, 50, 50, 120, 50),
+            'rt2012_tic':          {'H1': 26, 'H2': 27, 'H3': 28}.get(z, 27),
+            'rt2012_airtightness': _par_type(bt, 0.6, 1.0, 1.0, 0.6),
+            'rt2012_enr':          1.0,
+        }
+    if pays == 'BE' and norme == 'PEB':
+        return {
+            'peb_espec':      _par_type(bt, 85, 100, 150, 100),
+            'peb_ew':         _par_type(bt, 100, 100, 100, 100),
+            'peb_u_mur':      0.24,
+            'peb_u_toit':     0.24,
+            'peb_u_plancher': 0.30,
+        }
+    if pays == 'CH' and norme == 'MINERGIE':
+        return {
+            'minergie_qh':   _par_type(bt, 60, 55, 55, 60),
+            'minergie_qtot': _par_type(bt, 35, 35, 45, 38),
+            'minergie_n50':  0.6,
+        }
+    if pays == 'CH' and norme == 'SIA380':
+        return {'sia380_qh': _par_type(bt, 90, 80, 80, 90)}
+    if pays == 'CA' and norme == 'CNEB2020':
+        return {
+            'cneb_ei':           _par_type(bt, 150, 130, 200, 150),
+            'cneb_u_mur':        0.21,
+            'cneb_u_toit':       0.16,
+            'cneb_u_fenetre':    1.4,
+            'cneb_infiltration': 2.5,
+        }
+    if pays == 'CA' and norme == 'CNEB2015':
+        return {
+            'cneb_ei':           _par_type(bt, 170, 150, 220, 170),
+            'cneb_u_mur':        0.24,
+            'cneb_u_toit':       0.18,
+            'cneb_u_fenetre':    1.8,
+            'cneb_infiltration': 2.5,
+        }
+    if pays == 'LU' and norme == 'LENOZ':
+        return {
+            'lenoz_ep':     _par_type(bt, 85, 90, 130, 90),
+            'lenoz_ew':     _par_type(bt, 100, 100, 100, 100),
+            'lenoz_u_mur':  0.22,
+            'lenoz_u_toit': 0.15,
+        }
+    # RE2020 et repli
+    return {
+        're2020_energy_efficiency': _par_type(bt, 75, 70, 150, 100),
+        're2020_thermal_comfort':   {'H1': 1000, 'H2': 1250, 'H3': 1500}.get(z, 1250),
+        're2020_carbon_emissions':  _par_type(bt, 130, 260, 250, 160),
+        're2020_ic_construction':   _par_type(bt, 530, 650, 840, 640),
+    }
+
+
+def evaluer_conformite(doc):
+    fields = NORME_FIELDS.get(doc.norme, [])
+    if not fields:
+        return None
+    s = _seuils(doc.building_type, doc.climate_zone, doc.pays, doc.norme)
+    for field in fields:
+        val = getattr(doc, field, None)
+        if val is None:
+            return None
+        limit = s.get(field)
+        if limit is None:
+            continue
+        if field in CRITERES_MIN:
+            if float(val) < limit:
+                return False
+        elif float(val) > limit:
+            return False
+    return True
+
+
+def calculer_conformite(apps, schema_editor):
+    Document = apps.get_model('main', 'Document')
+    a_maj = []
+    for doc in Document.objects.all().iterator(chunk_size=500):
+        doc.conformite = evaluer_conformite(doc)
+        a_maj.append(doc)
+        if len(a_maj) >= 500:
+            Document.objects.bulk_update(a_maj, ['conformite'])
+            a_maj = []
+    Document.objects.bulk_update(a_maj, ['conformite'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0020_job_progression'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='document',
+            name='conformite',
+            field=models.BooleanField(blank=True, db_index=True, editable=False, null=True),
+        ),
+        migrations.RunPython(calculer_conformite, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,36 @@
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0022_document_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EmailSortant',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('destinataire', models.CharField(max_length=254)),
+                ('bcc', models.CharField(blank=True, default='', max_length=254)),
+                ('reply_to', models.CharField(blank=True, default='', max_length=254)),
+                ('sujet', models.CharField(max_length=255)),
+                ('html', models.TextField()),
+                ('statut', models.CharField(choices=[('en_attente', 'En attente'), ('envoye', 'Envoyé'), ('echec', 'Échec')], default='en_attente', max_length=20)),
+                ('tentatives', models.PositiveSmallIntegerField(default=0)),
+                ('max_tentatives', models.PositiveSmallIntegerField(default=5)),
+                ('envoyer_apres', models.DateTimeField(default=django.utils.timezone.now)),
+                ('erreur', models.TextField(blank=True, default='')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('sent_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Email sortant',
+                'verbose_name_plural': 'Emails sortants',
+                'ordering': ['created_at'],
+                'indexes': [models.Index(fields=['statut', 'envoyer_apres'], name='main_email_file_idx')],
+            },
+        ),
+    ]
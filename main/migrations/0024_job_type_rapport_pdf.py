@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0023_emailsortant'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='job',
+            name='type_job',
+            field=models.CharField(choices=[('ingestion', 'Extraction + analyse du dossier déposé'), ('rapport_ia', 'Génération du rapport IA'), ('rapport_pdf', 'Régénération du rapport PDF en cache')], max_length=30),
+        ),
+    ]
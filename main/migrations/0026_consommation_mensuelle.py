@@ -0,0 +1,118 @@
+from datetime import date
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+# Copie figée de main/consommation.py à la date de cette migration : elle ne
+# doit pas suivre les évolutions du code applicatif.
+
+def _nombre(valeur):
+    try:
+        return float(valeur) if valeur is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _date(valeur):
+    try:
+        return date.fromisoformat(str(valeur)[:10]) if valeur else None
+    except ValueError:
+        return None
+
+
+def mois_de(analyse_json, depose_le=None):
+    d = analyse_json or {}
+    if _nombre(d.get('consommation')) is None:
+        return None
+    debut = _date(d.get('periode_debut')) or (depose_le.date() if depose_le else None)
+    return debut.replace(day=1) if debut else None
+
+
+def agreger(analyses):
+    lignes = [d for d in analyses if d and _nombre(d.get('consommation')) is not None]
+    if not lignes:
+        return None
+
+    conso    = sum(_nombre(d['consommation']) for d in lignes)
+    montants = [m for m in (_nombre(d.get('montant_ttc')) for d in lignes) if m]
+    ponderes = [(_nombre(d.get('cout_par_kwh')), _nombre(d['consommation'])) for d in lignes]
+    ponderes = [(c, q) for c, q in ponderes if c is not None and q]
+    poids    = sum(q for _, q in ponderes)
+    debuts   = [x for x in (_date(d.get('periode_debut')) for d in lignes) if x]
+    fins     = [x for x in (_date(d.get('periode_fin')) for d in lignes) if x]
+    derniere = lignes[-1]
+    return {
+        'consommation':  conso,
+        'montant_ttc':   sum(montants) if montants else None,
+        'cout_par_kwh':  round(sum(c * q for c, q in ponderes) / poids, 4) if poids else None,
+        'nb_factures':   len(lignes),
+        'periode_debut': min(debuts) if debuts else None,
+        'periode_fin':   max(fins) if fins else None,
+        'unite':         (derniere.get('unite') or 'kWh')[:20],
+        'devise':        (derniere.get('devise') or 'CAD')[:10],
+        'fournisseur':   (derniere.get('fournisseur') or '')[:255],
+    }
+
+
+def agreger_factures(apps, schema_editor):
+    FactureEnergie        = apps.get_model('main', 'FactureEnergie')
+    ConsommationMensuelle = apps.get_model('main', 'ConsommationMensuelle')
+
+    seaux, a_maj = {}, []
+    for f in FactureEnergie.objects.order_by('uploaded_at', 'id').iterator(chunk_size=500):
+        f.mois = mois_de(f.analyse_json, f.uploaded_at) if f.analyse_ok else None
+        if f.mois:
+            a_maj.append(f)
+            seaux.setdefault((f.document_id, f.mois, f.type_energie), []).append(f.analyse_json)
+        if len(a_maj) >= 500:
+            FactureEnergie.objects.bulk_update(a_maj, ['mois'])
+            a_maj = []
+    FactureEnergie.objects.bulk_update(a_maj, ['mois'])
+
+    lignes = []
+    for (document_id, mois, type_energie), analyses in seaux.items():
+        champs = agreger(analyses)
+        if champs:
+            lignes.append(ConsommationMensuelle(document_id=document_id, mois=mois, type_energie=type_energie, **champs))
+    ConsommationMensuelle.objects.bulk_create(lignes, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0025_job_type_factures'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='factureenergie',
+            name='mois',
+            field=models.DateField(blank=True, editable=False, null=True),
+        ),
+        migrations.CreateModel(
+            name='ConsommationMensuelle',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('mois', models.DateField()),
+                ('type_energie', models.CharField(choices=[('electricite', 'Électricité'), ('gaz', 'Gaz naturel')], max_length=20)),
+                ('consommation', models.FloatField(default=0)),
+                ('montant_ttc', models.FloatField(blank=True, null=True)),
+                ('cout_par_kwh', models.FloatField(blank=True, null=True)),
+                ('nb_factures', models.PositiveSmallIntegerField(default=0)),
+                ('periode_debut', models.DateField(blank=True, null=True)),
+                ('periode_fin', models.DateField(blank=True, null=True)),
+                ('unite', models.CharField(default='kWh', max_length=20)),
+                ('devise', models.CharField(blank=True, default='CAD', max_length=10)),
+                ('fournisseur', models.CharField(blank=True, default='', max_length=255)),
+                ('document', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='consommations', to='main.document')),
+            ],
+            options={
+                'verbose_name': 'Consommation mensuelle',
+                'verbose_name_plural': 'Consommations mensuelles',
+                'ordering': ['mois', 'type_energie'],
+                'constraints': [models.UniqueConstraint(fields=('document', 'mois', 'type_energie'), name='main_consommation_unique')],
+            },
+        ),
+        migrations.RunPython(agreger_factures, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,38 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0026_consommation_mensuelle'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AppelLLM',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('motif', models.CharField(blank=True, default='', max_length=40)),
+                ('modele', models.CharField(max_length=60)),
+                ('priorite', models.PositiveSmallIntegerField(default=1)),
+                ('statut_http', models.PositiveSmallIntegerField(blank=True, null=True)),
+                ('essais', models.PositiveSmallIntegerField(default=0)),
+                ('erreur', models.CharField(blank=True, default='', max_length=300)),
+                ('attente_ms', models.PositiveIntegerField(default=0)),
+                ('duree_ms', models.PositiveIntegerField(default=0)),
+                ('premier_token_ms', models.PositiveIntegerField(blank=True, null=True)),
+                ('tokens_estimes', models.PositiveIntegerField(default=0)),
+                ('input_tokens', models.PositiveIntegerField(default=0)),
+                ('output_tokens', models.PositiveIntegerField(default=0)),
+                ('cache_creation_input_tokens', models.PositiveIntegerField(default=0)),
+                ('cache_read_input_tokens', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Appel LLM',
+                'verbose_name_plural': 'Appels LLM',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['created_at', 'motif'], name='main_appelllm_date_idx')],
+            },
+        ),
+    ]
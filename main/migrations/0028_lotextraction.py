@@ -0,0 +1,34 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0027_appelllm'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LotExtraction',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('lot_id', models.CharField(blank=True, db_index=True, default='', max_length=100)),
+                ('statut', models.CharField(choices=[('preparation', 'En préparation'), ('soumis', 'Soumis'), ('termine', 'Terminé'), ('importe', 'Importé')], default='preparation', max_length=20)),
+                ('prompt_version', models.CharField(max_length=16)),
+                ('modele', models.CharField(max_length=60)),
+                ('requetes', models.JSONField(default=dict)),
+                ('nb_requetes', models.PositiveIntegerField(default=0)),
+                ('nb_ok', models.PositiveIntegerField(default=0)),
+                ('nb_erreurs', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('soumis_le', models.DateTimeField(blank=True, null=True)),
+                ('termine_le', models.DateTimeField(blank=True, null=True)),
+                ('importe_le', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Lot de ré-extraction',
+                'verbose_name_plural': 'Lots de ré-extraction',
+                'ordering': ['created_at'],
+            },
+        ),
+    ]
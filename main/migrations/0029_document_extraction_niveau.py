@@ -0,0 +1,21 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0028_lotextraction'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='document',
+            name='extraction_niveau',
+            field=models.CharField(blank=True, choices=[('regex', 'Expressions régulières'), ('texte', 'Claude — texte extrait'), ('pdf', 'Claude — PDF natif')], default='', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='document',
+            name='extraction_confiance',
+            field=models.FloatField(blank=True, null=True),
+        ),
+    ]
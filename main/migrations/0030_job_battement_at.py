@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0029_document_extraction_niveau'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='job',
+            name='battement_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
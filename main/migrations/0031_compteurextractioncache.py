@@ -0,0 +1,31 @@
+from django.db import migrations, models
+
+
+def creer_compteur(apps, schema_editor):
+    CompteurExtractionCache = apps.get_model('main', 'CompteurExtractionCache')
+    CompteurExtractionCache.objects.get_or_create(pk=1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0030_job_battement_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CompteurExtractionCache',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hits', models.PositiveBigIntegerField(default=0)),
+                ('misses', models.PositiveBigIntegerField(default=0)),
+                ('ecritures', models.PositiveBigIntegerField(default=0)),
+                ('evictions', models.PositiveBigIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': "Compteurs du cache d'extraction",
+                'verbose_name_plural': "Compteurs du cache d'extraction",
+            },
+        ),
+        migrations.RunPython(creer_compteur, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,24 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0031_compteurextractioncache'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FichierPdf',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fichier_hash', models.CharField(max_length=64, unique=True)),
+                ('nb_pages', models.PositiveIntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Fichier PDF',
+                'verbose_name_plural': 'Fichiers PDF',
+            },
+        ),
+    ]
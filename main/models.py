@@ -1,4 +1,9 @@
+import os
+import time
+
 from django.db import models
+from django.db.models import F
+from django.utils import timezone
 
 
 class Standard(models.Model):
@@ -93,6 +98,13 @@ class Document(models.Model):
         ('autre',             'Autre document'),
     )
 
+    # Niveau d'extraction qui a fourni le résultat (voir views.analyser_par_niveaux)
+    EXTRACTION_NIVEAU_CHOICES = (
+        ('regex', 'Expressions régulières'),
+        ('texte', 'Claude — texte extrait'),
+        ('pdf',   'Claude — PDF natif'),
+    )
+
     name          = models.CharField(max_length=255)
     client_name   = models.CharField(max_length=255, blank=True, default="")
     client_email  = models.EmailField(blank=True, default="")
@@ -117,11 +129,21 @@ class Document(models.Model):
     # ── Rapport IA sauvegardé ──────────────────────────────────────────
     rapport_ia_json = models.TextField(null=True, blank=True)
 
+    # ── Conformité calculée à l'enregistrement (None = non évaluable) ──
+    conformite = models.BooleanField(null=True, blank=True, editable=False, db_index=True)
+
+    # ── Version (ETag / Last-Modified, voir main/versions.py) ──────────
+    # Incrémentée à chaque enregistrement du dossier, de ses messages, factures et analyses
+    version    = models.PositiveIntegerField(default=1, editable=False)
+    modifie_le = models.DateTimeField(default=timezone.now, editable=False)
+
     # ── Type de rapport détecté + métadonnées extraction ──────────────
     type_rapport         = models.CharField(max_length=30, choices=TYPE_RAPPORT_CHOICES, default='inconnu')
     extraction_ok        = models.BooleanField(default=False)
     extraction_json      = models.JSONField(null=True, blank=True)   # résumé brut extrait par Claude
     extraction_alertes   = models.JSONField(null=True, blank=True)   # liste d'alertes de cohérence
+    extraction_niveau    = models.CharField(max_length=10, choices=EXTRACTION_NIVEAU_CHOICES, blank=True, default='')
+    extraction_confiance = models.FloatField(null=True, blank=True)  # 0 à 1, voir views.confiance_extraction
     logiciel_detecte     = models.CharField(max_length=100, blank=True, default='')  # ex: "Climawin v4.2"
     version_norme_detectee = models.CharField(max_length=50, blank=True, default='') # ex: "RT2012 - Arrêté 2010"
 
@@ -179,32 +201,40 @@ class Document(models.Model):
         return self.name
 
     def save(self, *args, **kwargs):
+        from main.templatetags.conformity_tags import champs_conformite
+
         if not self.tracking_token:
             import secrets
             self.tracking_token = secrets.token_urlsafe(32)
+
+        # Conformité stockée : recalculée dès qu'un champ qui l'influence est enregistré
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None:
+            self.conformite = self.calculer_conformite()
+        elif champs_conformite() & set(update_fields):
+            self.conformite = self.calculer_conformite()
+            kwargs['update_fields'] = set(update_fields) | {'conformite'}
+
+        # Incrément fait par la base : une instance chargée avant un versions.toucher()
+        # (message, facture, analyse) ne réécrit jamais un numéro déjà attribué
+        incremente = not self._state.adding
+        if incremente:
+            self.version = F('version') + 1
+        self.modifie_le = timezone.now()
+        if kwargs.get('update_fields') is not None:
+            kwargs['update_fields'] = set(kwargs['update_fields']) | {'version', 'modifie_le'}
         super().save(*args, **kwargs)
+        if incremente:
+            self.refresh_from_db(fields=['version', 'modifie_le'])
+
+    def calculer_conformite(self):
+        from main.templatetags.conformity_tags import evaluer_conformite
+        return evaluer_conformite(self)
 
     @property
     def is_conform(self):
-        from main.templatetags.conformity_tags import get_seuils, NORME_FIELDS, CRITERIA_GREATER_EQUAL
-        norme_fields = NORME_FIELDS.get(self.norme, [])
-        if not norme_fields:
-            return None
-        s = get_seuils(self.building_type, self.climate_zone, self.pays, self.norme)
-        for field, _, _ in norme_fields:
-            val = getattr(self, field, None)
-            if val is None:
-                return None
-            limit = s.get(field)
-            if limit is None:
-                continue
-            if field in CRITERIA_GREATER_EQUAL:
-                if float(val) < limit:
-                    return False
-            else:
-                if float(val) > limit:
-                    return False
-        return True
+        """Conformité stockée (voir save() et la commande recalculer_conformite)."""
+        return self.conformite
 
     @property
     def re2020_is_conform(self):
@@ -236,13 +266,28 @@ class FactureEnergie(models.Model):
     analyse_json  = models.JSONField(null=True, blank=True)
     analyse_ok    = models.BooleanField(default=False)
     analyse_error = models.TextField(blank=True)
+    # Mois (1er jour) où la facture est comptée dans ConsommationMensuelle
+    mois          = models.DateField(null=True, blank=True, editable=False)
 
     class Meta:
         ordering = ['uploaded_at']
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Mois / énergie lus en base : le mois quitté est recalculé à l'enregistrement
+        if 'mois' in field_names and 'type_energie' in field_names and instance.mois:
+            instance._seau_initial = (instance.mois, instance.type_energie)
+        return instance
+
     def save(self, *args, **kwargs):
+        from main.consommation import mois_de
+
         if not self.nom and self.fichier:
             self.nom = self.fichier.name.split('/')[-1]
+        self.mois = mois_de(self.analyse_json, self.uploaded_at or timezone.now()) if self.analyse_ok else None
+        if kwargs.get('update_fields') is not None:
+            kwargs['update_fields'] = set(kwargs['update_fields']) | {'mois'}
         super().save(*args, **kwargs)
 
     def __str__(self):
@@ -253,6 +298,37 @@ class FactureEnergie(models.Model):
         return self.analyse_json or {}
 
 
+class ConsommationMensuelle(models.Model):
+    """
+    Consommation d'un dossier pour un mois et une énergie, agrégée depuis ses
+    factures analysées et tenue à jour à chaque analyse / suppression.
+    Voir main/consommation.py.
+    """
+    document      = models.ForeignKey(Document, on_delete=models.CASCADE, related_name='consommations')
+    mois          = models.DateField()   # 1er jour du mois
+    type_energie  = models.CharField(max_length=20, choices=FactureEnergie.ENERGIE_CHOICES)
+    consommation  = models.FloatField(default=0)
+    montant_ttc   = models.FloatField(null=True, blank=True)
+    cout_par_kwh  = models.FloatField(null=True, blank=True)
+    nb_factures   = models.PositiveSmallIntegerField(default=0)
+    periode_debut = models.DateField(null=True, blank=True)
+    periode_fin   = models.DateField(null=True, blank=True)
+    unite         = models.CharField(max_length=20, default='kWh')
+    devise        = models.CharField(max_length=10, blank=True, default='CAD')
+    fournisseur   = models.CharField(max_length=255, blank=True, default='')
+
+    class Meta:
+        ordering = ['mois', 'type_energie']
+        verbose_name = 'Consommation mensuelle'
+        verbose_name_plural = 'Consommations mensuelles'
+        constraints = [
+            models.UniqueConstraint(fields=['document', 'mois', 'type_energie'], name='main_consommation_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.document_id} — {self.mois:%m/%Y} {self.type_energie} : {self.consommation:.0f} {self.unite}"
+
+
 class DocumentFile(models.Model):
     TYPE_CHOICES = [
         ("document",        "Document"),
@@ -313,14 +389,29 @@ class SiteSettings(models.Model):
         status = "🔴 EN MAINTENANCE" if self.maintenance_mode else "🟢 En ligne"
         return f"Paramètres du site — {status}"
 
+    # Singleton mis en cache dans le processus : lu par MaintenanceMiddleware et le
+    # context processor à chaque requête. Invalidé par save() ; les autres processus
+    # (workers gunicorn) voient la modification au plus tard après DUREE_CACHE secondes.
+    DUREE_CACHE = float(os.environ.get('SITE_SETTINGS_TTL', '30'))
+    _solo = None   # (instance, expire_a)
+
     @classmethod
     def get_solo(cls):
+        cache = cls._solo
+        if cache is not None and cache[1] > time.monotonic():
+            return cache[0]
         obj, _ = cls.objects.get_or_create(pk=1)
+        cls._solo = (obj, time.monotonic() + cls.DUREE_CACHE)
         return obj
 
+    @classmethod
+    def invalider_cache(cls):
+        cls._solo = None
+
     def save(self, *args, **kwargs):
         self.pk = 1
         super().save(*args, **kwargs)
+        SiteSettings.invalider_cache()
 
     def delete(self, *args, **kwargs):
         pass  # Empêcher la suppression
@@ -397,3 +488,240 @@ class Message(models.Model):
 
     def __str__(self):
         return f"[{self.get_auteur_display()}] {self.document.name} — {self.created_at:%d/%m/%Y %H:%M}"
+
+
+class Job(models.Model):
+    """
+    Tâche de fond persistée en base (file de jobs).
+    Consommée par `python manage.py run_worker` — voir main/jobs.py.
+    """
+    TYPE_CHOICES = [
+        ('ingestion',  'Extraction + analyse du dossier déposé'),
+        ('rapport_ia', 'Génération du rapport IA'),
+        ('rapport_pdf', 'Régénération du rapport PDF en cache'),
+        ('factures',   'Analyse IA des factures énergie'),
+    ]
+    STATUT_CHOICES = [
+        ('en_attente', 'En attente'),
+        ('en_cours',   'En cours'),
+        ('termine',    'Terminé'),
+        ('echec',      'Échec'),
+    ]
+
+    type_job       = models.CharField(max_length=30, choices=TYPE_CHOICES)
+    statut         = models.CharField(max_length=20, choices=STATUT_CHOICES, default='en_attente')
+    document       = models.ForeignKey(Document, on_delete=models.CASCADE, null=True, blank=True, related_name='jobs')
+    payload        = models.JSONField(default=dict, blank=True)
+    resultat       = models.JSONField(null=True, blank=True)
+    erreur         = models.TextField(blank=True, default='')
+    tentatives     = models.PositiveSmallIntegerField(default=0)
+    max_tentatives = models.PositiveSmallIntegerField(default=3)
+    execute_apres  = models.DateTimeField(default=timezone.now)
+    worker         = models.CharField(max_length=100, blank=True, default='')
+    # Avancement publié par le handler (lu par le flux SSE de l'interface admin)
+    progression    = models.PositiveSmallIntegerField(default=0)   # 0-100
+    etape          = models.CharField(max_length=200, blank=True, default='')
+    texte_partiel  = models.TextField(blank=True, default='')
+    created_at     = models.DateTimeField(auto_now_add=True)
+    started_at     = models.DateTimeField(null=True, blank=True)
+    battement_at   = models.DateTimeField(null=True, blank=True)   # dernier signe de vie du worker
+    finished_at    = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['created_at']
+        verbose_name = 'Job'
+        verbose_name_plural = 'Jobs'
+        indexes = [
+            models.Index(fields=['statut', 'execute_apres'], name='main_job_file_idx'),
+        ]
+
+    def __str__(self):
+        return f"Job {self.id} — {self.type_job} ({self.get_statut_display()})"
+
+
+class ExtractionCache(models.Model):
+    """
+    Cache persistant des extractions Claude.
+    Clé = SHA-256 du contenu (octets des fichiers) + version du prompt + modèle.
+    Voir main/extraction_cache.py (TTL, éviction, compteurs).
+    """
+    cle            = models.CharField(max_length=64, unique=True)
+    contenu_hash   = models.CharField(max_length=64, db_index=True)
+    prompt_version = models.CharField(max_length=16)
+    modele         = models.CharField(max_length=60)
+    resultat       = models.JSONField()
+    taille         = models.PositiveIntegerField(default=0)   # octets du JSON stocké
+    hits           = models.PositiveIntegerField(default=0)
+    created_at     = models.DateTimeField(auto_now_add=True)
+    last_hit_at    = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Cache d'extraction"
+        verbose_name_plural = "Cache d'extraction"
+
+    def __str__(self):
+        return f"{self.contenu_hash[:12]}… ({self.modele}, prompt {self.prompt_version}) — {self.hits} hit(s)"
+
+
+class CompteurExtractionCache(models.Model):
+    """
+    Compteurs cumulés du cache d'extraction, tous processus confondus (ligne unique pk=1).
+    Incrémentés par main/extraction_cache.py, lus par `manage.py cache_extraction`.
+    """
+    hits      = models.PositiveBigIntegerField(default=0)
+    misses    = models.PositiveBigIntegerField(default=0)
+    ecritures = models.PositiveBigIntegerField(default=0)
+    evictions = models.PositiveBigIntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Compteurs du cache d'extraction"
+        verbose_name_plural = "Compteurs du cache d'extraction"
+
+    def __str__(self):
+        return f"{self.hits} hit(s), {self.misses} miss(es)"
+
+
+class PageTexte(models.Model):
+    """
+    Texte extrait d'une page de PDF, stocké une fois pour toutes.
+    Clé = SHA-256 du fichier + numéro de page (0-based). Voir main/extraction.py.
+    """
+    fichier_hash = models.CharField(max_length=64)
+    page         = models.PositiveIntegerField()
+    texte        = models.TextField(blank=True, default='')
+    created_at   = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'Texte de page PDF'
+        verbose_name_plural = 'Textes de pages PDF'
+        constraints = [
+            models.UniqueConstraint(fields=['fichier_hash', 'page'], name='main_pagetexte_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.fichier_hash[:12]}… p.{self.page + 1}"
+
+
+class FichierPdf(models.Model):
+    """
+    Nombre de pages d'un PDF, par SHA-256 du fichier : quand toutes ses pages sont
+    déjà dans PageTexte, le fichier n'est plus ouvert. Voir main/extraction.py.
+    """
+    fichier_hash = models.CharField(max_length=64, unique=True)
+    nb_pages     = models.PositiveIntegerField()
+    created_at   = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'Fichier PDF'
+        verbose_name_plural = 'Fichiers PDF'
+
+    def __str__(self):
+        return f"{self.fichier_hash[:12]}… ({self.nb_pages} p.)"
+
+
+class EmailSortant(models.Model):
+    """
+    Email en file d'envoi (outbox). Le HTML est rendu à la mise en file :
+    un redémarrage du processus ne perd plus rien. Voir main/emails.py.
+    """
+    STATUT_CHOICES = [
+        ('en_attente', 'En attente'),
+        ('envoye',     'Envoyé'),
+        ('echec',      'Échec'),
+    ]
+
+    destinataire   = models.CharField(max_length=254)
+    bcc            = models.CharField(max_length=254, blank=True, default='')
+    reply_to       = models.CharField(max_length=254, blank=True, default='')
+    sujet          = models.CharField(max_length=255)
+    html           = models.TextField()
+    statut         = models.CharField(max_length=20, choices=STATUT_CHOICES, default='en_attente')
+    tentatives     = models.PositiveSmallIntegerField(default=0)
+    max_tentatives = models.PositiveSmallIntegerField(default=5)
+    # Prochain essai ; repoussé pendant l'envoi (bail) pour qu'un seul processus le prenne
+    envoyer_apres  = models.DateTimeField(default=timezone.now)
+    erreur         = models.TextField(blank=True, default='')
+    created_at     = models.DateTimeField(auto_now_add=True)
+    sent_at        = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['created_at']
+        verbose_name = 'Email sortant'
+        verbose_name_plural = 'Emails sortants'
+        indexes = [
+            models.Index(fields=['statut', 'envoyer_apres'], name='main_email_file_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.sujet} → {self.destinataire} ({self.get_statut_display()})"
+
+
+class AppelLLM(models.Model):
+    """
+    Un appel à l'API Claude : tokens (dont cache de prompt), durées, issue.
+    Journalisé par main/llm.py ; synthèse : `python manage.py stats_llm`.
+    """
+    motif            = models.CharField(max_length=40, blank=True, default='')   # detection, rapport_ia, seuils, facture…
+    modele           = models.CharField(max_length=60)
+    priorite         = models.PositiveSmallIntegerField(default=1)
+    statut_http      = models.PositiveSmallIntegerField(null=True, blank=True)   # None : erreur réseau / file saturée
+    essais           = models.PositiveSmallIntegerField(default=0)
+    erreur           = models.CharField(max_length=300, blank=True, default='')
+    # Durées (ms) : attente d'une place dans la file, puis envoi → fin de la réponse
+    attente_ms       = models.PositiveIntegerField(default=0)
+    duree_ms         = models.PositiveIntegerField(default=0)
+    premier_token_ms = models.PositiveIntegerField(null=True, blank=True)       # streaming uniquement
+    # Tokens : estimation avant l'appel, puis usage renvoyé par l'API
+    tokens_estimes   = models.PositiveIntegerField(default=0)
+    input_tokens     = models.PositiveIntegerField(default=0)
+    output_tokens    = models.PositiveIntegerField(default=0)
+    cache_creation_input_tokens = models.PositiveIntegerField(default=0)
+    cache_read_input_tokens     = models.PositiveIntegerField(default=0)
+    created_at       = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = 'Appel LLM'
+        verbose_name_plural = 'Appels LLM'
+        indexes = [
+            models.Index(fields=['created_at', 'motif'], name='main_appelllm_date_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.motif or self.modele} — {self.statut_http or 'échec'} ({self.duree_ms} ms)"
+
+
+class LotExtraction(models.Model):
+    """
+    Lot de ré-extraction soumis à l'API Message Batches (`manage.py reextraire_archive`).
+    `requetes` : custom_id → [document_id, contenu_hash, issue] ; issue vaut None tant
+    que le résultat n'est pas importé, puis 'ok' ou le motif de l'échec.
+    Voir main/reextraction.py.
+    """
+    STATUT_CHOICES = [
+        ('preparation', 'En préparation'),   # enregistré, envoi à l'API non confirmé
+        ('soumis',      'Soumis'),
+        ('termine',     'Terminé'),          # résultats disponibles, pas encore importés
+        ('importe',     'Importé'),
+    ]
+
+    lot_id         = models.CharField(max_length=100, blank=True, default='', db_index=True)
+    statut         = models.CharField(max_length=20, choices=STATUT_CHOICES, default='preparation')
+    prompt_version = models.CharField(max_length=16)
+    modele         = models.CharField(max_length=60)
+    requetes       = models.JSONField(default=dict)
+    nb_requetes    = models.PositiveIntegerField(default=0)
+    nb_ok          = models.PositiveIntegerField(default=0)
+    nb_erreurs     = models.PositiveIntegerField(default=0)
+    created_at     = models.DateTimeField(auto_now_add=True)
+    soumis_le      = models.DateTimeField(null=True, blank=True)
+    termine_le     = models.DateTimeField(null=True, blank=True)
+    importe_le     = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['created_at']
+        verbose_name = 'Lot de ré-extraction'
+        verbose_name_plural = 'Lots de ré-extraction'
+
+    def __str__(self):
+        return f"{self.lot_id or 'lot non soumis'} — {self.nb_requetes} dossier(s) ({self.get_statut_display()})"
@@ -0,0 +1,280 @@
+"""
+Notifications de changement d'état des dossiers — ConformXpert.
+
+`ia_rapport_status` ne relit plus le dossier à chaque scrutation : les requêtes
+en attente (long-poll) dorment sur une Condition du processus et sont réveillées
+quand `status` ou la présence de `rapport_ia_json` change.
+
+Les changements faits dans un autre processus (worker de jobs, autre worker
+gunicorn) arrivent :
+  - sous PostgreSQL, par LISTEN/NOTIFY — une seule connexion d'écoute par processus,
+    ouverte à la première attente (un processus sans long-poll, comme le
+    worker de jobs, n'en ouvre pas) ;
+  - sinon (SQLite en dev), par une requête de scrutation commune à toutes les
+    attentes du processus, une fois par intervalle.
+Le coût ne dépend donc pas du nombre de tableaux de bord ouverts.
+
+Les jobs publient de même leur avancement (`publier_job`, sous PostgreSQL) :
+le flux SSE du rapport IA dort entre deux avancements au lieu de relire le job
+à intervalle fixe.
+"""
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from django.db import connections, transaction
+
+
+CANAL = 'conformxpert_documents'
+
+ATTENTE_MAX = float(os.environ.get('LONGPOLL_TIMEOUT', '20'))
+INTERVALLE_SCRUTATION = float(os.environ.get('NOTIF_POLL_INTERVAL', '1.0'))
+# États gardés en mémoire au plus (les plus récents ; ceux des dossiers surveillés restent)
+ETATS_MAX = int(os.environ.get('NOTIF_ETATS_MAX', '2000'))
+
+_cond      = threading.Condition()
+_etats     = OrderedDict()   # doc_id → {'status': str, 'has_rapport': bool}, du plus ancien au plus récent
+_attentes  = {}    # doc_id → nombre de requêtes en attente
+_jobs      = OrderedDict()   # job_id → nombre d'avancements reçus (tic), du plus ancien au plus récent
+_ecouteur  = None  # thread d'écoute (démarré par le premier attendre())
+
+
+def _postgres():
+    return connections['default'].vendor == 'postgresql'
+
+
+def jeton(etat):
+    """Représentation compacte d'un état, renvoyée par le client dans ?depuis=."""
+    return f"{etat['status']}:{int(etat['has_rapport'])}"
+
+
+# ── Publication ──────────────────────────────────────────────
+
+def _enregistrer(doc_id, status, has_rapport):
+    """Met à jour l'état connu et réveille les attentes si quelque chose a changé."""
+    etat = {'status': status, 'has_rapport': bool(has_rapport)}
+    with _cond:
+        if _etats.get(doc_id) == etat:
+            return False
+        _etats[doc_id] = etat
+        _etats.move_to_end(doc_id)
+        _elaguer()
+        _cond.notify_all()
+    return True
+
+
+def _elaguer():
+    """Sous _cond : ramène _etats sous ETATS_MAX (par dixième, pour ne pas élaguer à chaque ajout)."""
+    exces = len(_etats) - ETATS_MAX
+    if exces <= 0:
+        return
+    exces += ETATS_MAX // 10
+    for doc_id in [d for d in _etats if d not in _attentes][:exces]:
+        del _etats[doc_id]
+
+
+def publier(document):
+    """
+    Appelé après l'enregistrement d'un dossier (signal post_save). Rien n'est
+    publié avant le commit : une transaction annulée ne réveille personne.
+    """
+    doc_id, status, has_rapport = document.id, document.status, bool(document.rapport_ia_json)
+
+    def _publier():
+        if _ecouteur is not None:   # sinon aucune attente locale à réveiller
+            _enregistrer(doc_id, status, has_rapport)
+        if _postgres():
+            payload = json.dumps({'id': doc_id, 'status': status, 'has_rapport': has_rapport})
+            try:
+                with connections['default'].cursor() as cur:
+                    cur.execute("SELECT pg_notify(%s, %s)", [CANAL, payload])
+            except Exception as e:
+                print(f"NOTIFY ERREUR: {e}")
+
+    transaction.on_commit(_publier)
+
+
+def _signaler_job(job_id):
+    with _cond:
+        _jobs[job_id] = _jobs.get(job_id, 0) + 1
+        _jobs.move_to_end(job_id)
+        while len(_jobs) > ETATS_MAX:
+            _jobs.popitem(last=False)
+        _cond.notify_all()
+
+
+def publier_job(job_id):
+    """Avancement ou fin d'un job (main/jobs.py) : réveille, après le commit, les flux qui le suivent."""
+    def _publier():
+        if _ecouteur is not None:
+            _signaler_job(job_id)
+        if _postgres():
+            try:
+                with connections['default'].cursor() as cur:
+                    cur.execute("SELECT pg_notify(%s, %s)", [CANAL, json.dumps({'job': job_id})])
+            except Exception as e:
+                print(f"NOTIFY ERREUR: {e}")
+
+    transaction.on_commit(_publier)
+
+
+# ── Lecture ──────────────────────────────────────────────────
+
+def _charger(doc_ids):
+    """Lit status / présence du rapport pour plusieurs dossiers en une requête."""
+    from django.db.models import BooleanField, ExpressionWrapper, Q
+    from .models import Document
+
+    lignes = (
+        Document.objects.filter(id__in=doc_ids)
+        .annotate(has_rapport=ExpressionWrapper(
+            Q(rapport_ia_json__isnull=False) & ~Q(rapport_ia_json=''),
+            output_field=BooleanField(),
+        ))
+        .values_list('id', 'status', 'has_rapport')
+    )
+    return {doc_id: (status, has_rapport) for doc_id, status, has_rapport in lignes}
+
+
+def etat(doc_id):
+    """État courant d'un dossier (None s'il n'existe pas)."""
+    with _cond:
+        # L'état en mémoire ne suit les autres processus que si l'écouteur tourne ;
+        # hors PostgreSQL, seul l'état des dossiers surveillés est tenu à jour
+        fiable = _ecouteur is not None and (_postgres() or doc_id in _attentes)
+        connu = _etats.get(doc_id) if fiable else None
+    if connu is not None:
+        return dict(connu)
+    charge = _charger([doc_id]).get(doc_id)
+    if charge is None:
+        return None
+    lu = {'status': charge[0], 'has_rapport': bool(charge[1])}
+    if _ecouteur is None:
+        return lu
+    with _cond:
+        # Un NOTIFY reçu depuis la lecture est plus récent que la ligne lue : il l'emporte
+        connu = _etats.get(doc_id) if _postgres() else None
+        if connu is None:
+            _enregistrer(doc_id, lu['status'], lu['has_rapport'])
+            return lu
+        return dict(connu)
+
+
+def attendre(doc_id, depuis, timeout=None):
+    """
+    Long-poll : attend que l'état du dossier diffère du jeton `depuis`
+    (ou l'expiration du délai) puis retourne l'état courant.
+    """
+    _demarrer_ecouteur()
+    courant = etat(doc_id)
+    if courant is None or jeton(courant) != depuis:
+        return courant
+
+    timeout = ATTENTE_MAX if timeout is None else timeout
+    with _cond:
+        _attentes[doc_id] = _attentes.get(doc_id, 0) + 1
+        try:
+            _cond.wait_for(
+                lambda: doc_id in _etats and jeton(_etats[doc_id]) != depuis,
+                timeout=timeout,
+            )
+            return dict(_etats.get(doc_id) or courant)
+        finally:
+            _attentes[doc_id] -= 1
+            if not _attentes[doc_id]:
+                del _attentes[doc_id]
+                if not _postgres():
+                    # Plus personne ne surveille ce dossier : l'état local n'est plus rafraîchi
+                    _etats.pop(doc_id, None)
+
+
+def tic_job(job_id):
+    """Compteur d'avancements du job, à relever AVANT de relire le job en base (voir attendre_job)."""
+    if _postgres():
+        _demarrer_ecouteur()
+    with _cond:
+        return _jobs.get(job_id, 0)
+
+
+def attendre_job(job_id, tic, timeout, secours):
+    """
+    Attend un avancement du job publié depuis le relevé `tic`, au plus `timeout` secondes.
+    Hors PostgreSQL, les autres processus ne publient rien : simple attente de `secours` secondes.
+    """
+    if not _postgres():
+        time.sleep(min(timeout, secours))
+        return
+    with _cond:
+        _cond.wait_for(lambda: _jobs.get(job_id, 0) != tic, timeout=timeout)
+
+
+# ── Écoute des autres processus ──────────────────────────────
+
+def _demarrer_ecouteur():
+    global _ecouteur
+    if _ecouteur is not None:
+        return
+    with _cond:
+        if _ecouteur is not None:
+            return
+        cible = _ecouter_postgres if _postgres() else _scruter
+        _ecouteur = threading.Thread(target=cible, name='notifications-documents', daemon=True)
+        _ecouteur.start()
+
+
+def _ecouter_postgres():
+    """LISTEN sur une connexion dédiée ; chaque NOTIFY met à jour l'état local."""
+    import select
+    import psycopg2
+
+    while True:
+        conn = None
+        try:
+            conn = psycopg2.connect(**connections['default'].get_connection_params())
+            conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+            with conn.cursor() as cur:
+                cur.execute(f"LISTEN {CANAL}")
+            # Ce qui a changé avant l'écoute n'a pas été notifié : on repart de la base
+            with _cond:
+                _etats.clear()
+            while True:
+                if select.select([conn], [], [], 30) == ([], [], []):
+                    continue
+                conn.poll()
+                while conn.notifies:
+                    notif = conn.notifies.pop(0)
+                    data = json.loads(notif.payload)
+                    if 'job' in data:
+                        _signaler_job(data['job'])
+                    else:
+                        _enregistrer(data['id'], data['status'], data['has_rapport'])
+        except Exception as e:
+            print(f"LISTEN ERREUR: {e} — reconnexion dans 5 s")
+            # Des notifications ont pu être perdues : on oublie l'état local
+            with _cond:
+                _etats.clear()
+            time.sleep(5)
+        finally:
+            if conn is not None:
+                conn.close()
+
+
+def _scruter():
+    """Secours hors PostgreSQL : une requête par intervalle pour tous les dossiers surveillés."""
+    from django.db import close_old_connections
+
+    while True:
+        time.sleep(INTERVALLE_SCRUTATION)
+        with _cond:
+            ids = list(_attentes)
+        if not ids:
+            continue
+        try:
+            for doc_id, (status, has_rapport) in _charger(ids).items():
+                _enregistrer(doc_id, status, has_rapport)
+        except Exception as e:
+            print(f"SCRUTATION ERREUR: {e}")
+        finally:
+            close_old_connections()
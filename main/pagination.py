@@ -0,0 +1,15 @@
+"""
+Pagination de l'API REST.
+"""
+from rest_framework.pagination import CursorPagination
+
+
+class DocumentCursorPagination(CursorPagination):
+    """
+    Pagination par curseur (?cursor=…) : coût constant quelle que soit la page,
+    contrairement à OFFSET. Tri stable sur (upload_date, id).
+    """
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+    ordering = ('-upload_date', '-id')
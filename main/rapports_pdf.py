@@ -0,0 +1,199 @@
+"""
+Cache disque des rapports PDF ReportLab — ConformXpert.
+
+Le rapport d'un dossier ne dépend que des champs du dossier qu'il affiche et
+du gabarit : il est stocké sous RAPPORTS_PDF_DIR/<id>/<empreinte>-g<VERSION_GABARIT>.pdf,
+où l'empreinte couvre ces seuls champs. Un message, une facture ou une analyse,
+qui changent la version du dossier (ETag des vues, main/versions.py) mais
+n'apparaissent pas dans le rapport, ne l'invalident donc pas.
+Un téléchargement répété coûte une lecture de fichier (avec prise en charge
+des requêtes Range et des ETag) au lieu de plusieurs centaines de ms de CPU.
+
+Quand l'empreinte d'un dossier dont le rapport a déjà été produit change, un
+job `rapport_pdf` le régénère en arrière-plan (voir `planifier`, main/signals.py,
+la commande recalculer_conformite et main/tasks.py).
+"""
+import hashlib
+import os
+import re
+import tempfile
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+
+
+# À incrémenter à chaque modification de la mise en page ou des seuils du rapport
+VERSION_GABARIT = '1'
+
+RACINE = os.environ.get('RAPPORTS_PDF_DIR') or os.path.join(settings.MEDIA_ROOT, 'rapports_cache')
+
+TAILLE_BLOC = 64 * 1024
+
+_RANGE = re.compile(r'bytes=(\d*)-(\d*)')
+
+
+def _dossier(doc_id):
+    return os.path.join(RACINE, str(doc_id))
+
+
+def champs_rapport():
+    """Champs du dossier affichés par construire_rapport_pdf (les seuils suivent VERSION_GABARIT)."""
+    from .templatetags.conformity_tags import champs_conformite
+    return ('name', 'client_name', 'client_email', 'admin_notes', 'upload_date', 'conformite',
+            *sorted(champs_conformite()))
+
+
+def empreinte(document):
+    valeurs = '\x1f'.join(repr(getattr(document, champ)) for champ in champs_rapport())
+    return hashlib.sha256(valeurs.encode('utf-8')).hexdigest()[:20]
+
+
+def nom_fichier(document):
+    return f"{empreinte(document)}-g{VERSION_GABARIT}.pdf"
+
+
+def chemin(document):
+    return os.path.join(_dossier(document.id), nom_fichier(document))
+
+
+def chemin_a_jour(document):
+    """Chemin du rapport correspondant à la version actuelle du dossier, None s'il n'existe pas."""
+    p = chemin(document)
+    return p if os.path.exists(p) else None
+
+
+def deja_produit(doc_id):
+    """Un rapport (même ancien) existe-t-il pour ce dossier ? Seuls ceux-là sont régénérés d'avance."""
+    try:
+        return any(n.endswith('.pdf') for n in os.listdir(_dossier(doc_id)))
+    except FileNotFoundError:
+        return False
+
+
+def planifier(doc_ids):
+    """
+    Met en file la régénération des rapports déjà produits de ces dossiers
+    (sauf job déjà en attente, qui relira la dernière version). Retourne le nombre de jobs créés.
+    """
+    from .models import Job
+
+    doc_ids = [doc_id for doc_id in doc_ids if deja_produit(doc_id)]
+    if not doc_ids:
+        return 0
+    en_file = set(
+        Job.objects
+        .filter(type_job='rapport_pdf', statut='en_attente', document_id__in=doc_ids)
+        .values_list('document_id', flat=True)
+    )
+    nouveaux = [
+        Job(type_job='rapport_pdf', document_id=doc_id, payload={}, max_tentatives=2)
+        for doc_id in doc_ids if doc_id not in en_file
+    ]
+    Job.objects.bulk_create(nouveaux, batch_size=500)
+    return len(nouveaux)
+
+
+def generer(document):
+    """
+    Construit le rapport de la version courante, l'écrit de façon atomique
+    (fichier temporaire + rename) et supprime les versions précédentes.
+    """
+    from .views import construire_rapport_pdf
+
+    dossier = _dossier(document.id)
+    os.makedirs(dossier, exist_ok=True)
+    cible = chemin(document)
+
+    # Rendu directement dans le fichier (pas de copie en mémoire), publié par rename
+    fd, tmp = tempfile.mkstemp(dir=dossier, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            construire_rapport_pdf(document, output=f)
+        os.replace(tmp, cible)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+
+    for nom in os.listdir(dossier):
+        if nom != os.path.basename(cible) and nom.endswith('.pdf'):
+            try:
+                os.unlink(os.path.join(dossier, nom))
+            except FileNotFoundError:
+                pass
+    return cible
+
+
+def supprimer(doc_id):
+    import shutil
+    shutil.rmtree(_dossier(doc_id), ignore_errors=True)
+
+
+# ── Service du fichier (ETag, Range) ─────────────────────────
+
+def _plage(entete, taille):
+    """
+    Interprète un en-tête Range à plage unique. Retourne (debut, fin) inclusifs,
+    None si l'en-tête est absent / non pris en charge (réponse complète),
+    ou False si la plage n'est pas satisfiable.
+    """
+    m = _RANGE.fullmatch((entete or '').strip())
+    if not m or not (m[1] or m[2]):
+        return None
+    if m[1]:
+        debut = int(m[1])
+        fin = min(int(m[2]), taille - 1) if m[2] else taille - 1
+    else:
+        # bytes=-N : les N derniers octets
+        debut, fin = max(0, taille - int(m[2])), taille - 1
+    if debut >= taille or debut > fin:
+        return False
+    return debut, fin
+
+
+def _lire(f, reste):
+    with f:
+        while reste > 0:
+            bloc = f.read(min(TAILLE_BLOC, reste))
+            if not bloc:
+                break
+            reste -= len(bloc)
+            yield bloc
+
+
+def servir(request, chemin_pdf, filename):
+    """Sert un PDF du cache : 304 si inchangé, 206 pour une requête Range, sinon le fichier complet."""
+    stat = os.stat(chemin_pdf)
+    taille = stat.st_size
+    etag = quote_etag(os.path.basename(os.path.dirname(chemin_pdf)) + '-' + os.path.basename(chemin_pdf))
+    last_modified = int(stat.st_mtime)
+
+    reponse = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if reponse is None:
+        plage = None
+        if_range = request.META.get('HTTP_IF_RANGE')
+        if request.method == 'GET' and (not if_range or if_range == etag):
+            plage = _plage(request.META.get('HTTP_RANGE'), taille)
+
+        if plage is False:
+            reponse = HttpResponse(status=416)
+            reponse['Content-Range'] = f'bytes */{taille}'
+            return reponse
+        if plage is None:
+            reponse = FileResponse(open(chemin_pdf, 'rb'), content_type='application/pdf')
+        else:
+            debut, fin = plage
+            f = open(chemin_pdf, 'rb')
+            f.seek(debut)
+            reponse = StreamingHttpResponse(_lire(f, fin - debut + 1), status=206, content_type='application/pdf')
+            reponse['Content-Range'] = f'bytes {debut}-{fin}/{taille}'
+            reponse['Content-Length'] = str(fin - debut + 1)
+        reponse['Content-Disposition'] = f'inline; filename="{filename}"'
+        reponse['Accept-Ranges'] = 'bytes'
+
+    reponse['ETag'] = etag
+    reponse['Last-Modified'] = http_date(last_modified)
+    patch_cache_control(reponse, private=True, no_cache=True)
+    return reponse
@@ -0,0 +1,223 @@
+"""
+Ré-extraction de l'archive par l'API Message Batches — ConformXpert.
+
+Après une modification de _PROMPT_DETECTION (ou du modèle de détection), les
+dossiers déjà analysés le sont avec l'ancien prompt. `manage.py reextraire_archive`
+les repasse tous par lots asynchrones (délai de traitement jusqu'à 24 h, prix
+divisé par deux) au lieu de milliers d'appels interactifs :
+  - un dossier est à traiter si le contenu de ses fichiers n'a de résultat pour
+    le prompt courant ni dans le cache d'extraction, ni dans un lot importé, et
+    s'il ne figure pas déjà dans un lot en cours ;
+  - les requêtes sont les mêmes que celles de l'ingestion (texte extrait, voir
+    views.requete_detection) : les résultats alimentent le même cache ;
+  - chaque lot est enregistré (LotExtraction) avant son envoi ; son état est
+    ensuite scruté, et les résultats d'un lot terminé sont importés au fil du
+    téléchargement, par tranches d'une transaction chacune, via analyze_document.
+
+Reprise : tout l'état est en base. Relancer la commande après un arrêt reprend
+les lots soumis (scrutation, import) ; un lot resté « en préparation » (arrêt
+pendant l'envoi) est supprimé et ses dossiers repartent dans un nouveau lot.
+Un import interrompu est refait en entier : il est idempotent.
+"""
+import os
+from itertools import islice
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from . import extraction_cache, llm
+
+
+# Dossiers par Message Batch (l'API en accepte jusqu'à 100 000, 256 Mo)
+TAILLE_LOT = int(os.environ.get('REEXTRACTION_TAILLE_LOT', '500'))
+# Résultats importés par transaction
+TRANCHE_IMPORT = 100
+# Dossiers lus en base (et vérifiés dans le cache) d'un coup
+TAILLE_LECTURE = 100
+
+MOTIF = 'detection_lot'
+
+
+def version_courante():
+    """(version du prompt de détection en mode texte, modèle) — clé des résultats attendus."""
+    from . import views
+    return views._PROMPT_DETECTION_VERSION_TEXTE, views._MODELE_DETECTION
+
+
+# ── Sélection des dossiers ───────────────────────────────────
+
+def _suivis(prompt_version, modele):
+    """
+    (faits, reserves) : couples (document_id, contenu_hash) extraits avec succès par
+    un lot importé, et dossiers d'un lot pas encore importé.
+    """
+    from .models import LotExtraction
+
+    faits, reserves = set(), set()
+    lots = LotExtraction.objects.filter(prompt_version=prompt_version, modele=modele).only('statut', 'requetes')
+    for lot in lots:
+        for document_id, contenu_hash, issue in lot.requetes.values():
+            if lot.statut != 'importe':
+                reserves.add(document_id)
+            elif issue == 'ok':
+                faits.add((document_id, contenu_hash))
+    return faits, reserves
+
+
+def a_traiter(limite=None):
+    """
+    Génère (document, texte, contenu_hash) des dossiers à ré-extraire, par ordre d'id.
+    Les dossiers sans texte exploitable sont ignorés.
+    """
+    from . import views
+    from .models import Document
+
+    prompt_version, modele = version_courante()
+    faits, reserves = _suivis(prompt_version, modele)
+
+    dossiers = (
+        Document.objects
+        .filter(Q(fichiers__isnull=False) | (Q(upload__isnull=False) & ~Q(upload='')))
+        .exclude(id__in=reserves)
+        .distinct().order_by('id')
+        .prefetch_related('fichiers')
+        .iterator(chunk_size=TAILLE_LECTURE)
+    )
+    rendus = 0
+    while lus := list(islice(dossiers, TAILLE_LECTURE)):
+        tranche = []
+        for document in lus:
+            texte, contenu_hash = views.texte_dossier(document)
+            if texte.strip() and contenu_hash and (document.id, contenu_hash) not in faits:
+                tranche.append((document, texte, contenu_hash))
+        en_cache = extraction_cache.presents({h for _, _, h in tranche}, prompt_version, modele)
+        for element in tranche:
+            if element[2] in en_cache:
+                continue
+            yield element
+            rendus += 1
+            if limite is not None and rendus >= limite:
+                return
+
+
+def par_lots(elements, taille=None):
+    elements = iter(elements)
+    while lot := list(islice(elements, taille or TAILLE_LOT)):
+        yield lot
+
+
+# ── Soumission, suivi ────────────────────────────────────────
+
+def soumettre(elements):
+    """Enregistre puis envoie un lot [(document, texte, contenu_hash)] ; retourne le LotExtraction soumis."""
+    from . import views
+    from .models import LotExtraction
+
+    prompt_version, modele = version_courante()
+    requetes, suivi = [], {}
+    for document, texte, contenu_hash in elements:
+        payload, _, _ = views.requete_detection(texte)
+        custom_id = f"doc-{document.id}"
+        requetes.append({'custom_id': custom_id, 'params': payload})
+        suivi[custom_id] = [document.id, contenu_hash, None]
+
+    lot = LotExtraction.objects.create(
+        prompt_version=prompt_version, modele=modele, requetes=suivi, nb_requetes=len(suivi),
+    )
+    try:
+        reponse = llm.lot_soumettre(requetes)
+    except llm.ErreurLLM:
+        lot.delete()
+        raise
+    lot.lot_id    = reponse['id']
+    lot.statut    = 'soumis'
+    lot.soumis_le = timezone.now()
+    lot.save(update_fields=['lot_id', 'statut', 'soumis_le'])
+    return lot
+
+
+def abandonner_preparations():
+    """Supprime les lots dont l'envoi n'a pas été confirmé (leurs dossiers seront resoumis)."""
+    from .models import LotExtraction
+    n, _ = LotExtraction.objects.filter(statut='preparation').delete()
+    return n
+
+
+def suivre(lot):
+    """Interroge l'API ; passe le lot à « terminé » quand ses résultats sont disponibles. Retourne l'état API."""
+    etat = llm.lot_etat(lot.lot_id)
+    if etat.get('processing_status') == 'ended':
+        lot.statut     = 'termine'
+        lot.termine_le = timezone.now()
+        lot.save(update_fields=['statut', 'termine_le'])
+    return etat
+
+
+# ── Import des résultats ─────────────────────────────────────
+
+def _appliquer(tranche, prompt_version, modele):
+    from . import views
+
+    with transaction.atomic():
+        for document, contenu_hash, donnees in tranche:
+            extraction_cache.ecrire(contenu_hash, prompt_version, modele, donnees)
+            views.analyze_document(document, donnees.get('valeurs', {}), views._annoter(donnees, 'texte'))
+    tranche.clear()
+
+
+def importer(lot, progression=None):
+    """
+    Télécharge les résultats d'un lot terminé et les applique aux dossiers, par
+    tranches de TRANCHE_IMPORT (une transaction chacune). `progression(faits, total)`
+    est appelé après chaque tranche.
+    """
+    from . import views
+    from .models import Document
+
+    suivi     = {cid: list(v) for cid, v in lot.requetes.items()}
+    documents = Document.objects.in_bulk([document_id for document_id, _, _ in suivi.values()])
+    tranche, faits = [], 0
+
+    for ligne in llm.lot_resultats(lot.lot_id):
+        entree = suivi.get(ligne.get('custom_id'))
+        if entree is None:
+            continue
+        document_id, contenu_hash, _ = entree
+        resultat = ligne.get('result') or {}
+
+        if resultat.get('type') == 'succeeded':
+            message = resultat.get('message') or {}
+            llm.journaliser_resultat_lot(MOTIF, lot.modele, message)
+            try:
+                donnees = views.lire_detection(llm.texte(message))
+            except ValueError as e:
+                entree[2] = str(e)[:200]
+            else:
+                document = documents.get(document_id)
+                if document is None:
+                    entree[2] = 'dossier supprimé'
+                else:
+                    tranche.append((document, contenu_hash, donnees))
+                    entree[2] = 'ok'
+        else:
+            erreur = (resultat.get('error') or {}).get('error', {}).get('message', '')
+            entree[2] = f"{resultat.get('type', 'inconnu')} {erreur}".strip()[:200]
+            llm.journaliser_resultat_lot(MOTIF, lot.modele, erreur=entree[2])
+
+        faits += 1
+        if len(tranche) >= TRANCHE_IMPORT:
+            _appliquer(tranche, lot.prompt_version, lot.modele)
+            if progression:
+                progression(faits, lot.nb_requetes)
+    _appliquer(tranche, lot.prompt_version, lot.modele)
+    if progression:
+        progression(faits, lot.nb_requetes)
+
+    lot.requetes   = suivi
+    lot.nb_ok      = sum(1 for _, _, issue in suivi.values() if issue == 'ok')
+    lot.nb_erreurs = sum(1 for _, _, issue in suivi.values() if issue not in (None, 'ok'))
+    lot.statut     = 'importe'
+    lot.importe_le = timezone.now()
+    lot.save(update_fields=['requetes', 'nb_ok', 'nb_erreurs', 'statut', 'importe_le'])
+    return lot
@@ -0,0 +1,243 @@
+"""
+Styles et éléments statiques partagés des rapports PDF ReportLab — ConformXpert.
+
+Palette, mise en page, ParagraphStyle et TableStyle ReportLab sont construits
+une fois par processus puis réutilisés par `construire_rapport_pdf` (views.py).
+Les éléments statiques (sommaire, mentions légales) sont gardés par thread : un
+flowable porte son état de mise en page et ne doit pas servir à deux
+constructions simultanées.
+
+`python manage.py bench_rapports` mesure le gain (voir reinitialiser()).
+"""
+import threading
+
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import ParagraphStyle
+from reportlab.lib.units import cm
+from reportlab.platypus import HRFlowable, Paragraph, Table, TableStyle
+
+
+# ── Mise en page ─────────────────────────────────────────────
+
+PAGE_W, PAGE_H = A4
+ML = MR = MT = 2 * cm
+MB = 2.5 * cm
+W  = PAGE_W - ML - MR
+
+# ── Palette ──────────────────────────────────────────────────
+
+NAVY    = colors.HexColor('#0C1929')
+GOLD    = colors.HexColor('#C8A84B')
+GOLD_L  = colors.HexColor('#F5EDD0')
+GREEN   = colors.HexColor('#1A9E2E')
+GREEN_L = colors.HexColor('#E8F8EE')
+RED     = colors.HexColor('#C62828')
+RED_L   = colors.HexColor('#FEF0F0')
+LGRAY   = colors.HexColor('#F8F8FC')
+MGRAY   = colors.HexColor('#E0E0E8')
+WHITE   = colors.white
+MUTED   = colors.HexColor('#888899')
+TEXT    = colors.HexColor('#1A1A2E')
+GRIS_TEXTE = colors.HexColor('#444455')
+AMBRE_L    = colors.HexColor('#FFFBF0')
+
+# Couverture (canvas)
+COUV_CERCLE_1  = colors.HexColor('#C8A84B11')
+COUV_CERCLE_2  = colors.HexColor('#C8A84B0A')
+COUV_SOUSTITRE = colors.HexColor('#AAAACC')
+COUV_FILET     = colors.HexColor('#C8A84B44')
+COUV_BANDEAU   = colors.HexColor('#C8A84B33')
+COUV_PIED      = colors.HexColor('#666677')
+TRANSPARENT    = colors.HexColor('#00000000')
+
+
+# ── Styles de paragraphe ─────────────────────────────────────
+
+_STYLE_BASE = dict(fontName='Helvetica', fontSize=9, textColor=TEXT, leading=14, spaceAfter=0)
+
+_styles = {}
+_local = threading.local()
+
+
+def st(name, **kw):
+    """ParagraphStyle mémoïsé : même nom + mêmes attributs → même objet."""
+    cle = (name, tuple(sorted(kw.items())))
+    style = _styles.get(cle)
+    if style is None:
+        attrs = dict(_STYLE_BASE)
+        attrs.update(kw)
+        style = _styles[cle] = ParagraphStyle(name, **attrs)
+    return style
+
+
+# ── Styles de tableau ────────────────────────────────────────
+
+TS_INFO = TableStyle([
+    ('BACKGROUND',    (0, 0), (0, -1), LGRAY),
+    ('TOPPADDING',    (0, 0), (-1, -1), 5),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 5),
+    ('LEFTPADDING',   (0, 0), (-1, -1), 8),
+    ('RIGHTPADDING',  (0, 0), (-1, -1), 8),
+    ('LINEBELOW',     (0, 0), (-1, -2), 0.5, MGRAY),
+    ('VALIGN',        (0, 0), (-1, -1), 'MIDDLE'),
+])
+
+TS_SOMMAIRE = TableStyle([
+    ('TOPPADDING',    (0, 0), (-1, -1), 8),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
+    ('LEFTPADDING',   (0, 0), (-1, -1), 0),
+    ('RIGHTPADDING',  (0, 0), (-1, -1), 0),
+    ('LINEBELOW',     (0, 0), (-1, -1), 0.5, MGRAY),
+])
+
+TS_VERDICT = TableStyle([
+    ('BACKGROUND',    (0, 0), (-1, -1), NAVY),
+    ('TOPPADDING',    (0, 0), (-1, -1), 14),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 14),
+    ('LEFTPADDING',   (0, 0), (-1, -1), 16),
+    ('RIGHTPADDING',  (0, 0), (-1, -1), 16),
+    ('VALIGN',        (0, 0), (-1, -1), 'MIDDLE'),
+])
+
+TS_NOTES = TableStyle([
+    ('BACKGROUND',    (0, 0), (-1, -1), LGRAY),
+    ('LINEBEFORE',    (0, 0), (0, -1), 3, GOLD),
+    ('TOPPADDING',    (0, 0), (-1, -1), 10),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 10),
+    ('LEFTPADDING',   (0, 0), (-1, -1), 12),
+    ('RIGHTPADDING',  (0, 0), (-1, -1), 12),
+])
+
+TS_MENTION = TableStyle([
+    ('BACKGROUND',    (0, 0), (-1, -1), LGRAY),
+    ('TOPPADDING',    (0, 0), (-1, -1), 8),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
+    ('LEFTPADDING',   (0, 0), (-1, -1), 10),
+    ('RIGHTPADDING',  (0, 0), (-1, -1), 10),
+    ('LINEBELOW',     (0, 0), (-1, -1), 0.5, MGRAY),
+    ('VALIGN',        (0, 0), (-1, -1), 'TOP'),
+])
+
+# Tableau des critères : en-tête + zébrage selon le nombre de lignes
+_TS_CRITERES_BASE = [
+    ('BACKGROUND',    (0, 0), (-1, 0), NAVY),
+    ('TOPPADDING',    (0, 0), (-1, -1), 6),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
+    ('LEFTPADDING',   (0, 0), (-1, -1), 6),
+    ('RIGHTPADDING',  (0, 0), (-1, -1), 6),
+    ('LINEBELOW',     (0, 1), (-1, -1), 0.5, MGRAY),
+    ('VALIGN',        (0, 0), (-1, -1), 'MIDDLE'),
+]
+
+_ts_criteres = {}
+_ts_reco = {}
+
+
+def ts_criteres(nb_lignes):
+    ts = _ts_criteres.get(nb_lignes)
+    if ts is None:
+        cmds = list(_TS_CRITERES_BASE)
+        cmds += [('BACKGROUND', (0, i), (-1, i), LGRAY) for i in range(2, nb_lignes, 2)]
+        ts = _ts_criteres[nb_lignes] = TableStyle(cmds)
+    return ts
+
+
+def ts_reco(fond, bordure):
+    ts = _ts_reco.get((fond, bordure))
+    if ts is None:
+        ts = _ts_reco[(fond, bordure)] = TableStyle([
+            ('BACKGROUND',    (0, 0), (-1, -1), fond),
+            ('LINEBEFORE',    (0, 0), (0, -1), 3, bordure),
+            ('TOPPADDING',    (0, 0), (-1, -1), 8),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
+            ('LEFTPADDING',   (0, 0), (-1, -1), 12),
+            ('RIGHTPADDING',  (0, 0), (-1, -1), 12),
+        ])
+    return ts
+
+
+# ── Éléments statiques ───────────────────────────────────────
+
+def section_title(num, title):
+    label = f"{num}.  {title.upper()}"
+    return [
+        HRFlowable(width=W, thickness=1.5, color=GOLD, spaceAfter=5, spaceBefore=10),
+        Paragraph(label, st('sh', fontName='Helvetica-Bold', fontSize=8,
+                            textColor=GOLD, characterSpacing=0.8, spaceAfter=8)),
+    ]
+
+
+MENTIONS_LEGALES = [
+    ("Nature du rapport",
+     "Ce rapport est établi sur la base des documents fournis par le client et constitue une analyse "
+     "documentaire indépendante. Il ne se substitue pas à une attestation officielle de conformité "
+     "délivrée par un organisme accrédité."),
+    ("Responsabilité",
+     "ConformXpert s'engage à fournir une analyse rigoureuse et objective des documents transmis. "
+     "La conformité finale du bâtiment relève de la responsabilité du maître d'ouvrage et des "
+     "professionnels en charge de la construction."),
+    ("Confidentialité",
+     "Ce document est strictement confidentiel et destiné exclusivement au client mentionné en page "
+     "de couverture. Toute reproduction ou diffusion sans autorisation écrite de ConformXpert est interdite."),
+    ("Réglementations",
+     "RT2012 : Arrêté du 26 octobre 2010  |  RE2020 : Décret n°2021-1004 du 29 juillet 2021  |  "
+     "PEB : Directive européenne 2010/31/UE  |  Minergie / SIA380 : Normes SIA Suisse  |  "
+     "CNEB : Code national de l'énergie pour les bâtiments (Canada)  |  "
+     "LENOZ : Règlement grand-ducal du 23 juillet 2016 (Luxembourg)"),
+    ("Contact",
+     "ConformXpert  ·  contact@conformxpert.fr  ·  Délai garanti 10 jours ouvrés"),
+]
+
+
+def mentions_legales():
+    """Section 6 (titre + tableaux), construite une fois par thread."""
+    flowables = getattr(_local, 'mentions', None)
+    if flowables is None:
+        flowables = section_title("6", "Mentions légales & disclaimer")
+        for k, v in MENTIONS_LEGALES:
+            t = Table([[
+                Paragraph(k, st('dk', fontName='Helvetica-Bold', fontSize=9, textColor=TEXT)),
+                Paragraph(v, st('dv', fontSize=8.5, textColor=GRIS_TEXTE, leading=13)),
+            ]], colWidths=[4 * cm, W - 4 * cm])
+            t.setStyle(TS_MENTION)
+            flowables.append(t)
+        _local.mentions = flowables
+    return list(flowables)
+
+
+def sommaire(norme, avec_notes):
+    """Lignes du sommaire, construites une fois par thread pour chaque (norme, notes)."""
+    from reportlab.lib.enums import TA_RIGHT
+
+    cache = _local.__dict__.setdefault('sommaires', {})
+    lignes = cache.get((norme, avec_notes))
+    if lignes is None:
+        items = [
+            ("1.  Résumé exécutif & verdict global",             "3"),
+            ("2.  Informations du dossier",                      "3"),
+            (f"3.  Analyse {norme} — Critères de conformité",   "4"),
+            ("4.  Recommandations & points d'attention",         "5"),
+        ]
+        if avec_notes:
+            items.append(("5.  Notes & observations de l'expert", "5"))
+        items.append(("6.  Mentions légales & disclaimer", "6"))
+
+        lignes = []
+        for label, pg in items:
+            row = Table([[
+                Paragraph(label, st('tl', fontSize=10)),
+                Paragraph(pg, st('tp', fontName='Helvetica-Bold', fontSize=9, textColor=GOLD, alignment=TA_RIGHT)),
+            ]], colWidths=[W - 1.5 * cm, 1.5 * cm])
+            row.setStyle(TS_SOMMAIRE)
+            lignes.append(row)
+        cache[(norme, avec_notes)] = lignes
+    return list(lignes)
+
+
+def reinitialiser():
+    """Vide les caches du processus (thread courant pour les flowables) — utilisé par le benchmark."""
+    _styles.clear()
+    _ts_criteres.clear()
+    _ts_reco.clear()
+    _local.__dict__.clear()
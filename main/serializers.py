@@ -9,10 +9,35 @@ class AnalysisSerializer(serializers.ModelSerializer):
 
 
 class DocumentSerializer(serializers.ModelSerializer):
+    """
+    Accepte `fields=[...]` (sparse fieldset) : seuls ces champs sont sérialisés.
+    Voir colonnes_requises() pour les colonnes à charger en base.
+    """
     analyses = AnalysisSerializer(many=True, read_only=True)
     re2020_is_conform = serializers.SerializerMethodField()
     rt2012_is_conform = serializers.SerializerMethodField()
 
+    # Champs calculés → colonnes du modèle nécessaires
+    COLONNES_CALCULEES = {
+        're2020_is_conform': ('norme', 'conformite'),
+        'rt2012_is_conform': ('norme', 'conformite'),
+        'analyses':          (),
+    }
+
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields:
+            for nom in set(self.fields) - set(fields):
+                self.fields.pop(nom)
+
+    @classmethod
+    def colonnes_requises(cls, fields):
+        """Colonnes à passer à .only() pour sérialiser `fields`."""
+        colonnes = {'id'}
+        for nom in fields:
+            colonnes.update(cls.COLONNES_CALCULEES.get(nom, (nom,)))
+        return colonnes
+
     class Meta:
         model = Document
         fields = [
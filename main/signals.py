@@ -0,0 +1,69 @@
+"""
+Signaux des modèles — connectés dans MainConfig.ready().
+"""
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Analysis, Document, FactureEnergie, Message
+
+
+@receiver(post_save, sender=Document)
+def document_enregistre(sender, instance, created, update_fields=None, **kwargs):
+    """Publie les changements de statut / rapport IA aux pages en attente (long-poll)."""
+    from . import notifications
+
+    if update_fields is not None and not {'status', 'rapport_ia_json'} & set(update_fields):
+        return
+    notifications.publier(instance)
+
+
+@receiver(post_save, sender=Document)
+def regenerer_rapport_pdf(sender, instance, created, **kwargs):
+    """Un champ affiché par le rapport PDF en cache a changé : il est reconstruit en arrière-plan."""
+    from django.db import transaction
+    from . import rapports_pdf
+
+    if created or not rapports_pdf.deja_produit(instance.id) or rapports_pdf.chemin_a_jour(instance):
+        return
+    transaction.on_commit(lambda: rapports_pdf.planifier([instance.id]))
+
+
+@receiver(post_delete, sender=Document)
+def supprimer_rapport_pdf(sender, instance, **kwargs):
+    from . import rapports_pdf
+    rapports_pdf.supprimer(instance.id)
+
+
+@receiver(post_save, sender=Document)
+@receiver(post_delete, sender=Document)
+def invalider_stats_dashboard(sender, **kwargs):
+    from . import stats
+    stats.invalider()
+
+
+@receiver(post_save, sender=Message)
+@receiver(post_delete, sender=Message)
+@receiver(post_save, sender=FactureEnergie)
+@receiver(post_delete, sender=FactureEnergie)
+@receiver(post_save, sender=Analysis)
+@receiver(post_delete, sender=Analysis)
+def toucher_document(sender, instance, **kwargs):
+    """Un message, une facture ou une analyse modifiés changent la version du dossier (ETag)."""
+    from . import versions
+    versions.toucher(instance.document_id)
+
+
+@receiver(post_save, sender=FactureEnergie)
+def maj_consommation_facture(sender, instance, update_fields=None, **kwargs):
+    """Facture analysée / ré-analysée : recalcule les seuls mois concernés."""
+    from . import consommation
+
+    if update_fields is not None and not {'analyse_json', 'analyse_ok', 'type_energie', 'mois'} & set(update_fields):
+        return
+    consommation.facture_modifiee(instance)
+
+
+@receiver(post_delete, sender=FactureEnergie)
+def retirer_consommation_facture(sender, instance, **kwargs):
+    from . import consommation
+    consommation.facture_modifiee(instance, supprimee=True)
@@ -0,0 +1,110 @@
+"""
+Statistiques du tableau de bord — ConformXpert.
+
+Tous les compteurs de `home` sont dérivés d'UNE requête groupée
+(type d'analyse × statut × norme × conformité × mois de dépôt, avec un
+comptage conditionnel des dossiers anciens), mise en cache et invalidée à
+chaque enregistrement / suppression de dossier (voir main/signals.py).
+"""
+from collections import defaultdict
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db.models import Count, Q
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from .models import Document
+
+
+CLE_CACHE = 'dashboard:stats'
+# Filet de sécurité : les compteurs relatifs à la date (« ce mois », « > 5 jours »)
+# se recalculent au moins toutes les 5 minutes même sans modification.
+DUREE_CACHE = 300
+
+MOIS_LABELS = ['Jan', 'Fév', 'Mar', 'Avr', 'Mai', 'Jun', 'Jul', 'Aoû', 'Sep', 'Oct', 'Nov', 'Déc']
+
+
+def invalider():
+    cache.delete(CLE_CACHE)
+
+
+def stats_dashboard():
+    stats = cache.get(CLE_CACHE)
+    if stats is None:
+        stats = calculer()
+        cache.set(CLE_CACHE, stats, DUREE_CACHE)
+    return stats
+
+
+def calculer():
+    now   = timezone.now()
+    today = timezone.localdate()
+    five_days_ago = now - timedelta(days=5)
+
+    groupes = (
+        Document.objects.filter(is_active=True)
+        .annotate(mois=TruncMonth('upload_date'))
+        .order_by()
+        .values('type_analyse', 'status', 'norme', 'conformite', 'mois')
+        .annotate(
+            n=Count('id'),
+            anciens=Count('id', filter=Q(upload_date__lt=five_days_ago)),
+        )
+    )
+
+    total = conformes = recu = old_pending = termine_ce_mois = 0
+    par_type = defaultdict(int)
+    par_mois = defaultdict(int)
+    norme_stats = defaultdict(lambda: {'total': 0, 'conformes': 0})
+
+    for g in groupes:
+        n = g['n']
+        mois = (g['mois'].year, g['mois'].month) if g['mois'] else None
+        total += n
+        par_type[g['type_analyse']] += n
+        if mois:
+            par_mois[mois] += n
+        if g['conformite'] is True:
+            conformes += n
+        if g['status'] == 'recu':
+            recu += n
+            old_pending += g['anciens']
+        if g['status'] == 'termine':
+            if mois == (today.year, today.month):
+                termine_ce_mois += n
+            nom = g['norme'] or ('Carbone' if g['type_analyse'] == 'carbone' else '—')
+            norme_stats[nom]['total'] += n
+            if g['conformite'] is True:
+                norme_stats[nom]['conformes'] += n
+
+    # ── 6 derniers mois ──────────────────────────────────────
+    monthly_data = []
+    for i in range(5, -1, -1):
+        month = (today.month - i - 1) % 12 + 1
+        year  = today.year + ((today.month - i - 1) // 12)
+        monthly_data.append({'label': MOIS_LABELS[month - 1], 'count': par_mois.get((year, month), 0)})
+
+    norme_conformite = [
+        {
+            'norme':     nom,
+            'total':     v['total'],
+            'conformes': v['conformes'],
+            'pct':       round(v['conformes'] / v['total'] * 100) if v['total'] else 0,
+        }
+        for nom, v in norme_stats.items()
+    ]
+    norme_conformite.sort(key=lambda x: -x['total'])
+
+    return {
+        'total_projects':   total,
+        'compliance_rate':  round(conformes / total * 100, 1) if total else 0,
+        'pending_count':    recu,
+        'old_pending':      old_pending,
+        'count_energie':    par_type.get('energie', 0),
+        'count_carbone':    par_type.get('carbone', 0),
+        'monthly_data':     monthly_data,
+        'max_monthly':      max((m['count'] for m in monthly_data), default=1) or 1,
+        'norme_conformite': norme_conformite,
+        'termine_ce_mois':  termine_ce_mois,
+    }
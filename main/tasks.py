@@ -0,0 +1,64 @@
+"""
+Handlers des jobs de fond — importés par le worker (`manage.py run_worker`).
+"""
+from .jobs import handler
+
+
+@handler('ingestion')
+def ingestion(job):
+    """Extraction du texte de tous les fichiers du dossier + analyse Claude."""
+    from .views import ingerer_document
+
+    if job.document is None:
+        raise ValueError("Job d'ingestion sans dossier associé")
+    resultat = ingerer_document(job.document)
+    return {
+        'type_rapport': resultat.get('type_rapport'),
+        'nb_valeurs':   len(resultat.get('valeurs', {}) or {}),
+    }
+
+
+@handler('rapport_ia')
+def rapport_ia(job):
+    """Génération du rapport IA (Claude en streaming, progression publiée sur le job)."""
+    from .views import produire_rapport_ia
+
+    if job.document is None:
+        raise ValueError("Job de rapport IA sans dossier associé")
+    rapport = produire_rapport_ia(job.document, job=job)
+    return {
+        'verdict':      rapport.get('verdict') if isinstance(rapport, dict) else None,
+        'score_global': rapport.get('score_global') if isinstance(rapport, dict) else None,
+    }
+
+
+@handler('rapport_pdf')
+def rapport_pdf(job):
+    """Régénération du rapport PDF en cache après modification du dossier."""
+    from . import rapports_pdf
+    from .models import Document
+
+    if job.document is None:
+        raise ValueError("Job de rapport PDF sans dossier associé")
+    # Relu au moment de l'exécution : un seul job couvre plusieurs modifications rapprochées.
+    # Le job n'est planifié que si l'empreinte du rapport a changé : il est toujours reconstruit.
+    document = Document.objects.get(id=job.document_id)
+    rapports_pdf.generer(document)
+    return {'empreinte': rapports_pdf.empreinte(document)}
+
+
+@handler('factures')
+def analyse_factures(job):
+    """Analyse IA des factures non analysées du dossier (appels parallèles, progression publiée)."""
+    from . import factures as moteur
+    from .jobs import publier_progression
+
+    if job.document is None:
+        raise ValueError("Job d'analyse des factures sans dossier associé")
+
+    def progression(faites, total):
+        publier_progression(job, progression=faites * 100 // total,
+                            etape=f"{faites}/{total} facture(s) analysée(s)")
+
+    resultats = moteur.analyser_lot(job.document.factures.filter(analyse_ok=False), progression=progression)
+    return {'resultats': resultats}
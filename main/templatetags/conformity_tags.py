@@ -1,3 +1,7 @@
+from collections import defaultdict
+from operator import itemgetter
+from types import MappingProxyType
+
 from django import template
 
 register = template.Library()
@@ -126,20 +130,25 @@ NORME_FIELDS = {
 }
 
 
-def get_seuils(building_type='maison', zone='H2', pays='FR', norme='RE2020'):
+# Normalisation des types de bâtiment courants
+_BT_MAP = {
+    'individual': 'maison', 'individuel': 'maison', 'house': 'maison',
+    'apartment': 'collectif', 'appartement': 'collectif', 'immeuble': 'collectif',
+    'building': 'collectif',
+}
+
+
+def _normaliser(building_type, zone, pays, norme):
+    """Arguments bruts → clé (pays, norme, building_type, zone) de la table des seuils."""
     bt    = (building_type or 'maison').lower().strip()
     z     = (zone  or 'H2').upper().strip()
     pays  = (pays  or 'FR').upper().strip()
     norme = (norme or 'RE2020').upper().strip()
+    return pays, norme, _BT_MAP.get(bt, bt), z
 
-    # Normalisation des types de bâtiment courants
-    _bt_map = {
-        'individual': 'maison', 'individuel': 'maison', 'house': 'maison',
-        'apartment': 'collectif', 'appartement': 'collectif', 'immeuble': 'collectif',
-        'building': 'collectif',
-    }
-    bt = _bt_map.get(bt, bt)
 
+def _calculer_seuils(bt, z, pays, norme):
+    """Seuils d'un contexte déjà normalisé (nouveau dict à chaque appel)."""
     if pays == 'FR' and norme == 'RT2012':
         return {
             'rt2012_bbio':         RT2012_BBIO_BASE.get(bt, 60) + RT2012_BBIO_ZONE_MODIF.get(z, 0),
@@ -203,6 +212,186 @@ def get_seuils(building_type='maison', zone='H2', pays='FR', norme='RE2020'):
     }
 
 
+# ── Table des seuils compilée ────────────────────────────────
+# Tous les contextes connus sont calculés une fois à l'import ; get_seuils ne fait
+# ensuite qu'une lecture de dict et retourne toujours le même mapping immuable.
+# À rappeler (invalider_seuils) si les constantes ci-dessus sont modifiées à chaud.
+
+TYPES_BATIMENT = ('maison', 'collectif', 'erp')
+ZONES_SEUILS   = tuple(sorted(set(RT2012_BBIO_ZONE_MODIF) | set(RT2012_TIC_MAX) | set(RE2020_DH_MAX)))
+
+_ALIAS_MAX = 4096
+
+_TABLE_SEUILS = {}   # (pays, norme, building_type, zone) → MappingProxyType
+_ALIAS        = {}   # arguments bruts de get_seuils → entrée de la table
+
+
+def compiler_seuils():
+    table = {}
+    for pays in NORMES_PAR_PAYS:
+        for norme in NORME_FIELDS:
+            for bt in TYPES_BATIMENT:
+                for z in ZONES_SEUILS:
+                    table[(pays, norme, bt, z)] = MappingProxyType(_calculer_seuils(bt, z, pays, norme))
+    return table
+
+
+def invalider_seuils():
+    """Recompile la table (à appeler uniquement quand les définitions de seuils changent)."""
+    global _TABLE_SEUILS, _ALIAS
+    _TABLE_SEUILS = compiler_seuils()
+    _ALIAS = {}
+
+
+def get_seuils(building_type='maison', zone='H2', pays='FR', norme='RE2020'):
+    """
+    Seuils applicables (mapping en lecture seule, partagé — ne pas modifier).
+    Recherche O(1) ; les contextes hors table (zone étrangère, type inconnu…)
+    sont calculés au premier appel puis mémorisés.
+    """
+    brut = (building_type, zone, pays, norme)
+    seuils = _ALIAS.get(brut)
+    if seuils is not None:
+        return seuils
+
+    cle = _normaliser(building_type, zone, pays, norme)
+    seuils = _TABLE_SEUILS.get(cle)
+    if seuils is None:
+        pays_n, norme_n, bt, z = cle
+        seuils = _TABLE_SEUILS[cle] = MappingProxyType(_calculer_seuils(bt, z, pays_n, norme_n))
+    if len(_ALIAS) < _ALIAS_MAX:
+        _ALIAS[brut] = seuils
+    return seuils
+
+
+invalider_seuils()
+
+
+# Champs dont dépend la conformité d'un dossier (hors valeurs mesurées)
+CONTEXTE_CONFORMITE = ('norme', 'pays', 'building_type', 'climate_zone')
+
+
+def champs_conformite():
+    """Tous les champs du modèle Document qui influent sur la conformité."""
+    champs = set(CONTEXTE_CONFORMITE)
+    for fields in NORME_FIELDS.values():
+        champs.update(field for field, _, _ in fields)
+    return champs
+
+
+def evaluer_conformite(doc):
+    """
+    Conformité d'un dossier vis-à-vis des seuils de sa norme :
+    True / False, ou None si la norme est inconnue ou qu'une valeur manque.
+    `doc` est n'importe quel objet portant les champs du modèle Document.
+    """
+    norme_fields = NORME_FIELDS.get(doc.norme, [])
+    if not norme_fields:
+        return None
+    s = get_seuils(doc.building_type, doc.climate_zone, doc.pays, doc.norme)
+    for field, _, _ in norme_fields:
+        val = getattr(doc, field, None)
+        if val is None:
+            return None
+        limit = s.get(field)
+        if limit is None:
+            continue
+        if field in CRITERIA_GREATER_EQUAL:
+            if float(val) < limit:
+                return False
+        else:
+            if float(val) > limit:
+                return False
+    return True
+
+
+# ── Évaluation par lot (NumPy) ───────────────────────────────
+# Codes des verdicts retournés par evaluer_conformite_lot
+CONFORME, NON_CONFORME, NON_EVALUABLE = 1, 0, -1
+
+
+def verdict(code):
+    """Code NumPy → True / False / None (même convention que evaluer_conformite)."""
+    return {CONFORME: True, NON_CONFORME: False}.get(int(code))
+
+
+def evaluer_conformite_lot(documents):
+    """
+    Évalue la conformité de nombreux dossiers en une passe vectorisée.
+
+    `documents` : queryset de Document (seules les colonnes utiles sont lues)
+    ou liste de dicts portant 'id' et tous les champs de champs_conformite().
+
+    Les valeurs de chaque norme sont chargées dans une matrice (dossiers × critères),
+    les seuils calculés une seule fois par (building_type, climate_zone, pays, norme)
+    puis diffusés. Le verdict global reproduit evaluer_conformite : le premier critère
+    manquant ou non respecté (dans l'ordre de NORME_FIELDS) décide.
+
+    Retourne {'ids': array, 'conforme': array int8,
+              'criteres': {champ: array int8}}  — codes CONFORME / NON_CONFORME /
+    NON_EVALUABLE, alignés sur 'ids'.
+    """
+    import numpy as np
+
+    if hasattr(documents, 'values'):
+        documents = list(documents.values('id', *sorted(champs_conformite())))
+
+    n = len(documents)
+    ids      = np.fromiter((d['id'] for d in documents), dtype=np.int64, count=n)
+    conforme = np.full(n, NON_EVALUABLE, dtype=np.int8)
+    criteres = {}
+
+    par_norme = defaultdict(list)
+    for i, d in enumerate(documents):
+        if d.get('norme') in NORME_FIELDS:
+            par_norme[d['norme']].append(i)
+
+    for norme, lignes in par_norme.items():
+        fields = [field for field, _, _ in NORME_FIELDS[norme]]
+        docs   = [documents[i] for i in lignes]
+        lignes = np.asarray(lignes, dtype=np.int64)
+
+        # Valeurs mesurées : conversion en bloc, None devient NaN
+        extraire = itemgetter(*fields)
+        valeurs = np.array([extraire(d) for d in docs], dtype=np.float64).reshape(len(docs), len(fields))
+
+        # Seuils : une ligne par contexte distinct, diffusée sur les dossiers
+        contexte = itemgetter('building_type', 'climate_zone', 'pays')
+        contextes = {}
+        index = np.fromiter(
+            (contextes.setdefault(contexte(d), len(contextes)) for d in docs),
+            dtype=np.int64, count=len(docs),
+        )
+        table = np.full((len(contextes), len(fields)), np.nan)
+        for (bt, zone, pays), j in contextes.items():
+            s = get_seuils(bt, zone, pays, norme)
+            table[j] = [np.nan if s.get(f) is None else float(s[f]) for f in fields]
+        limites = table[index]
+
+        manquant = np.isnan(valeurs)
+        applicable = ~manquant & ~np.isnan(limites)
+        sens_min = np.array([f in CRITERIA_GREATER_EQUAL for f in fields])
+        with np.errstate(invalid='ignore'):
+            respecte = np.where(sens_min, valeurs >= limites, valeurs <= limites)
+        echec = applicable & ~respecte
+
+        code = np.where(applicable, np.where(respecte, CONFORME, NON_CONFORME), NON_EVALUABLE).astype(np.int8)
+        for c, f in enumerate(fields):
+            col = criteres.setdefault(f, np.full(n, NON_EVALUABLE, dtype=np.int8))
+            col[lignes] = code[:, c]
+
+        decisif = manquant | echec
+        premier = decisif.argmax(axis=1)
+        a_decision = decisif.any(axis=1)
+        premier_manquant = manquant[np.arange(len(docs)), premier]
+        conforme[lignes] = np.where(
+            ~a_decision, CONFORME,
+            np.where(premier_manquant, NON_EVALUABLE, NON_CONFORME),
+        )
+
+    return {'ids': ids, 'conforme': conforme, 'criteres': criteres}
+
+
 @register.filter
 def attr(obj, field_name):
     return getattr(obj, field_name, None)
@@ -257,26 +446,14 @@ def get_normes_pays(pays):
 
 
 @register.filter
-def factures_json(factures_qs):
+def factures_json(document):
     """
-    Sérialise un queryset FactureEnergie en JSON pour le template client.
-    Usage : {{ factures_data|safe }}  (données déjà injectées par la vue)
-    Ce filtre est disponible pour usage direct sur un queryset si besoin.
+    Consommations mensuelles pré-agrégées d'un dossier, en JSON, pour le template client.
+    Usage : {{ document|factures_json|safe }}  (les vues injectent déjà factures_data)
+    Accepte aussi le gestionnaire des factures du dossier (document.factures).
     """
     import json
-    result = []
-    for f in factures_qs.order_by('uploaded_at'):
-        d = f.analyse_json or {}
-        if d.get('consommation') is not None:
-            result.append({
-                'periode_debut': d.get('periode_debut'),
-                'periode_fin':   d.get('periode_fin'),
-                'consommation':  d.get('consommation'),
-                'unite':         d.get('unite', 'kWh'),
-                'montant_ttc':   d.get('montant_ttc'),
-                'cout_par_kwh':  d.get('cout_par_kwh'),
-                'type_energie':  f.type_energie,
-                'fournisseur':   d.get('fournisseur'),
-                'devise':        d.get('devise', 'CAD'),
-            })
-    return json.dumps(result, ensure_ascii=False)
+    from main import consommation
+
+    document = getattr(document, 'instance', document)
+    return json.dumps(consommation.lignes_mensuelles(document.id), ensure_ascii=False)
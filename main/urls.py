@@ -30,6 +30,7 @@ urlpatterns = [
     path('resultats/',                          views.results,            name='results'),
     path('historique/',                         views.history,            name='history'),
     path('historique/export-csv/',              views.export_csv_history, name='export_csv_history'),
+    path('historique/export-rapports/',         views.export_rapports_zip, name='export_rapports_zip'),
     path('dossier/<int:doc_id>/ia-status/',     views.ia_rapport_status,  name='ia_rapport_status'),
     path('parametres/',                         views.settings_view,      name='settings'),
     path('parametres/re2020/',                  views.update_re2020,      name='update_re2020'),
@@ -40,6 +41,7 @@ urlpatterns = [
     path('dossier/<int:doc_id>/rapport-word/', views.download_rapport_word, name='download_rapport_word'),
     path('dossier/<int:doc_id>/supprimer/',    views.delete_document,    name='delete_document'),
     path('dossier/<int:doc_id>/rapport-ia/',   views.generer_rapport_ia, name='generer_rapport_ia'),
+    path('dossier/<int:doc_id>/rapport-ia/flux/<int:job_id>/', views.rapport_ia_flux, name='rapport_ia_flux'),
     path('dossier/<int:doc_id>/analyser/',     views.analyser_document,  name='analyser_document'),
 
     # ── DEVIS ────────────────────────────────────────────────────────────
@@ -54,6 +56,7 @@ urlpatterns = [
     # ── FACTURES ÉNERGIE ─────────────────────────────────────────────────
     path('dossier/<int:doc_id>/factures/upload/',          views.upload_facture,           name='upload_facture'),
     path('dossier/<int:doc_id>/factures/analyser-toutes/', views.analyser_toutes_factures, name='analyser_toutes_factures'),
+    path('dossier/<int:doc_id>/factures/analyse/<int:job_id>/', views.analyse_factures_statut, name='analyse_factures_statut'),
     path('dossier/<int:doc_id>/factures/donnees/',         views.get_donnees_factures,     name='get_donnees_factures'),
     path('facture/<int:facture_id>/analyser/',             views.analyser_facture,         name='analyser_facture'),
     path('facture/<int:facture_id>/supprimer/',            views.supprimer_facture,        name='supprimer_facture'),
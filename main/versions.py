@@ -0,0 +1,91 @@
+"""
+Version des dossiers — ETag / Last-Modified — ConformXpert.
+
+Chaque dossier porte un tampon (version, modifie_le) incrémenté à chaque
+enregistrement du dossier lui-même et de ses messages, factures et analyses
+(voir Document.save() et main/signals.py). Les vues publiques et l'API s'en
+servent pour répondre 304 Not Modified : un rafraîchissement de la page de
+suivi ne coûte alors qu'une lecture par index, sans rendu ni sérialisation.
+"""
+import os
+from calendar import timegm
+from functools import wraps
+
+from django.contrib.messages import get_messages
+from django.db.models import F
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+
+
+# Les gabarits changent d'un déploiement à l'autre : le commit fait partie de l'ETag
+BUILD = (os.environ.get('RENDER_GIT_COMMIT') or os.environ.get('RAILWAY_GIT_COMMIT_SHA') or '')[:12]
+
+
+def toucher(doc_ids, **champs):
+    """
+    Incrémente la version des dossiers donnés (un seul UPDATE, sans signaux).
+    `champs` : autres colonnes à mettre à jour dans la même requête.
+    """
+    from .models import Document
+
+    if isinstance(doc_ids, int):
+        doc_ids = [doc_ids]
+    return Document.objects.filter(id__in=doc_ids).update(
+        version=F('version') + 1, modifie_le=timezone.now(), **champs,
+    )
+
+
+def tampon(**filtre):
+    """(version, modifie_le) du dossier correspondant au filtre, None s'il n'existe pas."""
+    from .models import Document
+
+    return Document.objects.filter(**filtre).values_list('version', 'modifie_le').first()
+
+
+def etag(version, modifie_le, *extra):
+    parties = [str(version), str(int(modifie_le.timestamp() * 1_000_000)), BUILD, *map(str, extra)]
+    return quote_etag('-'.join(p for p in parties if p))
+
+
+def conditionnel(champ, parametre, page=False, ignorer=None, **filtre):
+    """
+    Décorateur : ETag / Last-Modified tirés de la version du dossier, 304 si inchangé.
+
+    champ / parametre : colonne de recherche et argument d'URL correspondant
+                        (ex. 'tracking_token', 'token').
+    page   : page HTML — l'ETag dépend aussi de l'utilisateur connecté (barre admin)
+             et les messages flash en attente forcent un rendu complet.
+    ignorer: fonction(request) → True pour servir la vue sans condition
+             (requêtes qui modifient le dossier).
+    filtre : conditions supplémentaires identiques à celles de la vue (ex. status='termine').
+    """
+    def decorateur(vue):
+        @wraps(vue)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD') or (ignorer and ignorer(request)):
+                return vue(request, *args, **kwargs)
+            if page and len(get_messages(request)):
+                return vue(request, *args, **kwargs)
+
+            courant = tampon(**{champ: kwargs[parametre]}, **filtre)
+            if courant is None:
+                return vue(request, *args, **kwargs)   # la vue répond 404
+
+            version, modifie_le = courant
+            extra = (request.user.pk or 0,) if page else ()
+            cle = etag(version, modifie_le, *extra)
+            last_modified = timegm(modifie_le.utctimetuple())
+
+            reponse = get_conditional_response(request, etag=cle, last_modified=last_modified)
+            if reponse is None:
+                reponse = vue(request, *args, **kwargs)
+                if reponse.status_code != 200:
+                    return reponse
+            reponse['ETag'] = cle
+            reponse['Last-Modified'] = http_date(last_modified)
+            # Le navigateur garde la page mais revalide à chaque affichage
+            patch_cache_control(reponse, private=True, no_cache=True)
+            return reponse
+        return wrapper
+    return decorateur
@@ -20,10 +20,11 @@ from rest_framework import status
 from .models import Document, DocumentFile, Analysis, Devis, FactureEnergie, Message
 from .forms import DocumentForm, ContactForm
 from .serializers import DocumentSerializer, AnalysisSerializer
+from . import emails, jobs, extraction, extraction_cache, llm
+from .versions import conditionnel
 
-import PyPDF2
+import os
 import re
-import threading
 import base64
 import json
 import csv
@@ -43,39 +44,10 @@ SITE_URL = "https://conformxpert.com"
 # EMAILS — helpers internes
 # ──────────────────────────────────────────────────────────────
 
-def _send_html_async(sujet, template_name, context, destinataire, bcc=None):
-    """Envoie un email HTML via SendGrid dans un thread séparé."""
-    if not destinataire:
-        return
-
-    def _send():
-        try:
-            import sendgrid
-            from sendgrid.helpers.mail import Mail, Bcc
-
-            html = render_to_string(f'main/emails/{template_name}', context)
-            sg = sendgrid.SendGridAPIClient(api_key=settings.SENDGRID_API_KEY)
-            message = Mail(
-                from_email=settings.DEFAULT_FROM_EMAIL,
-                to_emails=destinataire,
-                subject=sujet,
-                html_content=html,
-            )
-            if bcc:
-                message.bcc = [Bcc(bcc)]
-            response = sg.send(message)
-            print(f"MAIL SENDGRID OK → {destinataire} (status {response.status_code})")
-        except Exception as e:
-            print(f"ERREUR MAIL : {e}")
-
-    t = threading.Thread(target=_send, daemon=True)
-    t.start()
-
-
 def send_mail_reception(document):
     if not document.client_email:
         return
-    _send_html_async(
+    emails.envoyer(
         f"[ConformXpert] Dossier bien reçu — {document.name}",
         "email_reception.html",
         {
@@ -95,7 +67,7 @@ def send_mail_validation_devis(document, devis=None):
     montant_ht = float(devis.montant) if devis and devis.montant else 0
     tva = round(montant_ht * 0.20, 2)
 
-    _send_html_async(
+    emails.envoyer(
         f"[ConformXpert] Votre devis — {document.name}",
         "email_devis.html",
         {
@@ -117,7 +89,7 @@ def send_mail_validation_devis(document, devis=None):
 def send_mail_analyse_commence(document):
     if not document.client_email:
         return
-    _send_html_async(
+    emails.envoyer(
         "[ConformXpert] L'analyse de votre dossier a démarré",
         "email_analyse_commence.html",
         {
@@ -133,7 +105,7 @@ def send_mail_analyse_commence(document):
 def send_mail_analyse_terminee(document):
     if not document.client_email:
         return
-    _send_html_async(
+    emails.envoyer(
         f"[ConformXpert] Votre rapport est disponible — {document.name}",
         "email_analyse_terminee.html",
         {
@@ -168,7 +140,7 @@ def accepter_devis(request, devis_id):
             devis.document.status = "en_cours"
             devis.document.save()
 
-        _send_html_async(
+        emails.envoyer(
             "✅ Devis accepté — ConformXpert",
             "email_notification_admin.html",
             {
@@ -199,7 +171,7 @@ def refuser_devis(request, devis_id):
         devis.motif_refus = motif
         devis.save(update_fields=['statut', 'motif_refus'])
 
-        _send_html_async(
+        emails.envoyer(
             "❌ Devis refusé — ConformXpert",
             "email_notification_admin.html",
             {
@@ -291,19 +263,17 @@ def fetch_rt2012_requirements():
 # EXTRACTION / ANALYSE PDF
 # ──────────────────────────────────────────────────────────────
 
-def extract_text_from_pdf(upload_path):
-    """Extrait le texte brut d'un fichier PDF via PyPDF2."""
-    text = ""
+def extract_text_from_pdf(upload_path, max_pages=None, fichier_hash=None):
+    """
+    Extrait le texte brut d'un fichier PDF (au plus max_pages premières pages).
+    Le texte de chaque page est mémorisé en base — voir main/extraction.py.
+    fichier_hash : SHA-256 du fichier s'il est déjà connu (évite de le relire).
+    """
     try:
-        with open(upload_path, "rb") as file:
-            reader = PyPDF2.PdfReader(file)
-            for page in reader.pages:
-                extracted = page.extract_text()
-                if extracted:
-                    text += extracted
+        return extraction.extraire_texte(upload_path, max_pages=max_pages, fichier_hash=fichier_hash)
     except Exception as e:
         print(f"Erreur lecture PDF: {e}")
-    return text
+        return ""
 
 
 # ──────────────────────────────────────────────────────────────
@@ -381,94 +351,107 @@ Texte du document :
 
 _PROMPT_DETECTION_SUFFIX = "\n\nRéponds UNIQUEMENT avec le JSON, sans texte avant ni après, sans balises markdown."
 
+_MODELE_DETECTION = llm.MODELE_DETECTION
 
-def analyser_rapport_thermique(texte, pdf_b64=None):
+# Versions du prompt de détection (clé du cache d'extraction) — mode texte et mode PDF natif
+_PROMPT_DETECTION_VERSION_TEXTE = extraction_cache.version_prompt(_PROMPT_DETECTION, _PROMPT_DETECTION_SUFFIX, 'texte')
+_PROMPT_DETECTION_VERSION_PDF   = extraction_cache.version_prompt(_PROMPT_DETECTION, _PROMPT_DETECTION_SUFFIX, 'pdf')
+
+
+def requete_detection(texte, pdf_b64=None):
     """
-    Analyse intelligente d'un rapport thermique via Claude.
-    Détecte le type (Climawin RT2012, Pleiades RE2020, DPE…),
-    extrait toutes les valeurs et génère des alertes de cohérence.
-    Retourne un dict avec type_rapport, valeurs, alertes, métadonnées.
+    Requête Claude de détection / extraction : (payload, en-têtes, version du prompt).
+    Consignes statiques en tête (préfixe mis en cache), puis le document : PDF natif
+    si disponible, sinon le texte extrait. Partagée avec la ré-extraction par lots
+    (main/reextraction.py).
     """
-    import os
-    import urllib.request
-    import urllib.error
+    user_content = [llm.bloc_cache(_PROMPT_DETECTION)]
+    headers_extra = {}
 
-    ANTHROPIC_API_KEY = os.environ.get('ANTHROPIC_API_KEY', '')
-    if not ANTHROPIC_API_KEY:
-        return _fallback_regex(texte)
+    if pdf_b64:
+        user_content.append({
+            "type": "document",
+            "source": {"type": "base64", "media_type": "application/pdf", "data": pdf_b64},
+        })
+        headers_extra = llm.BETA_PDF
+        user_content.append({
+            "type": "text",
+            "text": "(document PDF joint)" + _PROMPT_DETECTION_SUFFIX,
+        })
+    else:
+        user_content.append({
+            "type": "text",
+            "text": texte[:12000] + _PROMPT_DETECTION_SUFFIX,
+        })
+
+    payload = {
+        "model": _MODELE_DETECTION,
+        "max_tokens": 4000,
+        "messages": [{"role": "user", "content": user_content}],
+    }
+    prompt_version = _PROMPT_DETECTION_VERSION_PDF if pdf_b64 else _PROMPT_DETECTION_VERSION_TEXTE
+    return payload, headers_extra, prompt_version
 
+
+def lire_detection(raw):
+    """Dict JSON de la réponse de détection ; lève ValueError si elle n'en contient pas."""
+    # enlever markdown éventuel
+    raw = raw.strip().replace('```json', '').replace('```', '').strip()
+
+    # extraire uniquement le JSON
+    match = re.search(r'\{[\s\S]*\}', raw)
+    if not match:
+        raise ValueError("Aucun JSON détecté")
     try:
-        # Construire le message — avec PDF natif si disponible
-        user_content = []
-        headers_extra = {}
+        return json.loads(match.group(0))
+    except json.JSONDecodeError as e:
+        raise ValueError(f"JSON illisible : {e} — {match.group(0)[:1000]}") from e
 
-        if pdf_b64:
-            user_content.append({
-                "type": "document",
-                "source": {"type": "base64", "media_type": "application/pdf", "data": pdf_b64},
-            })
-            headers_extra = {"anthropic-beta": "pdfs-2024-09-25"}
-            user_content.append({
-                "type": "text",
-                "text": _PROMPT_DETECTION + "(document PDF joint)" + _PROMPT_DETECTION_SUFFIX,
-            })
-        else:
-            user_content.append({
-                "type": "text",
-                "text": _PROMPT_DETECTION + texte[:12000] + _PROMPT_DETECTION_SUFFIX,
-            })
 
-        payload = json.dumps({
-            "model": "claude-sonnet-4-5",
-            "max_tokens": 4000,
-            "messages": [{"role": "user", "content": user_content}],
-        }).encode('utf-8')
-
-        headers = {
-            "Content-Type": "application/json",
-            "x-api-key": ANTHROPIC_API_KEY,
-            "anthropic-version": "2023-06-01",
-        }
-        headers.update(headers_extra)
-
-        req = urllib.request.Request(
-            "https://api.anthropic.com/v1/messages",
-            data=payload, headers=headers, method="POST",
-        )
-        with urllib.request.urlopen(req, timeout=300) as resp:
-            result = json.loads(resp.read().decode('utf-8'))
+def analyser_rapport_thermique(texte, pdf_b64=None, contenu_hash=None, priorite=llm.NORMAL):
+    """
+    Analyse intelligente d'un rapport thermique via Claude.
+    Détecte le type (Climawin RT2012, Pleiades RE2020, DPE…),
+    extrait toutes les valeurs et génère des alertes de cohérence.
+    Retourne un dict avec type_rapport, valeurs, alertes, métadonnées.
 
-            raw = result['content'][0]['text'].strip()
+    contenu_hash : SHA-256 des fichiers sources — si fourni, le résultat est
+    lu / écrit dans le cache d'extraction (voir main/extraction_cache.py).
+    priorite : voie de l'appel dans la file du modèle (llm.INTERACTIF / NORMAL / LOT).
+    """
+    data = _detection_claude(texte, pdf_b64, contenu_hash, priorite)
+    return data if data is not None else _fallback_regex(texte)
 
-            # enlever markdown éventuel
-            raw = raw.replace('```json', '').replace('```', '').strip()
 
-            # extraire uniquement le JSON
-            match = re.search(r'\{[\s\S]*\}', raw)
-            if match:
-                raw = match.group(0)
-            else:
-                print("❌ Aucun JSON détecté")
-                return _fallback_regex(texte)
+def _detection_claude(texte, pdf_b64=None, contenu_hash=None, priorite=llm.NORMAL, motif='detection'):
+    """Résultat de détection de Claude (ou du cache d'extraction) ; None si Claude n'a pas répondu."""
+    payload, headers_extra, prompt_version = requete_detection(texte, pdf_b64)
+    if contenu_hash:
+        cached = extraction_cache.lire(contenu_hash, prompt_version, _MODELE_DETECTION)
+        if cached is not None:
+            print(f"PARSER CACHE HIT — {contenu_hash[:12]}")
+            return cached
 
-            try:
-                data = json.loads(raw)
+    if not llm.cle_api():
+        return None
 
-                print(f"PARSER OK — type={data.get('type_rapport')} norme={data.get('norme_suggeree')}")
-                return data
+    try:
+        result = llm.messages(payload, entetes=headers_extra, priorite=priorite, motif=motif)
 
-            except Exception as json_err:
-                print("❌ JSON parsing error :", json_err)
-                print("RAW PREVIEW:", raw[:1000])
-                return _fallback_regex(texte)
+        try:
+            data = lire_detection(llm.texte(result))
+        except ValueError as err:
+            print("❌", err)
+            return None
+
+        print(f"PARSER OK — type={data.get('type_rapport')} norme={data.get('norme_suggeree')}")
+        if contenu_hash:
+            extraction_cache.ecrire(contenu_hash, prompt_version, _MODELE_DETECTION, data)
+        return data
 
     except Exception as e:
         print("❌ Erreur API Claude :", e)
-        try:
-            print("RAW PREVIEW:", raw[:1000])
-        except:
-            pass
-        return _fallback_regex(texte)
+        return None
 
 
 def _fallback_regex(texte):
@@ -586,6 +569,8 @@ def analyze_document(document, data, resultat_complet=None):
         document.extraction_ok      = bool(resultat_complet.get('valeurs'))
         document.extraction_json    = resultat_complet
         document.extraction_alertes = resultat_complet.get('alertes', [])
+        document.extraction_niveau    = resultat_complet.get('niveau_extraction', '')
+        document.extraction_confiance = resultat_complet.get('confiance')
 
         # Auto-mise à jour de la norme si détectée
         norme_suggeree = resultat_complet.get('norme_suggeree')
@@ -608,6 +593,185 @@ def analyze_document(document, data, resultat_complet=None):
     document.save()
 
 
+def texte_dossier(document):
+    """
+    Texte de tous les fichiers du dossier (à défaut, de l'ancien champ upload) et
+    empreinte de leur contenu (clé du cache d'extraction) : (texte, contenu_hash).
+    """
+    texte_complet, contenu_hash, _ = _lire_dossier(document)
+    return texte_complet, contenu_hash
+
+
+def _lire_dossier(document):
+    """
+    (texte, contenu_hash, {chemin: SHA-256}) : chaque fichier n'est haché qu'une
+    fois, l'empreinte servant à la fois au stockage des pages et au cache d'extraction.
+    """
+    texte_complet = ""
+    empreintes = {}
+    for doc_file in document.fichiers.all():
+        try:
+            chemin = doc_file.fichier.path
+            fichier_hash = extraction_cache.hash_fichier(chemin)
+        except (OSError, ValueError):
+            continue
+        texte_complet += extract_text_from_pdf(chemin, fichier_hash=fichier_hash) + "\n\n"
+        empreintes[chemin] = fichier_hash
+
+    # Fallback sur l'ancien champ upload
+    if not texte_complet and document.upload:
+        try:
+            chemin = document.upload.path
+            fichier_hash = extraction_cache.hash_fichier(chemin)
+        except (OSError, ValueError):
+            pass
+        else:
+            texte_complet = extract_text_from_pdf(chemin, fichier_hash=fichier_hash)
+            empreintes = {chemin: fichier_hash}
+
+    contenu_hash = extraction_cache.combiner(empreintes.values()) if empreintes else None
+    return texte_complet, contenu_hash, empreintes
+
+
+def ingerer_document(document):
+    """
+    Extraction du texte de tous les fichiers du dossier puis analyse Claude.
+    Exécuté hors requête HTTP par le job « ingestion » (voir main/tasks.py).
+    """
+    texte_complet, contenu_hash = texte_dossier(document)
+    data = _detection_claude(texte_complet, contenu_hash=contenu_hash)
+    if data is None:
+        resultat_complet = _annoter(_fallback_regex(texte_complet), 'regex')
+    else:
+        resultat_complet = _annoter(data, 'texte')
+    valeurs = resultat_complet.get('valeurs', {})
+    analyze_document(document, valeurs, resultat_complet)
+    return resultat_complet
+
+
+# ── Extraction par niveaux ───────────────────────────────────
+# Du moins cher au plus cher : expressions régulières sur le texte PyPDF2,
+# Claude sur ce texte, Claude sur le PDF natif (fichier envoyé en base64,
+# plusieurs Mo). On s'arrête au premier niveau assez confiant ; le PDF n'est
+# lu et envoyé que si le texte est vide, scanné ou n'a pas suffi.
+
+# Confiance minimale pour s'arrêter au niveau regex (1 = toutes les valeurs clés
+# trouvées ; le niveau regex ne produit ni alertes ni métadonnées bâtiment)
+SEUIL_CONFIANCE_REGEX = float(os.environ.get('EXTRACTION_SEUIL_REGEX', '1'))
+# Confiance minimale pour s'arrêter au texte sans envoyer le PDF
+SEUIL_CONFIANCE_TEXTE = float(os.environ.get('EXTRACTION_SEUIL_TEXTE', '0.6'))
+# En dessous de ce nombre de caractères par page du PDF principal, le texte est jugé scanné
+CARACTERES_PAR_PAGE_MIN = int(os.environ.get('EXTRACTION_CARACTERES_PAGE', '200'))
+
+# Valeurs clés par norme : leur part trouvée fait l'essentiel de la confiance
+_VALEURS_CLES = {
+    'RT2012': ('rt2012_bbio', 'rt2012_cep', 'rt2012_tic'),
+    'RE2020': ('re2020_energy_efficiency', 're2020_thermal_comfort', 're2020_carbon_emissions'),
+    'DPE':    ('dpe_classe_energie', 'dpe_conso_ep', 'dpe_emission_ges'),
+}
+
+
+def _valeurs_cles(data):
+    type_rapport = data.get('type_rapport') or ''
+    if type_rapport == 'dpe':
+        return _VALEURS_CLES['DPE']
+    for norme in ('RT2012', 'RE2020'):
+        if type_rapport.endswith(norme.lower()):
+            return _VALEURS_CLES[norme]
+    return _VALEURS_CLES.get(data.get('norme_suggeree'))
+
+
+def confiance_extraction(data):
+    """
+    Confiance (0 à 1) d'un résultat de détection : part des valeurs clés de sa
+    norme trouvées (Bbio / Cep / Tic en RT2012…) pour 80 %, type de rapport
+    reconnu pour 20 %. Sans norme identifiée, trois valeurs quelconques valent
+    l'ensemble des valeurs clés.
+    """
+    valeurs = {k for k, v in (data.get('valeurs') or {}).items() if v not in (None, '')}
+    cles = _valeurs_cles(data)
+    if cles:
+        part = sum(1 for k in cles if k in valeurs) / len(cles)
+    else:
+        part = min(len(valeurs), 3) / 3
+    reconnu = (data.get('type_rapport') or 'inconnu') not in ('inconnu', 'autre')
+    return round(0.8 * part + 0.2 * reconnu, 2)
+
+
+def _annoter(data, niveau):
+    """Copie du résultat complétée du niveau qui l'a produit et de sa confiance."""
+    return dict(data, niveau_extraction=niveau, confiance=confiance_extraction(data))
+
+
+def _pdf_principal(document):
+    """Chemin du premier PDF valide du dossier (à défaut, de l'ancien champ upload), ou None."""
+    chemins = [f.fichier.path for f in document.fichiers.all() if f.fichier.name.lower().endswith('.pdf')]
+    if document.upload and document.upload.name:
+        chemins.append(document.upload.path)
+    for chemin in chemins:
+        try:
+            with open(chemin, 'rb') as f:
+                if f.read(4) == b'%PDF':
+                    return chemin
+        except OSError as e:
+            print(f"Erreur lecture fichier {chemin}: {e}")
+    return None
+
+
+def _texte_insuffisant(texte, chemin_pdf):
+    """Vrai si le texte est vide, ou trop maigre pour les pages du PDF principal (scan)."""
+    longueur = len(texte.strip())
+    if not longueur:
+        return True
+    if not chemin_pdf:
+        return False
+    try:
+        pages = extraction.nombre_pages(chemin_pdf)
+    except Exception:
+        return False
+    return longueur < CARACTERES_PAR_PAGE_MIN * pages
+
+
+def analyser_par_niveaux(document, priorite=llm.INTERACTIF):
+    """
+    Détection / extraction d'un dossier au moindre coût :
+      1. regex sur le texte extrait — retenu si sa confiance atteint SEUIL_CONFIANCE_REGEX ;
+      2. Claude sur le texte — retenu si sa confiance atteint SEUIL_CONFIANCE_TEXTE ;
+      3. Claude sur le PDF principal, d'emblée si le texte est vide ou scanné.
+    Le meilleur résultat obtenu est retourné, annoté de 'niveau_extraction' et
+    'confiance'. Lève ValueError si le dossier n'a ni texte ni PDF.
+    """
+    texte, contenu_hash, empreintes = _lire_dossier(document)
+    chemin_pdf = _pdf_principal(document)
+    if not texte.strip() and not chemin_pdf:
+        raise ValueError('Aucun document PDF trouvé dans ce dossier')
+
+    resultat = None
+    if not _texte_insuffisant(texte, chemin_pdf):
+        resultat = _annoter(_fallback_regex(texte), 'regex')
+        if resultat['confiance'] >= SEUIL_CONFIANCE_REGEX:
+            return resultat
+
+        data = _detection_claude(texte, contenu_hash=contenu_hash, priorite=priorite, motif='detection_texte')
+        if data is not None:
+            resultat = _annoter(data, 'texte')
+            if resultat['confiance'] >= SEUIL_CONFIANCE_TEXTE:
+                return resultat
+
+    if chemin_pdf:
+        with open(chemin_pdf, 'rb') as f:
+            pdf_bytes = f.read()
+        data = _detection_claude(
+            texte, pdf_b64=base64.b64encode(pdf_bytes).decode('utf-8'),
+            contenu_hash=empreintes.get(chemin_pdf) or extraction_cache.hash_octets(pdf_bytes),
+            priorite=priorite, motif='detection_pdf',
+        )
+        if data is not None:
+            annote = _annoter(data, 'pdf')
+            if resultat is None or annote['confiance'] >= resultat['confiance']:
+                resultat = annote
+
+    return resultat or _annoter(_fallback_regex(texte), 'regex')
 
 
 # ──────────────────────────────────────────────────────────────
@@ -665,9 +829,6 @@ def contact(request):
 
             email_envoye = False
             try:
-                import sendgrid
-                from sendgrid.helpers.mail import Mail
-
                 nom     = form.cleaned_data['name']
                 email   = form.cleaned_data['email']
                 phone   = form.cleaned_data.get('phone', 'N/A')
@@ -722,21 +883,17 @@ def contact(request):
                 </div>
                 """
 
-                sg = sendgrid.SendGridAPIClient(api_key=settings.SENDGRID_API_KEY)
-                mail = Mail(
-                    from_email=settings.DEFAULT_FROM_EMAIL,
-                    to_emails=getattr(settings, 'CONTACT_EMAIL', 'contact@conformxpert.com'),
-                    subject=f"[ConformXpert] Nouveau contact : {nom}",
-                    html_content=contenu_html,
-                )
                 # Reply-To = email du client pour pouvoir répondre directement
-                mail.reply_to = email
-                response = sg.send(mail)
-                if response.status_code in (200, 201, 202):
-                    email_envoye = True
+                emails.mettre_en_file(
+                    f"[ConformXpert] Nouveau contact : {nom}",
+                    contenu_html,
+                    getattr(settings, 'CONTACT_EMAIL', 'contact@conformxpert.com'),
+                    reply_to=email,
+                )
+                email_envoye = True
             except Exception as e:
                 import logging
-                logging.getLogger(__name__).error(f"Erreur envoi email contact SendGrid : {e}")
+                logging.getLogger(__name__).error(f"Erreur mise en file email contact : {e}")
 
             if email_envoye:
                 messages.success(request, 'Message envoyé. Nous vous répondons sous 48h.')
@@ -865,29 +1022,13 @@ def import_document(request):
                     taille=f.size,
                 )
 
-            # Extraction du texte de tous les fichiers
-            texte_complet = ""
-            for doc_file in document.fichiers.all():
-                try:
-                    texte_complet += extract_text_from_pdf(doc_file.fichier.path) + "\n\n"
-                except Exception:
-                    pass
-
-            # Fallback sur l'ancien champ upload
-            if not texte_complet and document.upload:
-                try:
-                    texte_complet = extract_text_from_pdf(document.upload.path)
-                except Exception:
-                    texte_complet = ""
-
             # Pour bilan carbone, on ne parse pas comme un rapport thermique
             if type_analyse == 'carbone':
                 document.extraction_alertes = []
                 document.save(update_fields=['extraction_alertes'])
             else:
-                resultat_complet = analyser_rapport_thermique(texte_complet)
-                valeurs = resultat_complet.get('valeurs', {})
-                analyze_document(document, valeurs, resultat_complet)
+                # Extraction + analyse Claude déléguées au worker (manage.py run_worker)
+                jobs.enqueue('ingestion', document=document)
             send_mail_reception(document)
 
             messages.success(request, "Dossier reçu. Votre lien de suivi a été créé.")
@@ -947,6 +1088,8 @@ def get_tracking_steps(document):
     return result
 
 
+@conditionnel('tracking_token', 'token', page=True,
+              ignorer=lambda request: request.GET.get('accepter_devis') == '1')
 def tracking(request, token):
     document = get_object_or_404(Document, tracking_token=token)
     step_list = get_tracking_steps(document)
@@ -994,20 +1137,20 @@ def home(request):
     if not request.user.is_staff:
         return redirect('landing')
 
-    documents = Document.objects.filter(is_active=True).order_by('-upload_date')
-
-    # Sous-ensembles par type
-    energie_docs = documents.filter(type_analyse="energie")
-    carbone_docs = documents.filter(type_analyse="carbone")
-    
+    from . import stats
 
-    total_projects  = documents.count()
-    compliant_count = sum(1 for doc in documents if doc.is_conform is True)
-    compliance_rate = round(compliant_count / total_projects * 100, 1) if total_projects else 0
-    pending_count   = documents.filter(status='recu').count()
+    # Compteurs : une requête groupée, en cache (voir main/stats.py)
+    context = dict(stats.stats_dashboard())
 
-    five_days_ago = timezone.now() - timedelta(days=5)
-    old_pending   = documents.filter(status='recu', upload_date__lt=five_days_ago).count()
+    # Kanban : une seule requête, répartie en colonnes côté Python
+    colonnes = defaultdict(list)
+    kanban = (
+        Document.objects.filter(is_active=True)
+        .only('id', 'name', 'upload_date', 'norme', 'building_type', 'conformite', 'status', 'type_analyse')
+        .order_by('-upload_date')
+    )
+    for doc in kanban:
+        colonnes[(doc.type_analyse, doc.status)].append(doc)
 
     try:
         recent_devis    = list(Devis.objects.all()[:5])
@@ -1016,72 +1159,17 @@ def home(request):
         recent_devis     = []
         devis_en_attente = 0
 
-    # ── Stats mensuelles (6 derniers mois) ──────────────────
-    monthly_data = []
-    today = timezone.now().date()
-    for i in range(5, -1, -1):
-        # Arithmétique correcte par mois (pas d'approximation en jours)
-        month = (today.month - i - 1) % 12 + 1
-        year  = today.year + ((today.month - i - 1) // 12)
-        count = documents.filter(
-            upload_date__year=year,
-            upload_date__month=month,
-        ).count()
-        monthly_data.append({
-            'label': ['Jan','Fév','Mar','Avr','Mai','Jun','Jul','Aoû','Sep','Oct','Nov','Déc'][month - 1],
-            'count': count,
-        })
-    max_monthly = max((m['count'] for m in monthly_data), default=1) or 1
-
-    # ── Conformité par norme ─────────────────────────────────
-    norme_stats = defaultdict(lambda: {'total': 0, 'conformes': 0})
-    for doc in documents.filter(status='termine'):
-        n = doc.norme or ('Carbone' if doc.type_analyse == 'carbone' else '—')
-        norme_stats[n]['total'] += 1
-        if doc.is_conform is True:
-            norme_stats[n]['conformes'] += 1
-    norme_conformite = []
-    for norme_name, vals in norme_stats.items():
-        pct = round(vals['conformes'] / vals['total'] * 100) if vals['total'] else 0
-        norme_conformite.append({'norme': norme_name, 'total': vals['total'], 'conformes': vals['conformes'], 'pct': pct})
-    norme_conformite.sort(key=lambda x: -x['total'])
-
-    # ── Terminés ce mois ─────────────────────────────────────
-    termine_ce_mois = documents.filter(
-        status='termine',
-        upload_date__year=today.year,
-        upload_date__month=today.month,
-    ).count()
-
-    context = {
-        'documents':   documents,
-        'energie_docs': energie_docs,
-        'carbone_docs': carbone_docs,
-
-        'total_projects':  total_projects,
-        'compliance_rate': compliance_rate,
-        'pending_count':   pending_count,
-        'old_pending':     old_pending,
-        'recent_devis':    recent_devis,
+    context.update({
+        'recent_devis':     recent_devis,
         'devis_en_attente': devis_en_attente,
         # Détail par statut
-        'docs_energie_recu':     energie_docs.filter(status='recu'),
-        'docs_energie_en_cours': energie_docs.filter(status='en_cours'),
-        'docs_energie_termine':  energie_docs.filter(status='termine'),
-        'docs_carbone_recu':     carbone_docs.filter(status='recu'),
-        'docs_carbone_en_cours': carbone_docs.filter(status='en_cours'),
-        'docs_carbone_termine':  carbone_docs.filter(status='termine'),
-
-        # Compteurs
-        'count_energie': energie_docs.count(),
-        'count_carbone': carbone_docs.count(),
-
-        # Nouveaux : stats enrichies
-        'monthly_data':      monthly_data,
-        'max_monthly':       max_monthly,
-        'norme_conformite':  norme_conformite,
-        'termine_ce_mois':   termine_ce_mois,
-    }
+        'docs_energie_recu':     colonnes[('energie', 'recu')],
+        'docs_energie_en_cours': colonnes[('energie', 'en_cours')],
+        'docs_energie_termine':  colonnes[('energie', 'termine')],
+        'docs_carbone_recu':     colonnes[('carbone', 'recu')],
+        'docs_carbone_en_cours': colonnes[('carbone', 'en_cours')],
+        'docs_carbone_termine':  colonnes[('carbone', 'termine')],
+    })
     return render(request, 'main/home.html', context)
 
 
@@ -1096,11 +1184,14 @@ def results(request):
     return render(request, 'main/results.html', context)
 
 
-@login_required(login_url='/login/')
-def history(request):
+def _filtrer_historique(request):
+    """
+    Dossiers de l'historique filtrés selon ?q= / ?status= / ?type=.
+    Partagé par la page historique et son export CSV.
+    Retourne (queryset, q, filtre_status, filtre_type).
+    """
     qs = Document.objects.filter(is_active=True).order_by('-upload_date')
 
-    # ── Filtres serveur-side (couvrent toutes les pages) ──
     q = request.GET.get('q', '').strip()
     filtre_status = request.GET.get('status', '')
     filtre_type   = request.GET.get('type', '')
@@ -1116,6 +1207,13 @@ def history(request):
         qs = qs.filter(status=filtre_status)
     if filtre_type:
         qs = qs.filter(type_analyse=filtre_type)
+    return qs, q, filtre_status, filtre_type
+
+
+@login_required(login_url='/login/')
+def history(request):
+    # ── Filtres serveur-side (couvrent toutes les pages) ──
+    qs, q, filtre_status, filtre_type = _filtrer_historique(request)
 
     paginator = Paginator(qs, 20)
     page_number = request.GET.get('page', 1)
@@ -1131,42 +1229,120 @@ def history(request):
     })
 
 
+class _Echo:
+    """Pseudo-fichier pour csv.writer : retourne la ligne au lieu de la stocker."""
+    def write(self, value):
+        return value
+
+
+_EXPORT_CHUNK = 2000
+
+
 @login_required(login_url='/login/')
 def export_csv_history(request):
-    response = HttpResponse(content_type='text/csv; charset=utf-8')
+    """
+    Export CSV de l'historique (mêmes filtres que la page), en streaming :
+    curseur par lots sur les seules colonnes exportées, mémoire constante
+    quel que soit le nombre de dossiers.
+    """
+    from django.http import StreamingHttpResponse
+
+    qs, _, _, _ = _filtrer_historique(request)
+    lignes = qs.values_list(
+        'id', 'name', 'client_name', 'client_email', 'type_analyse',
+        'norme', 'status', 'conformite', 'upload_date',
+    ).iterator(chunk_size=_EXPORT_CHUNK)
+
+    statuts    = {'recu': 'Reçu', 'en_cours': 'En cours', 'termine': 'Terminé'}
+    conformite = {True: 'Conforme', False: 'Non conforme'}
+
+    def contenu():
+        writer = csv.writer(_Echo(), delimiter=';')
+        yield '\ufeff'
+        yield writer.writerow(['Référence', 'Nom du dossier', 'Client', 'Email client', 'Type', 'Norme', 'Statut', 'Conformité', 'Date de dépôt'])
+        for doc_id, name, client_name, client_email, type_analyse, norme, doc_status, conform, upload_date in lignes:
+            yield writer.writerow([
+                f'DOC-{doc_id:04d}',
+                name,
+                client_name or '—',
+                client_email or '—',
+                'Bilan carbone' if type_analyse == 'carbone' else 'Validation thermique',
+                norme or '—',
+                statuts.get(doc_status, doc_status),
+                conformite.get(conform, '—'),
+                upload_date.strftime('%d/%m/%Y') if upload_date else '—',
+            ])
+
+    response = StreamingHttpResponse(contenu(), content_type='text/csv; charset=utf-8')
     response['Content-Disposition'] = 'attachment; filename="dossiers_conformxpert.csv"'
-    response.write('\ufeff')
-    writer = csv.writer(response, delimiter=';')
-    writer.writerow(['Référence', 'Nom du dossier', 'Client', 'Email client', 'Type', 'Norme', 'Statut', 'Conformité', 'Date de dépôt'])
-    for doc in Document.objects.all().order_by('-upload_date'):
-        conform = '—'
-        if doc.is_conform is True:
-            conform = 'Conforme'
-        elif doc.is_conform is False:
-            conform = 'Non conforme'
-        writer.writerow([
-            f'DOC-{doc.id:04d}',
-            doc.name,
-            doc.client_name or '—',
-            doc.client_email or '—',
-            'Bilan carbone' if doc.type_analyse == 'carbone' else 'Validation thermique',
-            doc.norme or '—',
-            {'recu': 'Reçu', 'en_cours': 'En cours', 'termine': 'Terminé'}.get(doc.status, doc.status),
-            conform,
-            doc.upload_date.strftime('%d/%m/%Y') if doc.upload_date else '—',
-        ])
+    return response
+
+
+@login_required(login_url='/login/')
+def export_rapports_zip(request):
+    """
+    Archive ZIP des rapports PDF + Word des dossiers terminés d'un client
+    (?client=email ou nom) et/ou d'un mois de dépôt (?mois=AAAA-MM).
+    Rendu sur un pool de processus et envoyé au fil de l'eau (voir main/export_lot.py).
+    """
+    if not request.user.is_staff:
+        return redirect('landing')
+
+    from django.http import StreamingHttpResponse
+    from . import export_lot
+
+    client = request.GET.get('client', '').strip()
+    mois   = request.GET.get('mois', '').strip()
+    if not client and not mois:
+        return HttpResponse("Préciser ?client= et/ou ?mois=AAAA-MM", status=400, content_type='text/plain; charset=utf-8')
+    try:
+        ids = list(export_lot.documents(client, mois).values_list('id', flat=True))
+    except ValueError as e:
+        return HttpResponse(str(e), status=400, content_type='text/plain; charset=utf-8')
+    if not ids:
+        return HttpResponse("Aucun dossier terminé pour ces critères", status=404, content_type='text/plain; charset=utf-8')
+
+    nom = '_'.join(p for p in ('rapports', export_lot.nom_sur(client) if client else '', mois) if p)
+    response = StreamingHttpResponse(export_lot.flux_zip(ids), content_type='application/zip')
+    response['Content-Disposition'] = f'attachment; filename="{nom}.zip"'
     return response
 
 
 @login_required(login_url='/login/')
 def ia_rapport_status(request, doc_id):
-    doc = get_object_or_404(Document, id=doc_id)
+    """
+    Statut du dossier et présence du rapport IA.
+    ?depuis=<etat> → long-poll : répond dès que l'état diffère de celui connu
+    du client (ou après LONGPOLL_TIMEOUT secondes). Voir main/notifications.py.
+    job_actif : une ingestion ou un rapport IA est en file / en cours — le client
+    cesse de scruter quand il passe à False.
+    """
+    from django.http import Http404
+    from . import notifications
+
+    depuis = request.GET.get('depuis')
+    if depuis:
+        etat = notifications.attendre(doc_id, depuis)
+    else:
+        etat = notifications.etat(doc_id)
+    if etat is None:
+        raise Http404("Dossier introuvable")
     return JsonResponse({
-        'has_rapport': bool(doc.rapport_ia_json),
-        'status': doc.status,
+        'has_rapport': etat['has_rapport'],
+        'status':      etat['status'],
+        'etat':        notifications.jeton(etat),
+        'job_actif':   _job_actif(doc_id),
     })
 
 
+def _job_actif(doc_id):
+    """Une ingestion ou une génération de rapport IA du dossier est-elle en file / en cours ?"""
+    from .models import Job
+    return Job.objects.filter(
+        document_id=doc_id, type_job__in=['ingestion', 'rapport_ia'], statut__in=['en_attente', 'en_cours'],
+    ).exists()
+
+
 @login_required(login_url='/login/')
 def settings_view(request):
     from main.templatetags.conformity_tags import get_seuils, NORME_FIELDS, NORMES_PAR_PAYS
@@ -1381,6 +1557,7 @@ def edit_document(request, doc_id):
         'rapport_ia_score':    rapport_ia_score,
         'rapport_ia_resume':   rapport_ia_resume,
         'rapport_ia_fiabilite':rapport_ia_fiabilite,
+        'job_actif':           _job_actif(document.id),
         'email_steps': [
             ('1', '#60a5fa', 'rgba(59,130,246,.12)',  'Confirmation réception',       'Confirmer la réception du dossier',      'reception'),
             ('2', '#c8a84b', 'rgba(200,168,75,.12)',  'Envoi du devis',               "Devis avec bouton d'acceptation",        'devis'),
@@ -1459,19 +1636,14 @@ def delete_document(request, doc_id):
 
 @csrf_exempt
 def verifier_seuils(request):
-    import os
-    import urllib.request
-    import urllib.error
-
     if not request.user.is_authenticated:
         return JsonResponse({'error': 'Session expirée — veuillez vous reconnecter'}, status=401)
     if request.method != 'POST':
         return JsonResponse({'error': 'Méthode invalide'}, status=405)
 
     norme = request.POST.get('norme', 'RE2020')
-    ANTHROPIC_API_KEY = os.environ.get('ANTHROPIC_API_KEY', '')
 
-    if not ANTHROPIC_API_KEY:
+    if not llm.cle_api():
         return JsonResponse(
             {'error': 'Clé API Anthropic manquante — ajoutez ANTHROPIC_API_KEY dans vos variables Railway'},
             status=500,
@@ -1531,31 +1703,17 @@ Réponds UNIQUEMENT en JSON valide avec cette structure exacte, sans markdown ni
 Si tout est à jour, "modifications" sera [] et "a_jour" sera true."""
 
     try:
-        payload = json.dumps({
-            "model": "claude-sonnet-4-5",
+        result = llm.messages({
+            "model": llm.MODELE_SEUILS,
             "max_tokens": 1500,
             "messages": [{"role": "user", "content": prompt}],
-        }).encode('utf-8')
-
-        req = urllib.request.Request(
-            "https://api.anthropic.com/v1/messages",
-            data=payload,
-            headers={
-                "Content-Type": "application/json",
-                "x-api-key": ANTHROPIC_API_KEY,
-                "anthropic-version": "2023-06-01",
-            },
-            method="POST",
-        )
-        with urllib.request.urlopen(req, timeout=30) as resp:
-            result = json.loads(resp.read().decode('utf-8'))
-            raw = result['content'][0]['text'].strip().replace('```json', '').replace('```', '').strip()
-            return JsonResponse({'success': True, 'norme': norme, 'resultat': json.loads(raw)})
-
-    except urllib.error.HTTPError as e:
-        body = e.read().decode('utf-8')
-        print(f"ANTHROPIC API ERROR {e.code}: {body}")
-        return JsonResponse({'error': f'API {e.code}: {body}'}, status=500)
+        }, timeout=llm.TIMEOUT_COURT, priorite=llm.INTERACTIF, motif='seuils')
+        raw = llm.texte(result).strip().replace('```json', '').replace('```', '').strip()
+        return JsonResponse({'success': True, 'norme': norme, 'resultat': json.loads(raw)})
+
+    except llm.ErreurLLM as e:
+        print(f"ANTHROPIC API ERROR {e.statut}: {e.corps}")
+        return JsonResponse({'error': f'API {e.statut}: {e.corps}'}, status=500)
     except Exception as e:
         print(f"VERIFIER_SEUILS ERROR: {e}")
         return JsonResponse({'error': str(e)}, status=500)
@@ -1566,10 +1724,24 @@ Si tout est à jour, "modifications" sera [] et "a_jour" sera true."""
 # ──────────────────────────────────────────────────────────────
 
 def download_rapport_word(request, doc_id):
+    document = get_object_or_404(Document, id=doc_id)
+    safe_name = document.name.replace(' ', '_')
+    response = HttpResponse(
+        construire_rapport_word(document),
+        content_type='application/vnd.openxmlformats-officedocument.wordprocessingml.document',
+    )
+    response['Content-Disposition'] = f'attachment; filename="rapport_{safe_name}.docx"'
+    return response
+
+
+def construire_rapport_word(document, output=None):
+    """
+    Construit le rapport Word (DOCX) du dossier.
+    Écrit dans `output` (flux binaire) s'il est fourni et le retourne, sinon retourne les octets.
+    """
     from docx import Document as DocxDocument
     from io import BytesIO
 
-    document = get_object_or_404(Document, id=doc_id)
     doc = DocxDocument()
     doc.add_heading(f'Rapport ConformXpert — {document.name}', 0)
     doc.add_paragraph(f'Référence : DOC-{document.id:04d}')
@@ -1592,57 +1764,47 @@ def download_rapport_word(request, doc_id):
     ]:
         doc.add_paragraph(f'{label} : {val if val is not None else "—"}')
 
+    if output is not None:
+        doc.save(output)
+        return output
     buffer = BytesIO()
     doc.save(buffer)
-    buffer.seek(0)
-    safe_name = document.name.replace(' ', '_')
-    response = HttpResponse(
-        buffer.read(),
-        content_type='application/vnd.openxmlformats-officedocument.wordprocessingml.document',
-    )
-    response['Content-Disposition'] = f'attachment; filename="rapport_{safe_name}.docx"'
-    return response
+    return buffer.getvalue()
 
 
 def download_report(request, document_id):
-    """Génère et renvoie le rapport PDF ReportLab complet."""
+    """
+    Rapport PDF ReportLab complet, servi depuis le cache disque (voir main/rapports_pdf.py) :
+    il n'est reconstruit que si un champ affiché ou le gabarit ont changé.
+    """
+    from . import rapports_pdf
+
+    document = get_object_or_404(Document.objects.only('id', *rapports_pdf.champs_rapport()), id=document_id)
+    chemin = rapports_pdf.chemin_a_jour(document)
+    if chemin is None:
+        chemin = rapports_pdf.generer(Document.objects.get(id=document.id))
+    safe_name = document.name.replace(' ', '_').replace('/', '_')
+    return rapports_pdf.servir(request, chemin, f"rapport_{safe_name}.pdf")
+
+
+def construire_rapport_pdf(document, output=None):
+    """
+    Construit le rapport PDF ReportLab complet.
+    Écrit dans `output` (flux binaire) s'il est fourni et le retourne, sinon retourne les octets.
+    """
     from io import BytesIO
     from reportlab.lib.pagesizes import A4
-    from reportlab.lib.styles import ParagraphStyle
     from reportlab.lib.units import cm
-    from reportlab.lib import colors
-    from reportlab.platypus import (
-        SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle,
-        HRFlowable, PageBreak,
-    )
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, PageBreak
     from reportlab.lib.enums import TA_CENTER, TA_RIGHT
     from main.templatetags.conformity_tags import get_seuils, CRITERIA_GREATER_EQUAL
-
-    document = get_object_or_404(Document, id=document_id)
-
-    PAGE_W, PAGE_H = A4
-    ML = MR = MT = 2 * cm
-    MB = 2.5 * cm
-    W  = PAGE_W - ML - MR
-
-    # ── Palette de couleurs ──
-    NAVY  = colors.HexColor('#0C1929')
-    GOLD  = colors.HexColor('#C8A84B')
-    GOLD_L = colors.HexColor('#F5EDD0')
-    GREEN  = colors.HexColor('#1A9E2E')
-    GREEN_L = colors.HexColor('#E8F8EE')
-    RED   = colors.HexColor('#C62828')
-    RED_L = colors.HexColor('#FEF0F0')
-    LGRAY = colors.HexColor('#F8F8FC')
-    MGRAY = colors.HexColor('#E0E0E8')
-    WHITE = colors.white
-    MUTED = colors.HexColor('#888899')
-    TEXT  = colors.HexColor('#1A1A2E')
-
-    def st(name, **kw):
-        d = dict(fontName='Helvetica', fontSize=9, textColor=TEXT, leading=14, spaceAfter=0)
-        d.update(kw)
-        return ParagraphStyle(name, **d)
+    from main import report_styles as rs
+    # Styles, palette et éléments statiques partagés (construits une fois par processus)
+    from main.report_styles import (
+        PAGE_W, PAGE_H, ML, MR, MT, MB, W,
+        NAVY, GOLD, GREEN, GREEN_L, RED, RED_L, LGRAY, MGRAY, WHITE, MUTED, TEXT,
+        st, section_title,
+    )
 
     seuils    = get_seuils(document.building_type, document.climate_zone, document.pays, document.norme)
     is_conform = document.is_conform
@@ -1659,14 +1821,6 @@ def download_report(request, document_id):
         verdict_txt, verdict_col, verdict_bg = "En cours d'analyse", MUTED, LGRAY
 
     # ── Helpers ──
-    def section_title(num, title):
-        label = f"{num}.  {title.upper()}"
-        return [
-            HRFlowable(width=W, thickness=1.5, color=GOLD, spaceAfter=5, spaceBefore=10),
-            Paragraph(label, st('sh', fontName='Helvetica-Bold', fontSize=8,
-                                textColor=GOLD, characterSpacing=0.8, spaceAfter=8)),
-        ]
-
     def info_table(rows):
         data = [
             [Paragraph(k, st('ik', fontSize=8, textColor=MUTED)),
@@ -1674,15 +1828,7 @@ def download_report(request, document_id):
             for k, v in rows
         ]
         t = Table(data, colWidths=[4.5 * cm, W - 4.5 * cm])
-        t.setStyle(TableStyle([
-            ('BACKGROUND',    (0, 0), (0, -1), LGRAY),
-            ('TOPPADDING',    (0, 0), (-1, -1), 5),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 5),
-            ('LEFTPADDING',   (0, 0), (-1, -1), 8),
-            ('RIGHTPADDING',  (0, 0), (-1, -1), 8),
-            ('LINEBELOW',     (0, 0), (-1, -2), 0.5, MGRAY),
-            ('VALIGN',        (0, 0), (-1, -1), 'MIDDLE'),
-        ]))
+        t.setStyle(rs.TS_INFO)
         return t
 
     def criteria_section(title, rows_data):
@@ -1699,18 +1845,7 @@ def download_report(request, document_id):
         data  = [header] + rows
         col_w = [7 * cm, 2.2 * cm, 2.2 * cm, 2.3 * cm, 3.3 * cm]
         t = Table(data, colWidths=col_w, repeatRows=1)
-        style = [
-            ('BACKGROUND',    (0, 0), (-1, 0), NAVY),
-            ('TOPPADDING',    (0, 0), (-1, -1), 6),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
-            ('LEFTPADDING',   (0, 0), (-1, -1), 6),
-            ('RIGHTPADDING',  (0, 0), (-1, -1), 6),
-            ('LINEBELOW',     (0, 1), (-1, -1), 0.5, MGRAY),
-            ('VALIGN',        (0, 0), (-1, -1), 'MIDDLE'),
-        ]
-        for i in range(2, len(data), 2):
-            style.append(('BACKGROUND', (0, i), (-1, i), LGRAY))
-        t.setStyle(TableStyle(style))
+        t.setStyle(rs.ts_criteres(len(data)))
         return [t, Spacer(1, 0.4 * cm)]
 
     def criteria_row(label, value, key, unit=""):
@@ -1736,17 +1871,10 @@ def download_report(request, document_id):
         full_title = f"<b>{prefix}  {title}</b>"
         data = [
             [Paragraph(full_title, st('rbt', fontName='Helvetica-Bold', fontSize=9, textColor=TEXT, spaceAfter=3))],
-            [Paragraph(text, st('rbd', fontSize=8.5, textColor=colors.HexColor('#444455'), leading=13))],
+            [Paragraph(text, st('rbd', fontSize=8.5, textColor=rs.GRIS_TEXTE, leading=13))],
         ]
         t = Table(data, colWidths=[W])
-        t.setStyle(TableStyle([
-            ('BACKGROUND',    (0, 0), (-1, -1), bg),
-            ('LINEBEFORE',    (0, 0), (0, -1), 3, left_color),
-            ('TOPPADDING',    (0, 0), (-1, -1), 8),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
-            ('LEFTPADDING',   (0, 0), (-1, -1), 12),
-            ('RIGHTPADDING',  (0, 0), (-1, -1), 12),
-        ]))
+        t.setStyle(rs.ts_reco(bg, left_color))
         return [t, Spacer(1, 0.25 * cm)]
 
     # ── Page de couverture (canvas) ──
@@ -1755,9 +1883,9 @@ def download_report(request, document_id):
         c.setFillColor(NAVY)
         c.rect(0, 0, PAGE_W, PAGE_H, fill=1, stroke=0)
 
-        c.setFillColor(colors.HexColor('#C8A84B11'))
+        c.setFillColor(rs.COUV_CERCLE_1)
         c.circle(PAGE_W, PAGE_H, 180, fill=1, stroke=0)
-        c.setFillColor(colors.HexColor('#C8A84B0A'))
+        c.setFillColor(rs.COUV_CERCLE_2)
         c.circle(0, 0, 130, fill=1, stroke=0)
 
         c.setFont('Helvetica-Bold', 22)
@@ -1785,7 +1913,7 @@ def download_report(request, document_id):
         c.drawString(ML, PAGE_H - 7 * cm, title)
 
         c.setFont('Helvetica', 11)
-        c.setFillColor(colors.HexColor('#AAAACC'))
+        c.setFillColor(rs.COUV_SOUSTITRE)
         subtitle = f"{document.get_building_type_display()}  ·  {norme}  ·  {pays_label}"
         c.drawString(ML, PAGE_H - 8.2 * cm, subtitle)
 
@@ -1801,7 +1929,7 @@ def download_report(request, document_id):
         tw = c.stringWidth(verdict_txt, 'Helvetica-Bold', 12)
         c.drawString(v_x + (v_w - tw) / 2, v_y + 0.45 * cm, verdict_txt)
 
-        c.setStrokeColor(colors.HexColor('#C8A84B44'))
+        c.setStrokeColor(rs.COUV_FILET)
         c.setLineWidth(0.5)
         c.line(ML, PAGE_H - 12.5 * cm, PAGE_W - MR, PAGE_H - 12.5 * cm)
 
@@ -1827,11 +1955,11 @@ def download_report(request, document_id):
             c.setFillColor(WHITE)
             c.drawString(x, y - 0.5 * cm, val)
 
-        c.setFillColor(colors.HexColor('#C8A84B33'))
-        c.setStrokeColor(colors.HexColor('#00000000'))
+        c.setFillColor(rs.COUV_BANDEAU)
+        c.setStrokeColor(rs.TRANSPARENT)
         c.rect(0, 0, PAGE_W, 1.8 * cm, fill=1, stroke=0)
         c.setFont('Helvetica', 8)
-        c.setFillColor(colors.HexColor('#666677'))
+        c.setFillColor(rs.COUV_PIED)
         c.drawString(ML, 0.65 * cm, "ConformXpert  ·  Analyse documentaire indépendante")
         c.setFillColor(GOLD)
         txt_r = "Confidentiel  ·  Usage interne"
@@ -1855,7 +1983,8 @@ def download_report(request, document_id):
 
     # ── Story ──
     story = []
-    story.append(Spacer(1, PAGE_H - MT - MB))
+    # Page 1 = couverture dessinée par draw_cover : le cadre reste vide
+    story.append(Spacer(1, 1))
     story.append(PageBreak())
 
     # Sommaire
@@ -1864,29 +1993,7 @@ def download_report(request, document_id):
         f"Rapport d'analyse — {document.name}",
         st('ts', fontSize=8.5, textColor=MUTED, spaceAfter=12),
     ))
-    toc_items = [
-        ("1.  Résumé exécutif & verdict global",             "3"),
-        ("2.  Informations du dossier",                      "3"),
-        (f"3.  Analyse {norme} — Critères de conformité",   "4"),
-        ("4.  Recommandations & points d'attention",         "5"),
-    ]
-    if document.admin_notes:
-        toc_items.append(("5.  Notes & observations de l'expert", "5"))
-    toc_items.append(("6.  Mentions légales & disclaimer", "6"))
-
-    for label, pg in toc_items:
-        row = Table([[
-            Paragraph(label, st('tl', fontSize=10)),
-            Paragraph(pg, st('tp', fontName='Helvetica-Bold', fontSize=9, textColor=GOLD, alignment=TA_RIGHT)),
-        ]], colWidths=[W - 1.5 * cm, 1.5 * cm])
-        row.setStyle(TableStyle([
-            ('TOPPADDING',    (0, 0), (-1, -1), 8),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
-            ('LEFTPADDING',   (0, 0), (-1, -1), 0),
-            ('RIGHTPADDING',  (0, 0), (-1, -1), 0),
-            ('LINEBELOW',     (0, 0), (-1, -1), 0.5, MGRAY),
-        ]))
-        story.append(row)
+    story += rs.sommaire(norme, bool(document.admin_notes))
 
     story.append(PageBreak())
 
@@ -1901,14 +2008,7 @@ def download_report(request, document_id):
                      textColor=verdict_col, alignment=TA_RIGHT)),
     ]]
     vb = Table(vb_data, colWidths=[W * 0.55, W * 0.45])
-    vb.setStyle(TableStyle([
-        ('BACKGROUND',    (0, 0), (-1, -1), NAVY),
-        ('TOPPADDING',    (0, 0), (-1, -1), 14),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 14),
-        ('LEFTPADDING',   (0, 0), (-1, -1), 16),
-        ('RIGHTPADDING',  (0, 0), (-1, -1), 16),
-        ('VALIGN',        (0, 0), (-1, -1), 'MIDDLE'),
-    ]))
+    vb.setStyle(rs.TS_VERDICT)
     story.append(vb)
     story.append(Spacer(1, 0.6 * cm))
 
@@ -2010,7 +2110,7 @@ def download_report(request, document_id):
             story += reco_block("[~]", "Tic — Température intérieure conventionnelle élevée",
                                 "Renforcer la protection solaire, améliorer l'inertie thermique, "
                                 "prévoir une ventilation nocturne efficace.",
-                                colors.HexColor('#FFFBF0'), GOLD)
+                                rs.AMBRE_L, GOLD)
         if document.rt2012_airtightness and document.rt2012_airtightness > seuils.get('rt2012_airtightness', 9999):
             story += reco_block("[!]", "Étanchéité à l'air insuffisante",
                                 "Revoir les jonctions et points singuliers de l'enveloppe, "
@@ -2028,7 +2128,7 @@ def download_report(request, document_id):
             story += reco_block("[~]", "DH — Confort d'été insuffisant",
                                 "Installer des brise-soleils, augmenter l'inertie thermique, "
                                 "prévoir une ventilation nocturne.",
-                                colors.HexColor('#FFFBF0'), GOLD)
+                                rs.AMBRE_L, GOLD)
     elif norme == 'PEB':
         if document.peb_espec and document.peb_espec > seuils.get('peb_espec', 9999):
             story += reco_block("[!]", "Espec — Énergie spécifique non conforme (PEB)",
@@ -2067,58 +2167,16 @@ def download_report(request, document_id):
                 st('nt', fontSize=9, leading=14),
             )
         ]], colWidths=[W])
-        notes_t.setStyle(TableStyle([
-            ('BACKGROUND',    (0, 0), (-1, -1), LGRAY),
-            ('LINEBEFORE',    (0, 0), (0, -1), 3, GOLD),
-            ('TOPPADDING',    (0, 0), (-1, -1), 10),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 10),
-            ('LEFTPADDING',   (0, 0), (-1, -1), 12),
-            ('RIGHTPADDING',  (0, 0), (-1, -1), 12),
-        ]))
+        notes_t.setStyle(rs.TS_NOTES)
         story.append(notes_t)
 
     story.append(PageBreak())
 
-    # Mentions légales
-    story += section_title("6", "Mentions légales & disclaimer")
-    disc_items = [
-        ("Nature du rapport",
-         "Ce rapport est établi sur la base des documents fournis par le client et constitue une analyse "
-         "documentaire indépendante. Il ne se substitue pas à une attestation officielle de conformité "
-         "délivrée par un organisme accrédité."),
-        ("Responsabilité",
-         "ConformXpert s'engage à fournir une analyse rigoureuse et objective des documents transmis. "
-         "La conformité finale du bâtiment relève de la responsabilité du maître d'ouvrage et des "
-         "professionnels en charge de la construction."),
-        ("Confidentialité",
-         "Ce document est strictement confidentiel et destiné exclusivement au client mentionné en page "
-         "de couverture. Toute reproduction ou diffusion sans autorisation écrite de ConformXpert est interdite."),
-        ("Réglementations",
-         "RT2012 : Arrêté du 26 octobre 2010  |  RE2020 : Décret n°2021-1004 du 29 juillet 2021  |  "
-         "PEB : Directive européenne 2010/31/UE  |  Minergie / SIA380 : Normes SIA Suisse  |  "
-         "CNEB : Code national de l'énergie pour les bâtiments (Canada)  |  "
-         "LENOZ : Règlement grand-ducal du 23 juillet 2016 (Luxembourg)"),
-        ("Contact",
-         "ConformXpert  ·  contact@conformxpert.fr  ·  Délai garanti 10 jours ouvrés"),
-    ]
-    for k, v in disc_items:
-        disc_t = Table([[
-            Paragraph(k, st('dk', fontName='Helvetica-Bold', fontSize=9, textColor=TEXT)),
-            Paragraph(v, st('dv', fontSize=8.5, textColor=colors.HexColor('#444455'), leading=13)),
-        ]], colWidths=[4 * cm, W - 4 * cm])
-        disc_t.setStyle(TableStyle([
-            ('BACKGROUND',    (0, 0), (-1, -1), LGRAY),
-            ('TOPPADDING',    (0, 0), (-1, -1), 8),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
-            ('LEFTPADDING',   (0, 0), (-1, -1), 10),
-            ('RIGHTPADDING',  (0, 0), (-1, -1), 10),
-            ('LINEBELOW',     (0, 0), (-1, -1), 0.5, MGRAY),
-            ('VALIGN',        (0, 0), (-1, -1), 'TOP'),
-        ]))
-        story.append(disc_t)
+    # Mentions légales (éléments statiques partagés)
+    story += rs.mentions_legales()
 
     # Build
-    buffer = BytesIO()
+    buffer = output if output is not None else BytesIO()
     doc_pdf = SimpleDocTemplate(
         buffer, pagesize=A4,
         leftMargin=ML, rightMargin=MR,
@@ -2126,12 +2184,9 @@ def download_report(request, document_id):
         title=f"Rapport ConformXpert - {document.name}",
     )
     doc_pdf.build(story, onFirstPage=draw_cover, onLaterPages=draw_page)
-
-    buffer.seek(0)
-    response = HttpResponse(buffer.read(), content_type='application/pdf')
-    safe_name = document.name.replace(' ', '_').replace('/', '_')
-    response['Content-Disposition'] = f'inline; filename="rapport_{safe_name}.pdf"'
-    return response
+    if output is not None:
+        return output
+    return buffer.getvalue()
 
 
 # ──────────────────────────────────────────────────────────────
@@ -2188,27 +2243,21 @@ _CHAMPS_NORME = {
 }
 
 
-def _build_system_prompt(type_analyse, ref, document, infos_batiment, source_donnees,
-                          valeurs_str, norme, carbone_seuils_str):
-    """Construit le system prompt Claude selon le type d'analyse."""
-
-    seuils_str = _SEUILS_LABELS.get(norme, "Voir réglementation applicable")
-
-    if type_analyse == 'carbone':
-        return f"""Tu es ConformXpert, un tiers expert indépendant spécialisé en bilan carbone immobilier.
+# Consignes et schéma JSON du rapport IA : identiques pour tous les dossiers d'un
+# type d'analyse, ils forment le préfixe mis en cache (llm.bloc_cache) ; le
+# contexte du dossier suit, dans un second bloc.
+_SYSTEM_RAPPORT_CARBONE = """Tu es ConformXpert, un tiers expert indépendant spécialisé en bilan carbone immobilier.
 Tu réalises des bilans carbone indépendants à partir des documents fournis (rapport thermique, DPE, factures énergie, attestation RE2020, FDES).
 Ton rôle est d'évaluer les émissions de CO2 du bâtiment et d'identifier les leviers de réduction.
 
-Contexte du dossier :
-- Référence : {ref}
-- Projet : {document.name}
-- Client : {document.client_name or 'Non renseigné'}
-- Type de mission : Bilan carbone immobilier indépendant
-- Informations du bâtiment :
-{infos_batiment}
-- Source des documents : {source_donnees}
-- Référentiels applicables :
-{carbone_seuils_str}
+Référentiels bilan carbone applicables :
+- RE2020 Ic énergie seuil max maison : 4 kgCO2eq/m².an
+- RE2020 Ic énergie seuil max collectif : 6.5 kgCO2eq/m².an
+- RE2020 Ic construction seuil mi-vie 2025 : 640 kgCO2eq/m²
+- RE2020 Ic construction seuil mi-vie 2028 : 590 kgCO2eq/m²
+- Décret tertiaire : réduction 40% en 2030, 50% en 2040, 60% en 2050
+- DPE passoire classe F : 70 kgCO2eq/m².an
+- DPE passoire classe G : 100 kgCO2eq/m².an
 
 Ta mission d'expert indépendant :
 1. Évaluer les émissions de CO2 liées à l'énergie du bâtiment (chauffage, électricité, eau chaude sanitaire)
@@ -2220,49 +2269,49 @@ Ta mission d'expert indépendant :
 Réponds UNIQUEMENT en JSON valide, sans markdown, sans explication, sans balises.
 
 Structure JSON attendue :
-{{
+{
   "verdict": "Faible empreinte carbone" | "Empreinte carbone modérée" | "Empreinte carbone élevée" | "Données insuffisantes",
   "score_global": 72,
   "resume_executif": "Paragraphe de 3-5 phrases résumant la performance carbone du bâtiment, les principaux postes d'émission et les enjeux.",
-  "emissions": {{
-    "ic_energie": {{"valeur": null, "seuil_re2020": null, "conforme": null, "unite": "kgCO2eq/m².an"}},
-    "ic_construction": {{"valeur": null, "seuil_re2020": null, "conforme": null, "unite": "kgCO2eq/m²"}},
-    "conso_ep": {{"valeur": null, "unite": "kWh ep/m².an"}},
-    "emission_ges": {{"valeur": null, "unite": "kgCO2eq/m².an"}},
+  "emissions": {
+    "ic_energie": {"valeur": null, "seuil_re2020": null, "conforme": null, "unite": "kgCO2eq/m².an"},
+    "ic_construction": {"valeur": null, "seuil_re2020": null, "conforme": null, "unite": "kgCO2eq/m²"},
+    "conso_ep": {"valeur": null, "unite": "kWh ep/m².an"},
+    "emission_ges": {"valeur": null, "unite": "kgCO2eq/m².an"},
     "classe_dpe": null
-  }},
+  },
   "postes_emission": [
-    {{
+    {
       "poste": "Chauffage",
       "part_estimee": "45%",
       "niveau": "faible" | "modéré" | "élevé",
       "observation": "Description basée sur les documents fournis."
-    }}
+    }
   ],
   "conformite_reglementaire": [
-    {{
+    {
       "referentiel": "RE2020 Ic énergie",
       "statut": "conforme" | "non_conforme" | "non_applicable" | "non_vérifié",
       "detail": "Explication."
-    }}
+    }
   ],
   "leviers_reduction": [
-    {{
+    {
       "levier": "Isolation thermique",
       "impact": "faible" | "modéré" | "élevé",
       "horizon": "Court terme" | "Moyen terme" | "Long terme",
       "gain_estime": "ex: -15% émissions",
       "description": "Description de l'action recommandée."
-    }}
+    }
   ],
   "risques": [
-    {{
+    {
       "titre": "...",
       "description": "...",
       "gravite": "faible" | "modéré" | "élevé",
       "action": "Action recommandée.",
       "urgence": "Immédiat" | "Court terme" | "Moyen terme"
-    }}
+    }
   ],
   "points_forts": ["Point fort identifié"],
   "verifications_complementaires": [
@@ -2271,34 +2320,18 @@ Structure JSON attendue :
   ],
   "avis_independant": "Paragraphe conclusif exprimant l'avis de ConformXpert sur la performance carbone du bâtiment.",
   "mentions_legales": "Ce rapport constitue un bilan carbone documentaire indépendant réalisé par ConformXpert. Il ne se substitue pas à un bilan carbone complet certifié ni à une attestation réglementaire officielle."
-}}
+}
 
 Base ton analyse sur les documents fournis.
 Si des éléments ne sont pas documentés, l'indiquer explicitement plutôt que d'inventer.
 Sois précis, factuel et indépendant."""
 
-
-    else:  # 'energie' (défaut)
-        return f"""Tu es ConformXpert, un tiers expert indépendant spécialisé dans la validation de rapports thermiques réglementaires.
+_SYSTEM_RAPPORT_ENERGIE = """Tu es ConformXpert, un tiers expert indépendant spécialisé dans la validation de rapports thermiques réglementaires.
 Ton rôle n'est PAS de produire une étude thermique — le bureau d'études l'a déjà fait.
 Ton rôle est de vérifier, valider et commenter de manière indépendante le travail du bureau d'études.
 
-Contexte du dossier :
-- Référence : {ref}
-- Projet : {document.name}
-- Client : {document.client_name or 'Non renseigné'}
-- Type de mission : Validation indépendante de rapport thermique
-- Norme applicable : {norme}
-- Logiciel utilisé par le bureau d'études : {getattr(document, 'logiciel_detecte', 'Non détecté')}
-- Informations du bâtiment :
-{infos_batiment}
-- Source des documents : {source_donnees}
-- Valeurs déclarées dans le rapport :
-{valeurs_str}
-- Seuils réglementaires officiels {norme} : {seuils_str}
-
 Ta mission de validation indépendante :
-1. Vérifier que les valeurs déclarées respectent bien les seuils réglementaires {norme}
+1. Vérifier que les valeurs déclarées respectent bien les seuils réglementaires de la norme applicable
 2. Évaluer la cohérence globale du rapport (les valeurs sont-elles plausibles pour ce type de bâtiment ?)
 3. Identifier les éventuelles anomalies, valeurs manquantes ou incohérences
 4. Croiser avec les consommations réelles issues des factures si disponibles
@@ -2308,13 +2341,13 @@ Ta mission de validation indépendante :
 Réponds UNIQUEMENT en JSON valide, sans markdown, sans explication, sans balises.
 
 Structure JSON attendue :
-{{
+{
   "verdict": "Conforme" | "Non Conforme" | "Données insuffisantes",
   "fiabilite_rapport": "Élevée" | "Moyenne" | "Faible" | "Non évaluable",
   "score_global": 78,
   "resume_executif": "Paragraphe de 3-5 phrases exprimant l'avis indépendant sur le rapport du bureau d'études.",
   "criteres": [
-    {{
+    {
       "nom": "Nom du critère",
       "valeur": 72.0,
       "seuil": 50.0,
@@ -2322,88 +2355,105 @@ Structure JSON attendue :
       "conforme": false,
       "ecart_pct": 44.0,
       "commentaire": "Analyse indépendante de ce critère — est-il plausible ? cohérent ?"
-    }}
+    }
   ],
   "points_forts": ["Point fort validé indépendamment"],
   "anomalies": [
-    {{
+    {
       "critere": "Nom du critère ou aspect concerné",
       "gravite": "bloquant" | "majeur" | "mineur",
       "description": "Description précise de l'anomalie ou incohérence détectée.",
       "recommendation": "Action recommandée pour lever le doute ou corriger."
-    }}
+    }
   ],
   "non_conformites": [
-    {{
+    {
       "critere": "...",
       "gravite": "bloquant" | "majeur" | "mineur",
       "description": "Description du dépassement de seuil constaté.",
       "action": "Action corrective recommandée.",
       "delai": "...",
       "cout_estime": "..."
-    }}
+    }
   ],
   "recommandations": [
-    {{
+    {
       "priorite": "URGENT" | "RECOMMANDÉ" | "OPTIONNEL",
       "titre": "Titre de la recommandation",
       "description": "Description détaillée.",
       "impact_reglementaire": "Impact sur la conformité réglementaire.",
       "delai": "..."
-    }}
+    }
   ],
-  "coherence_factures": {{
+  "coherence_factures": {
     "coherent": true,
     "commentaire": "Analyse de la cohérence entre les valeurs du rapport et les consommations réelles des factures."
-  }},
-  "analyse_enveloppe": {{"synthese": "...", "points_attention": ["..."]}},
-  "systemes_energetiques": {{"synthese": "...", "equipements": [{{"poste": "Chauffage", "equipement": "...", "performance": "...", "evaluation": "..."}}]}},
-  "impact_financier": {{
+  },
+  "analyse_enveloppe": {"synthese": "...", "points_attention": ["..."]},
+  "systemes_energetiques": {"synthese": "...", "equipements": [{"poste": "Chauffage", "equipement": "...", "performance": "...", "evaluation": "..."}]},
+  "impact_financier": {
     "cout_non_conformite": "Estimation du surcoût lié aux non-conformités.",
     "economies_potentielles": "Économies annuelles estimées après mise en conformité.",
     "retour_investissement": "Délai de retour sur investissement estimé."
-  }},
+  },
   "verifications_complementaires": [
     "Vérification recommandée si des doutes subsistent"
   ],
-  "contexte_reglementaire": "Rappel des exigences {norme} applicables à ce projet.",
+  "contexte_reglementaire": "Rappel des exigences de la norme applicable à ce projet.",
   "avis_independant": "Paragraphe conclusif exprimant clairement l'avis de ConformXpert sur la qualité et la fiabilité du rapport soumis.",
   "mentions_legales": "Ce rapport constitue une analyse documentaire indépendante réalisée par ConformXpert. Il ne se substitue pas à une attestation officielle de conformité."
-}}
+}
 
 Si une valeur n'est pas disponible pour un critère, omets ce critère.
 Sois précis, factuel et indépendant. Ton rôle est celui d'un auditeur externe, pas d'un co-auteur du rapport."""
 
 
-@csrf_exempt
-def generer_rapport_ia(request, doc_id):
+def _build_system_prompt(type_analyse, ref, document, infos_batiment, source_donnees,
+                          valeurs_str, norme):
     """
-    Endpoint AJAX rapport IA.
-    GET              → retourne le rapport mis en cache (si existant)
-    POST             → génère via Claude, sauvegarde en BDD et retourne le JSON
-    POST ?force=1    → force la régénération même si déjà sauvegardé
+    Construit le system prompt Claude selon le type d'analyse : liste de deux blocs,
+    consignes statiques (préfixe mis en cache) puis contexte du dossier.
     """
-    import os
-    import urllib.request
-    import urllib.error
 
-    document = get_object_or_404(Document, id=doc_id)
+    seuils_str = _SEUILS_LABELS.get(norme, "Voir réglementation applicable")
 
-    # Retourner le rapport en cache si disponible
-    force = request.GET.get('force') == '1'
-    if not force and document.rapport_ia_json:
-        try:
-            return JsonResponse({'success': True, 'rapport': json.loads(document.rapport_ia_json), 'cached': True})
-        except Exception:
-            pass  # JSON corrompu → régénération
+    if type_analyse == 'carbone':
+        statique = _SYSTEM_RAPPORT_CARBONE
+        contexte = f"""Contexte du dossier :
+- Référence : {ref}
+- Projet : {document.name}
+- Client : {document.client_name or 'Non renseigné'}
+- Type de mission : Bilan carbone immobilier indépendant
+- Informations du bâtiment :
+{infos_batiment}
+- Source des documents : {source_donnees}"""
 
-    if request.method not in ('POST', 'GET'):
-        return JsonResponse({'error': 'Méthode invalide'}, status=405)
+    else:  # 'energie' (défaut)
+        statique = _SYSTEM_RAPPORT_ENERGIE
+        contexte = f"""Contexte du dossier :
+- Référence : {ref}
+- Projet : {document.name}
+- Client : {document.client_name or 'Non renseigné'}
+- Type de mission : Validation indépendante de rapport thermique
+- Norme applicable : {norme}
+- Logiciel utilisé par le bureau d'études : {getattr(document, 'logiciel_detecte', 'Non détecté')}
+- Informations du bâtiment :
+{infos_batiment}
+- Source des documents : {source_donnees}
+- Valeurs déclarées dans le rapport :
+{valeurs_str}
+- Seuils réglementaires officiels {norme} : {seuils_str}"""
+
+    return [llm.bloc_cache(statique), {"type": "text", "text": contexte}]
 
-    ANTHROPIC_API_KEY = os.environ.get('ANTHROPIC_API_KEY', '')
-    if not ANTHROPIC_API_KEY:
-        return JsonResponse({'error': 'Clé API Anthropic manquante (ANTHROPIC_API_KEY)'}, status=500)
 
+def _preparer_rapport_ia(document):
+    """
+    Construit la requête Claude du rapport IA : (system_prompt, user_content, headers_extra).
+    system_prompt est une liste de blocs (consignes mises en cache + contexte du dossier).
+    Exécuté par le worker — la lecture et l'encodage base64 des PDF ne se font plus
+    dans le thread de la requête HTTP.
+    """
     # ── 1. Lire les fichiers PDF ───────────────────────────────
     pdf_b64_list = []
     for doc_file in document.fichiers.all()[:3]:
@@ -2439,17 +2489,6 @@ def generer_rapport_ia(request, doc_id):
     annee        = getattr(document, 'annee_construction', None)
     logements    = getattr(document, 'nombre_logements', None)
 
-    carbone_seuils_str = (
-    "\n    Référentiels bilan carbone :\n"
-    "    - RE2020 Ic énergie seuil max maison : 4 kgCO2eq/m².an\n"
-    "    - RE2020 Ic énergie seuil max collectif : 6.5 kgCO2eq/m².an\n"
-    "    - RE2020 Ic construction seuil mi-vie 2025 : 640 kgCO2eq/m²\n"
-    "    - RE2020 Ic construction seuil mi-vie 2028 : 590 kgCO2eq/m²\n"
-    "    - Décret tertiaire : réduction 40% en 2030, 50% en 2040, 60% en 2050\n"
-    "    - DPE passoire classe F : 70 kgCO2eq/m².an\n"
-    "    - DPE passoire classe G : 100 kgCO2eq/m².an\n"
-)
-
     infos_batiment = (
         f"- Type : {document.get_building_type_display()}\n"
         f"- Pays / Zone : {pays_label} — Zone climatique {zone}\n"
@@ -2530,7 +2569,7 @@ def generer_rapport_ia(request, doc_id):
     # ── 4. System prompt ──────────────────────────────────────
     system_prompt = _build_system_prompt(
         type_analyse, ref, document, infos_batiment,
-        source_donnees_enrichie, valeurs_str, norme, carbone_seuils_str,
+        source_donnees_enrichie, valeurs_str, norme,
     )
 
     # ── 6. Message utilisateur ────────────────────────────────
@@ -2543,7 +2582,7 @@ def generer_rapport_ia(request, doc_id):
                 "type": "document",
                 "source": {"type": "base64", "media_type": "application/pdf", "data": b64},
             })
-        headers_extra = {"anthropic-beta": "pdfs-2024-09-25"}
+        headers_extra = llm.BETA_PDF
         user_content.append({"type": "text", "text": f"""
 Tu es ConformXpert, un tiers expert indépendant mandaté pour valider ce rapport thermique.
 
@@ -2647,52 +2686,206 @@ Génère le rapport de validation complet en respectant le format JSON défini d
 N'invente aucune valeur. Si une donnée est absente, indique "Non disponible" dans le champ concerné.
 """})
 
-    # ── 7. Appel API Claude ───────────────────────────────────
-    try:
-        payload = json.dumps({
-            "model": "claude-sonnet-4-5",
-            "max_tokens": 8000,
-            "system": system_prompt,
-            "messages": [{"role": "user", "content": user_content}],
-        }).encode('utf-8')
-
-        headers = {
-            "Content-Type": "application/json",
-            "x-api-key": ANTHROPIC_API_KEY,
-            "anthropic-version": "2023-06-01",
-        }
-        headers.update(headers_extra)
-
-        req = urllib.request.Request(
-            "https://api.anthropic.com/v1/messages",
-            data=payload, headers=headers, method="POST",
-        )
-        with urllib.request.urlopen(req, timeout=300) as resp:
-            result = json.loads(resp.read().decode('utf-8'))
-            raw = result['content'][0]['text'].strip().replace('```json', '').replace('```', '').strip()
-            rapport = json.loads(raw)
+    return system_prompt, user_content, headers_extra
+
+
+_MODELE_RAPPORT_IA = llm.MODELE_RAPPORT
+
+# Taille typique (caractères) du JSON rendu par Claude — sert à estimer la progression
+_TAILLE_RAPPORT_ATTENDUE = 14000
+
+# Intervalle minimal (s) entre deux écritures de la progression en base
+_PROGRESSION_INTERVALLE = 0.75
+
+
+def produire_rapport_ia(document, job=None):
+    """
+    Génère le rapport IA d'un dossier via l'API Claude en streaming et l'enregistre.
+    Si un job est fourni, la progression et le texte partiel y sont publiés au fil
+    de la réception des tokens (lus par le flux SSE `rapport_ia_flux`).
+    Lève une exception en cas d'échec (le job passe alors en échec).
+    """
+    import time
 
-        document.rapport_ia_json = json.dumps(rapport, ensure_ascii=False)
-        document.save(update_fields=['rapport_ia_json'])
+    def publier(pct=None, etape=None, texte=None):
+        if job is not None:
+            jobs.publier_progression(job, progression=pct, etape=etape, texte_partiel=texte)
 
-        return JsonResponse({'success': True, 'rapport': rapport, 'cached': False})
+    if not llm.cle_api():
+        raise RuntimeError('Clé API Anthropic manquante (ANTHROPIC_API_KEY)')
 
-    except urllib.error.HTTPError as e:
-        body = e.read().decode('utf-8')
-        print(f"CLAUDE API ERROR {e.code}: {body}")
-        return JsonResponse({'error': f'Erreur API Claude ({e.code}) : {body[:300]}'}, status=500)
+    publier(3, 'Lecture des documents…', '')
+    system_prompt, user_content, headers_extra = _preparer_rapport_ia(document)
+
+    payload = {
+        "model": _MODELE_RAPPORT_IA,
+        "max_tokens": 8000,
+        "system": system_prompt,
+        "messages": [{"role": "user", "content": user_content}],
+    }
+
+    publier(10, 'Envoi du dossier à Claude…')
+    morceaux = []
+    taille = 0
+    derniere_publication = 0.0
+    try:
+        # Réponse SSE : un événement content_block_delta par fragment de texte
+        for evt in llm.flux(payload, entetes=headers_extra, priorite=llm.INTERACTIF, motif='rapport_ia'):
+            if evt.get('type') != 'content_block_delta':
+                continue
+            delta = evt.get('delta', {}).get('text', '')
+            if not delta:
+                continue
+            morceaux.append(delta)
+            taille += len(delta)
+
+            maintenant = time.monotonic()
+            if maintenant - derniere_publication >= _PROGRESSION_INTERVALLE:
+                derniere_publication = maintenant
+                pct = 15 + int(80 * min(1.0, taille / _TAILLE_RAPPORT_ATTENDUE))
+                publier(min(pct, 95), 'Rédaction du rapport…', "".join(morceaux))
+    except llm.ErreurLLM as e:
+        print(f"CLAUDE API ERROR: {e}")
+        raise RuntimeError(f'Erreur {e}')
+
+    texte = "".join(morceaux)
+    publier(97, 'Enregistrement du rapport…', texte)
+    raw = texte.strip().replace('```json', '').replace('```', '').strip()
+    try:
+        rapport = json.loads(raw)
     except json.JSONDecodeError as e:
         print(f"JSON PARSE ERROR: {e}")
-        return JsonResponse({'error': f'Erreur parsing JSON : {e}'}, status=500)
-    except Exception as e:
-        print(f"GENERER_RAPPORT_IA ERROR: {e}")
-        return JsonResponse({'error': str(e)}, status=500)
+        raise RuntimeError(f'Erreur parsing JSON : {e}')
+
+    document.rapport_ia_json = json.dumps(rapport, ensure_ascii=False)
+    document.save(update_fields=['rapport_ia_json'])
+    return rapport
+
+
+@csrf_exempt
+def generer_rapport_ia(request, doc_id):
+    """
+    Endpoint AJAX rapport IA.
+    GET              → retourne le rapport mis en cache (si existant)
+    POST             → met la génération en file (job 'rapport_ia') et répond 202
+                       avec l'URL du flux SSE de progression
+    POST ?force=1    → force la régénération même si déjà sauvegardé
+    """
+    document = get_object_or_404(Document, id=doc_id)
+
+    # Retourner le rapport en cache si disponible
+    force = request.GET.get('force') == '1'
+    if not force and document.rapport_ia_json:
+        try:
+            return JsonResponse({'success': True, 'rapport': json.loads(document.rapport_ia_json), 'cached': True})
+        except Exception:
+            pass  # JSON corrompu → régénération
+
+    if request.method not in ('POST', 'GET'):
+        return JsonResponse({'error': 'Méthode invalide'}, status=405)
+
+    job = jobs.en_cours_pour('rapport_ia', document)
+    if request.method == 'GET':
+        if job is None:
+            return JsonResponse({'success': False, 'error': 'Aucun rapport généré'}, status=404)
+    elif job is None:
+        if not llm.cle_api():
+            return JsonResponse({'error': 'Clé API Anthropic manquante (ANTHROPIC_API_KEY)'}, status=500)
+        # Pas de nouvel essai automatique : l'admin attend le résultat à l'écran
+        job = jobs.enqueue('rapport_ia', document=document, max_tentatives=1)
+
+    return JsonResponse({
+        'success':  True,
+        'pending':  True,
+        'job_id':   job.id,
+        'flux_url': f'/dossier/{document.id}/rapport-ia/flux/{job.id}/',
+    }, status=202)
+
+
+# Durée max d'une connexion SSE : le navigateur se reconnecte ensuite tout seul
+# (EventSource + Last-Event-ID), ce qui libère régulièrement le worker web.
+_FLUX_DUREE_MAX = 25
+_FLUX_INTERVALLE = 0.5   # hors PostgreSQL (pas de NOTIFY) : relecture du job à cet intervalle
+_FLUX_ATTENTE_MAX = 5    # sous PostgreSQL : relecture au plus tard après ce délai sans notification
+
+
+@login_required(login_url='/login/')
+def rapport_ia_flux(request, doc_id, job_id):
+    """
+    Flux server-sent events d'un job de rapport IA.
+    Événements : progression {pct, etape}, texte {delta}, termine {rapport}, erreur {error}.
+    L'id de chaque événement « texte » est la position atteinte dans le texte partiel,
+    ce qui permet de reprendre sans doublon après reconnexion.
+    Entre deux lectures, le flux dort jusqu'au prochain avancement publié par le
+    worker (main/notifications.py) ; seule la fin du texte partiel est relue.
+    """
+    import time
+    from django.db.models.functions import Length, Substr
+    from . import notifications
+    from django.http import StreamingHttpResponse
+    from .models import Job
+
+    job = get_object_or_404(Job, id=job_id, document_id=doc_id, type_job='rapport_ia')
+    try:
+        position = max(0, int(request.headers.get('Last-Event-ID') or request.GET.get('depuis') or 0))
+    except ValueError:
+        position = 0
+
+    def evenement(nom, data, id_evt=None):
+        entete = f"id: {id_evt}\n" if id_evt is not None else ""
+        return f"{entete}event: {nom}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+    def flux():
+        nonlocal position
+        yield "retry: 1000\n\n"
+        derniere = None
+        fin = time.monotonic() + _FLUX_DUREE_MAX
+        while time.monotonic() < fin:
+            tic = notifications.tic_job(job.id)
+            etat = (
+                Job.objects.filter(id=job.id)
+                .annotate(delta=Substr('texte_partiel', position + 1), longueur=Length('texte_partiel'))
+                .values('statut', 'progression', 'etape', 'delta', 'longueur', 'erreur')
+                .first()
+            )
+            if etat is None:
+                yield evenement('erreur', {'error': 'Job introuvable'})
+                return
+
+            if (etat['progression'], etat['etape']) != derniere:
+                derniere = (etat['progression'], etat['etape'])
+                yield evenement('progression', {'pct': etat['progression'], 'etape': etat['etape']})
+
+            if etat['longueur'] > position:
+                yield evenement('texte', {'delta': etat['delta']}, id_evt=etat['longueur'])
+                position = etat['longueur']
+
+            if etat['statut'] == 'termine':
+                document = Document.objects.only('rapport_ia_json').get(id=doc_id)
+                try:
+                    rapport = json.loads(document.rapport_ia_json or 'null')
+                except Exception:
+                    rapport = None
+                yield evenement('termine', {'rapport': rapport})
+                return
+            if etat['statut'] == 'echec':
+                yield evenement('erreur', {'error': (etat['erreur'] or 'Échec de la génération').split('\n\n')[0]})
+                return
+            notifications.attendre_job(
+                job.id, tic, max(0, min(_FLUX_ATTENTE_MAX, fin - time.monotonic())), secours=_FLUX_INTERVALLE,
+            )
+
+    response = StreamingHttpResponse(flux(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
 
 
 # ──────────────────────────────────────────────────────────────
 # RAPPORT IA — page publique client
 # ──────────────────────────────────────────────────────────────
 
+@conditionnel('tracking_token', 'token', page=True, status='termine')
 def rapport_ia_client(request, token):
     """Page publique rapport IA — accessible via lien de suivi, sans login."""
     document = get_object_or_404(Document, tracking_token=token, status='termine')
@@ -2705,18 +2898,12 @@ def rapport_ia_client(request, token):
             rapport = None
 
 
+    from . import consommation
+
+    # Consommations pré-agrégées par mois et énergie (graphiques de la page)
     factures_data = []
     try:
-        for f in document.factures.all():
-            d = f.analyse_json or {}
-            factures_data.append({
-                "energie":       f.type_energie,
-                "periode_debut": d.get("periode_debut"),
-                "periode_fin":   d.get("periode_fin"),
-                "consommation":  d.get("consommation"),
-                "montant_ttc":   d.get("montant_ttc"),
-                "analyse_ok":    f.analyse_ok,
-            })
+        factures_data = consommation.lignes_mensuelles(document.id)
     except Exception as e:
         print("Erreur lecture factures:", e)
 
@@ -2732,64 +2919,6 @@ def rapport_ia_client(request, token):
 # FACTURES ÉNERGIE
 # ──────────────────────────────────────────────────────────────
 
-_PROMPT_FACTURE = """
-Tu es un expert en analyse de factures d'énergie (électricité et gaz naturel).
-Analyse attentivement cette facture et extrais toutes les données disponibles.
-
-Réponds UNIQUEMENT avec un objet JSON valide, sans texte avant ni après, sans balises markdown.
-Schéma exact :
-
-{
-  "fournisseur": "nom du fournisseur (ex: Hydro-Québec, Énergir, EDF...)",
-  "type_energie": "electricite" ou "gaz",
-  "periode_debut": "YYYY-MM-DD",
-  "periode_fin": "YYYY-MM-DD",
-  "nb_jours": 30,
-  "consommation": 1250.5,
-  "unite": "kWh",
-  "montant_ht": 145.20,
-  "montant_ttc": 162.50,
-  "devise": "CAD",
-  "tarif": "nom du tarif (ex: Tarif D, G, DM...)",
-  "puissance_souscrite_kw": null,
-  "numero_client": null,
-  "numero_compteur": null,
-  "adresse_consommation": null,
-  "cout_par_kwh": 0.115,
-  "notes": "toute observation pertinente"
-}
-
-Si une valeur est absente, utilise null.
-Pour cout_par_kwh : calcule-le si possible (montant_ht / consommation).
-Pour le gaz : convertis en kWh équivalent si possible (1 m³ ≈ 10.55 kWh).
-"""
-
-
-def _analyser_facture_ia(fichier_path):
-    """Envoie un PDF de facture à Claude et retourne le dict extrait."""
-    import anthropic
-
-    client = anthropic.Anthropic()
-    with open(fichier_path, 'rb') as f:
-        pdf_b64 = base64.standard_b64encode(f.read()).decode('utf-8')
-
-    resp = client.messages.create(
-        model="claude-haiku-4-5-20251001",
-        max_tokens=1200,
-        messages=[{
-            "role": "user",
-            "content": [
-                {"type": "document", "source": {"type": "base64", "media_type": "application/pdf", "data": pdf_b64}},
-                {"type": "text", "text": _PROMPT_FACTURE},
-            ],
-        }],
-    )
-    raw = resp.content[0].text.strip()
-    raw = re.sub(r'^```(?:json)?\s*', '', raw)
-    raw = re.sub(r'\s*```$', '', raw)
-    return json.loads(raw)
-
-
 def upload_facture(request, doc_id):
     """Upload d'une facture PDF pour un dossier."""
     if not request.user.is_authenticated:
@@ -2827,9 +2956,11 @@ def analyser_facture(request, facture_id):
         return JsonResponse({'success': False, 'error': 'Non authentifié'}, status=401)
     if request.method != 'POST':
         return JsonResponse({'success': False, 'error': 'Méthode non autorisée'})
+    from . import factures
+
     facture = get_object_or_404(FactureEnergie, id=facture_id)
     try:
-        donnees = _analyser_facture_ia(facture.fichier.path)
+        donnees = factures.analyser_fichier(facture.fichier.path, priorite=llm.INTERACTIF)
         facture.analyse_json  = donnees
         facture.analyse_ok    = True
         facture.analyse_error = ''
@@ -2843,28 +2974,49 @@ def analyser_facture(request, facture_id):
 
 
 def analyser_toutes_factures(request, doc_id):
-    """Analyse IA de toutes les factures non encore analysées d'un dossier."""
+    """
+    Analyse IA de toutes les factures non encore analysées d'un dossier.
+    Met en file un job 'factures' (appels Claude en parallèle, voir main/factures.py)
+    et répond 202 avec l'URL de suivi ; répond directement s'il n'y a rien à analyser.
+    """
     if not request.user.is_authenticated:
         return JsonResponse({'success': False, 'error': 'Non authentifié'}, status=401)
     if request.method != 'POST':
         return JsonResponse({'success': False, 'error': 'Méthode non autorisée'})
-    document  = get_object_or_404(Document, id=doc_id)
-    factures  = document.factures.filter(analyse_ok=False)
-    resultats = []
-    for facture in factures:
-        try:
-            donnees = _analyser_facture_ia(facture.fichier.path)
-            facture.analyse_json  = donnees
-            facture.analyse_ok    = True
-            facture.analyse_error = ''
-            facture.save()
-            resultats.append({'id': facture.id, 'nom': facture.nom, 'ok': True})
-        except Exception as e:
-            facture.analyse_error = str(e)
-            facture.analyse_ok    = False
-            facture.save()
-            resultats.append({'id': facture.id, 'nom': facture.nom, 'ok': False, 'error': str(e)})
-    return JsonResponse({'success': True, 'resultats': resultats})
+    document = get_object_or_404(Document, id=doc_id)
+    if not document.factures.filter(analyse_ok=False).exists():
+        return JsonResponse({'success': True, 'resultats': []})
+
+    job = jobs.en_cours_pour('factures', document)
+    if job is None:
+        if not llm.cle_api():
+            return JsonResponse({'success': False, 'error': 'Clé API Anthropic manquante (ANTHROPIC_API_KEY)'}, status=500)
+        job = jobs.enqueue('factures', document=document, max_tentatives=1)
+
+    return JsonResponse({
+        'success':    True,
+        'pending':    True,
+        'job_id':     job.id,
+        'statut_url': f'/dossier/{document.id}/factures/analyse/{job.id}/',
+    }, status=202)
+
+
+def analyse_factures_statut(request, doc_id, job_id):
+    """Avancement d'un job d'analyse des factures ; résultats par facture une fois terminé."""
+    from .models import Job
+
+    if not request.user.is_authenticated:
+        return JsonResponse({'success': False, 'error': 'Non authentifié'}, status=401)
+    job = get_object_or_404(
+        Job.objects.only('statut', 'progression', 'etape', 'resultat', 'erreur'),
+        id=job_id, document_id=doc_id, type_job='factures',
+    )
+    data = {'success': True, 'statut': job.statut, 'progression': job.progression, 'etape': job.etape}
+    if job.statut == 'termine':
+        data['resultats'] = (job.resultat or {}).get('resultats', [])
+    elif job.statut == 'echec':
+        data['error'] = (job.erreur or "Échec de l'analyse").split('\n\n')[0]
+    return JsonResponse(data)
 
 
 def supprimer_facture(request, facture_id):
@@ -2883,47 +3035,18 @@ def supprimer_facture(request, facture_id):
 
 
 def get_donnees_factures(request, doc_id):
-    """Retourne les données agrégées des factures analysées."""
+    """Retourne les consommations mensuelles pré-agrégées des factures analysées (main/consommation.py)."""
+    from . import consommation
+
     try:
-        document = get_object_or_404(Document, id=doc_id)
-        factures = document.factures.filter(analyse_ok=True).order_by('uploaded_at')
+        document = get_object_or_404(Document.objects.only('id'), id=doc_id)
+        donnees  = consommation.resume(document.id)
     except Exception as e:
         return JsonResponse({
             'success': False, 'error': f'Migration manquante : {e}',
             'mois': [], 'nb_factures': 0,
         })
-
-    mois = []
-    for f in factures:
-        d = f.analyse_json or {}
-        if d.get('consommation') is not None:
-            mois.append({
-                'periode_debut': d.get('periode_debut'),
-                'periode_fin':   d.get('periode_fin'),
-                'consommation':  d.get('consommation'),
-                'unite':         d.get('unite', 'kWh'),
-                'montant_ttc':   d.get('montant_ttc'),
-                'cout_par_kwh':  d.get('cout_par_kwh'),
-                'type_energie':  f.type_energie,
-                'fournisseur':   d.get('fournisseur'),
-                'devise':        d.get('devise', 'CAD'),
-                'nom':           f.nom,
-            })
-
-    conso_totale = sum(m['consommation'] for m in mois if m['consommation'])
-    cout_total   = sum(m['montant_ttc']  for m in mois if m['montant_ttc'])
-    cout_moyen   = round(cout_total / conso_totale, 4) if conso_totale else None
-    pic          = max((m['consommation'] for m in mois if m['consommation']), default=None)
-
-    return JsonResponse({
-        'success':        True,
-        'mois':           mois,
-        'conso_totale':   round(conso_totale, 1),
-        'cout_total':     round(cout_total, 2),
-        'cout_moyen_kwh': cout_moyen,
-        'pic_mensuel':    pic,
-        'nb_factures':    len(mois),
-    })
+    return JsonResponse({'success': True, **donnees})
 
 
 
@@ -2945,34 +3068,7 @@ def analyser_document(request, doc_id):
 
     document = get_object_or_404(Document, id=doc_id)
 
-    # Lire tous les fichiers PDF du dossier
-    texte_complet = ""
-    pdf_b64_principal = None
-
-    for doc_file in document.fichiers.all():
-        try:
-            texte_complet += extract_text_from_pdf(doc_file.fichier.path) + "\n\n"
-            # Premier PDF valide comme document principal
-            if pdf_b64_principal is None and doc_file.fichier.path.lower().endswith('.pdf'):
-                with open(doc_file.fichier.path, 'rb') as f:
-                    pdf_bytes = f.read()
-                if pdf_bytes.startswith(b'%PDF'):
-                    pdf_b64_principal = base64.b64encode(pdf_bytes).decode('utf-8')
-        except Exception as e:
-            print(f"Erreur lecture fichier {doc_file.nom}: {e}")
-
-    # Fallback ancien champ upload
-    if not texte_complet and document.upload and document.upload.name:
-        try:
-            texte_complet = extract_text_from_pdf(document.upload.path)
-            with open(document.upload.path, 'rb') as f:
-                pdf_bytes = f.read()
-            if pdf_bytes.startswith(b'%PDF'):
-                pdf_b64_principal = base64.b64encode(pdf_bytes).decode('utf-8')
-        except Exception as e:
-            print(f"Erreur upload principal: {e}")
-
-    if not texte_complet and not pdf_b64_principal:
+    if not document.fichiers.exists() and not (document.upload and document.upload.name):
         return JsonResponse({'error': 'Aucun document PDF trouvé dans ce dossier'}, status=400)
 
     # Pour un bilan carbone, on ne lance pas le parser thermique
@@ -2993,7 +3089,7 @@ def analyser_document(request, doc_id):
         })
 
     try:
-        resultat = analyser_rapport_thermique(texte_complet, pdf_b64=pdf_b64_principal)
+        resultat = analyser_par_niveaux(document, priorite=llm.INTERACTIF)
         valeurs  = resultat.get('valeurs', {})
         analyze_document(document, valeurs, resultat)
 
@@ -3010,8 +3106,12 @@ def analyser_document(request, doc_id):
             'resume':               resultat.get('resume_extraction', ''),
             'batiment':             resultat.get('batiment', {}),
             'valeurs':              valeurs,
+            'niveau_extraction':    document.extraction_niveau,
+            'confiance':            document.extraction_confiance,
         })
 
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
     except Exception as e:
         print(f"ANALYSER_DOCUMENT ERROR: {e}")
         return JsonResponse({'error': str(e)}, status=500)
@@ -3020,13 +3120,59 @@ def analyser_document(request, doc_id):
 # API REST
 # ──────────────────────────────────────────────────────────────
 
+def _api_liste_documents(request, qs):
+    """
+    Liste de dossiers pour l'API.
+      ?fields=id,name,status            champs retournés (défaut : tous)
+      ?status= ?norme= ?pays=           filtres exacts
+      ?date_debut=AAAA-MM-JJ ?date_fin= plage sur la date de dépôt (incluse)
+      ?page_size= ?cursor=              pagination par curseur (50 par défaut, 200 au plus)
+    La réponse est toujours paginée : {next, previous, results}.
+    """
+    from django.utils.dateparse import parse_date
+    from .pagination import DocumentCursorPagination
+
+    for param in ('status', 'norme', 'pays'):
+        valeur = request.query_params.get(param)
+        if valeur:
+            qs = qs.filter(**{param: valeur})
+
+    for param, lookup in (('date_debut', 'upload_date__date__gte'), ('date_fin', 'upload_date__date__lte')):
+        valeur = request.query_params.get(param)
+        if valeur:
+            try:
+                jour = parse_date(valeur)
+            except ValueError:
+                jour = None
+            if jour is None:
+                return Response({'error': f'{param} invalide (format AAAA-MM-JJ)'}, status=status.HTTP_400_BAD_REQUEST)
+            qs = qs.filter(**{lookup: jour})
+
+    fields = None
+    if request.query_params.get('fields'):
+        disponibles = set(DocumentSerializer.Meta.fields)
+        fields = [f.strip() for f in request.query_params['fields'].split(',') if f.strip()]
+        inconnus = [f for f in fields if f not in disponibles]
+        if inconnus:
+            return Response({'error': f"Champ(s) inconnu(s) : {', '.join(inconnus)}"}, status=status.HTTP_400_BAD_REQUEST)
+
+    # Ne charger que les colonnes utiles (+ celles du tri de pagination)
+    demandes = fields or DocumentSerializer.Meta.fields
+    qs = qs.only(*DocumentSerializer.colonnes_requises(demandes) | {'upload_date'})
+    if 'analyses' in demandes:
+        qs = qs.prefetch_related('analyses')
+
+    paginator = DocumentCursorPagination()
+    page = paginator.paginate_queryset(qs, request)
+    serializer = DocumentSerializer(page, many=True, fields=fields)
+    return paginator.get_paginated_response(serializer.data)
+
+
 @csrf_exempt
 @api_view(['GET', 'POST'])
 def api_document_list(request):
     if request.method == 'GET':
-        documents  = Document.objects.all()
-        serializer = DocumentSerializer(documents, many=True)
-        return Response(serializer.data)
+        return _api_liste_documents(request, Document.objects.all())
     serializer = DocumentSerializer(data=request.data)
     if serializer.is_valid():
         serializer.save()
@@ -3035,6 +3181,7 @@ def api_document_list(request):
 
 
 @csrf_exempt
+@conditionnel('pk', 'pk')
 @api_view(['GET'])
 def api_document_detail(request, pk):
     document   = get_object_or_404(Document, pk=pk)
@@ -3045,17 +3192,13 @@ def api_document_detail(request, pk):
 @csrf_exempt
 @api_view(['GET'])
 def api_results(request):
-    documents  = Document.objects.all()
-    serializer = DocumentSerializer(documents, many=True)
-    return Response(serializer.data)
+    return _api_liste_documents(request, Document.objects.all())
 
 
 @csrf_exempt
 @api_view(['GET'])
 def api_history(request):
-    documents  = Document.objects.all().order_by('-upload_date')
-    serializer = DocumentSerializer(documents, many=True)
-    return Response(serializer.data)
+    return _api_liste_documents(request, Document.objects.order_by('-upload_date'))
 
 
 @csrf_exempt
@@ -3213,7 +3356,7 @@ def client_send_message(request, token):
             msg.save()
 
             # Notifier l'admin par email
-            _send_html_async(
+            emails.envoyer(
                 f"💬 Nouveau message client — {document.name}",
                 "email_notification_admin.html",
                 {
@@ -4,13 +4,17 @@ import { Container, ListGroup, Button } from 'react-bootstrap';
 
 const History = () => {
   const [documents, setDocuments] = useState([]);
+  const [next, setNext] = useState(null);
+
+  // Réponse paginée par curseur : { results, next, previous }
+  const fetchPage = async (url, append = false) => {
+    const result = await axios(url);
+    setDocuments(previous => (append ? [...previous, ...result.data.results] : result.data.results));
+    setNext(result.data.next);
+  };
 
   useEffect(() => {
-    const fetchData = async () => {
-      const result = await axios('/api/history/');
-      setDocuments(result.data);
-    };
-    fetchData();
+    fetchPage('/api/history/');
   }, []);
 
   return (
@@ -25,6 +29,7 @@ const History = () => {
           </ListGroup.Item>
         ))}
       </ListGroup>
+      {next && <Button variant="secondary" onClick={() => fetchPage(next, true)}>Charger la suite</Button>}
     </Container>
   );
 }
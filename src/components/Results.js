@@ -1,16 +1,20 @@
 import React, { useEffect, useState } from 'react';
 import axios from 'axios';
-import { Container, Table } from 'react-bootstrap';
+import { Button, Container, Table } from 'react-bootstrap';
 
 const Results = () => {
   const [documents, setDocuments] = useState([]);
+  const [next, setNext] = useState(null);
+
+  // Réponse paginée par curseur : { results, next, previous }
+  const fetchPage = async (url, append = false) => {
+    const result = await axios(url);
+    setDocuments(previous => (append ? [...previous, ...result.data.results] : result.data.results));
+    setNext(result.data.next);
+  };
 
   useEffect(() => {
-    const fetchData = async () => {
-      const result = await axios('/api/results/');
-      setDocuments(result.data);
-    };
-    fetchData();
+    fetchPage('/api/results/');
   }, []);
 
   return (
@@ -40,6 +44,7 @@ const Results = () => {
           ))}
         </tbody>
       </Table>
+      {next && <Button variant="secondary" onClick={() => fetchPage(next, true)}>Charger la suite</Button>}
     </Container>
   );
 }